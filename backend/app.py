@@ -1,6 +1,6 @@
 from flask import Flask
 from config import Config
-from extensions import db, jwt
+from extensions import db, jwt, migrate, response_cache
 from blueprints import register_blueprints
 from flask_cors import CORS
 
@@ -8,7 +8,9 @@ def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
     db.init_app(app)
+    migrate.init_app(app, db)
     jwt.init_app(app)
+    response_cache.init_app(app)
     register_blueprints(app)
     CORS(app, supports_credentials=True, expose_headers=["Authorization"])
     return app
@@ -0,0 +1,106 @@
+import argparse
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+# Must be set before app is imported: it reads both when it builds its config
+parser = argparse.ArgumentParser(description="Query latency of /api/news/search on a seeded SQLite database")
+parser.add_argument('--articles', type=int, default=100000)
+parser.add_argument('--db', default='/tmp/search_benchmark.db', help="Reused if it already holds --articles rows")
+parser.add_argument('--words-per-article', type=int, default=300)
+parser.add_argument('--repeats', type=int, default=20, help="Timed runs per query")
+args = parser.parse_args()
+os.environ['MYSQL_URI'] = 'sqlite:///' + os.path.abspath(args.db)
+# Every request must reach the database
+os.environ['RESPONSE_CACHE'] = 'off'
+
+from sqlalchemy import text
+from app import app
+from extensions import db
+from models import NewsArticle, User
+
+VOCABULARY_SIZE = 20000
+SEED_BATCH = 5000
+
+
+def vocabulary(rng):
+    """Pseudo-words; drawn with Zipf-like weights so a few are very common"""
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    words = sorted({''.join(rng.choice(letters) for _ in range(rng.randint(3, 10))) for _ in range(VOCABULARY_SIZE)})
+    rng.shuffle(words)
+    return words, [1.0 / (rank + 1) for rank in range(len(words))]
+
+
+def seed(n_articles, words_per_article):
+    rng = random.Random(0)
+    words, weights = vocabulary(rng)
+    db.drop_all()
+    db.create_all()
+    db.session.add_all([User(name=f'Reporter {i}', email=f'reporter{i}@example.com', role='reporter') for i in range(50)])
+    db.session.commit()
+    start = datetime(2020, 1, 1)
+    for first in range(0, n_articles, SEED_BATCH):
+        rows = []
+        for i in range(first, min(n_articles, first + SEED_BATCH)):
+            body = rng.choices(words, weights, k=words_per_article)
+            article = NewsArticle(title=' '.join(rng.choices(words, weights, k=8)).capitalize(),
+                                  content='<p>' + ' '.join(body) + '</p>')
+            rows.append(dict(title=article.title, content=article.content, search_text=article.search_text,
+                             reporter_id=1 + i % 50, created_at=start + timedelta(minutes=i)))
+        db.session.execute(NewsArticle.__table__.insert(), rows)
+        db.session.commit()
+        print(f"Seeded {first + len(rows)}/{n_articles} articles")
+    return words
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+def time_request(client, url, repeats):
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        response = client.get(url)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return response.get_json(), latencies
+
+
+if __name__ == '__main__':
+    with app.app_context():
+        indexed = db.session.execute(text("SELECT count(*) FROM sqlite_master WHERE name = 'news_article_fts'")).scalar()
+        if indexed and NewsArticle.query.count() == args.articles:
+            print(f"Reusing {args.db} ({args.articles} articles)")
+            # seed() draws the vocabulary first from the same seed
+            words, _ = vocabulary(random.Random(0))
+        else:
+            words = seed(args.articles, args.words_per_article)
+
+    # words[0] is the most frequent, words[-1] among the rarest
+    common, mid, rare = words[0], words[200], words[-1]
+    queries = [
+        ('common word', common),
+        ('mid-frequency word', mid),
+        ('rare word', rare),
+        ('two words', f'{common} {mid}'),
+        ('no match', 'zzzzqqq'),
+    ]
+    client = app.test_client()
+    print(f"\n{'query':<20} {'matches page':>12} {'p50 ms':>8} {'p95 ms':>8}")
+    for label, q in queries:
+        for page in (1, 5):
+            body, latencies = time_request(client, f'/api/news/search?q={q}&page={page}', args.repeats)
+            name = label if page == 1 else f'  page {page}'
+            print(f"{name:<20} {len(body['results']):>12} {percentile(latencies, 50):>8.1f} {percentile(latencies, 95):>8.1f}")
+
+    # What the endpoint replaces: a substring scan of every article body
+    with app.app_context():
+        latencies = []
+        for _ in range(max(1, args.repeats // 5)):
+            start = time.perf_counter()
+            db.session.execute(text("SELECT id FROM news_article WHERE content LIKE :q ORDER BY created_at DESC LIMIT 20"),
+                               {'q': f'%{rare}%'}).all()
+            latencies.append((time.perf_counter() - start) * 1000)
+        print(f"{'LIKE %rare% scan':<20} {'':>12} {percentile(latencies, 50):>8.1f} {percentile(latencies, 95):>8.1f}")
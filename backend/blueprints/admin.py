@@ -1,6 +1,8 @@
 from flask import Blueprint, request, jsonify
-from extensions import db
+from extensions import db, response_cache
+from response_cache import author_tags
 from models import User
+from serializers import serialize_reporter_license, serialize_reporter_profile
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 import random
 import string
@@ -29,16 +31,7 @@ def generate_license_key():
 @admin_required
 def get_pending_reporters():
     pending = User.query.filter_by(role='reporter', is_approved=False).all()
-    return jsonify([{
-        'id': u.id, 
-        'name': u.name, 
-        'email': u.email,
-        'phone_number': u.phone_number,
-        'citizenship_number': u.citizenship_number,
-        'profile_photo_url': u.profile_photo_url,
-        'reporter_id_card_url': u.reporter_id_card_url,
-        'created_at': u.created_at.isoformat() if u.created_at else None
-    } for u in pending])
+    return jsonify([serialize_reporter_profile(u) for u in pending])
 
 @admin_bp.route('/user/<int:user_id>', methods=['GET'])
 @admin_required
@@ -49,17 +42,7 @@ def get_user_details(user_id):
     if user.role != 'reporter':
         return jsonify({'msg': 'User is not a reporter'}), 400
     
-    return jsonify({
-        'id': user.id,
-        'name': user.name,
-        'email': user.email,
-        'phone_number': user.phone_number,
-        'citizenship_number': user.citizenship_number,
-        'profile_photo_url': user.profile_photo_url,
-        'reporter_id_card_url': user.reporter_id_card_url,
-        'created_at': user.created_at.isoformat() if user.created_at else None,
-        'is_approved': user.is_approved
-    })
+    return jsonify(dict(serialize_reporter_profile(user), is_approved=user.is_approved))
 
 @admin_bp.route('/approve', methods=['POST'])
 @admin_required
@@ -85,16 +68,7 @@ def approve_reporter():
 @jwt_required()
 def get_reporters():
     reporters = User.query.filter_by(role='reporter', is_approved=True).all()
-    return jsonify([
-        {
-            'id': r.id,
-            'name': r.name,
-            'email': r.email,
-            'license': r.license_key,
-            'created_at': r.created_at.isoformat() if r.created_at else None
-        }
-        for r in reporters
-    ])
+    return jsonify([serialize_reporter_license(r) for r in reporters])
 
 @admin_bp.route('/revoke', methods=['POST'])
 @jwt_required()
@@ -109,4 +83,5 @@ def revoke_reporter():
     user.is_approved = False
     user.license_key = None  # Optionally clear the license
     db.session.commit()
+    response_cache.invalidate(author_tags([user.id]))
     return jsonify({'msg': 'Reporter revoked'}) 
\ No newline at end of file
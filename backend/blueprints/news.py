@@ -1,26 +1,67 @@
 from flask import Blueprint, request, jsonify
-from extensions import db
-from models import NewsArticle, User
+from extensions import db, response_cache
+from models import NewsArticle
+from pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, InvalidCursor, keyset_page, page_args
+from response_cache import article_tags, author_tags, feed_tags
+from search import highlight, query_terms, search_articles
+from serializers import (article_summaries, articles_with_reporter, serialize_article, serialize_article_summary,
+                         serialize_search_result)
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 
 news_bp = Blueprint('news', __name__)
 
+def list_articles(reporter_id=None):
+    """One page of articles, newest first.
+
+    ?limit= page size, ?cursor= the previous page's next_cursor,
+    ?category= to list one category, and ?view=full to include each
+    article's content instead of an excerpt.
+    """
+    try:
+        limit, cursor = page_args()
+    except InvalidCursor:
+        return jsonify({'msg': 'Invalid cursor'}), 400
+    if request.args.get('view') == 'full':
+        query, serialize = articles_with_reporter(), serialize_article
+    else:
+        query, serialize = article_summaries(), serialize_article_summary
+    if reporter_id is not None:
+        query = query.filter(NewsArticle.reporter_id == reporter_id)
+    category = request.args.get('category')
+    if category:
+        query = query.filter(NewsArticle.category == category)
+    rows, next_cursor = keyset_page(query, NewsArticle.created_at, NewsArticle.id, limit, cursor)
+    response = jsonify({'articles': [serialize(r) for r in rows], 'next_cursor': next_cursor})
+    # Revoking a reporter invalidates every cached page showing their articles
+    response.cache_tags = author_tags(row.reporter_id for row in rows)
+    return response
+
 @news_bp.route('/news', methods=['GET'])
+@response_cache.cached(lambda: feed_tags(category=request.args.get('category')))
 def get_news():
-    articles = NewsArticle.query.order_by(NewsArticle.created_at.desc()).all()
-    return jsonify([
-        {
-            'id': a.id,
-            'title': a.title,
-            'content': a.content,
-            'reporter_id': a.reporter_id,
-            'author': (lambda user: user.name if user is not None else None)(User.query.get(a.reporter_id)),
-            'created_at': a.created_at.isoformat() if a.created_at else None,
-            'cover_image': a.cover_image,
-            'category': a.category
-        }
-        for a in articles
-    ])
+    return list_articles()
+
+@news_bp.route('/news/search', methods=['GET'])
+@response_cache.cached(lambda: ['feed'])
+def search_news():
+    """Articles containing every word of ?q=, best match first.
+
+    ?page= (from 1) and ?limit= page through the ranked results; each
+    result has an HTML snippet with the matching words in <mark>.
+    """
+    terms = query_terms(request.args.get('q', ''))
+    if not terms:
+        return jsonify({'msg': 'Missing search query'}), 400
+    limit = min(max(request.args.get('limit', DEFAULT_PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+    page = max(request.args.get('page', 1, type=int), 1)
+    rows = search_articles(terms, limit + 1, (page - 1) * limit)
+    response = jsonify({
+        'results': [serialize_search_result(r, highlight(r.search_text, terms)) for r in rows[:limit]],
+        'page': page,
+        'next_page': page + 1 if len(rows) > limit else None
+    })
+    response.cache_tags = author_tags(r.reporter_id for r in rows[:limit])
+    return response
 
 @news_bp.route('/news', methods=['POST'])
 @jwt_required()
@@ -44,38 +85,21 @@ def post_news():
     )
     db.session.add(article)
     db.session.commit()
+    response_cache.invalidate(article_tags(article))
     return jsonify({'msg': 'News posted'}) 
 
 @news_bp.route('/news/<int:article_id>', methods=['GET'])
+@response_cache.cached(lambda article_id: ['article:%s' % article_id])
 def get_news_article(article_id):
-    article = NewsArticle.query.get_or_404(article_id)
-    author = User.query.get(article.reporter_id)
-    return jsonify({
-        'id': article.id,
-        'title': article.title,
-        'content': article.content,
-        'author': author.name if author is not None else None,
-        'created_at': article.created_at.isoformat() if article.created_at else None,
-        'cover_image': article.cover_image,
-        'category': article.category
-    }) 
+    article = articles_with_reporter().get_or_404(article_id)
+    response = jsonify(serialize_article(article))
+    response.cache_tags = author_tags([article.reporter_id])
+    return response
 
 @news_bp.route('/news/reporter/<int:reporter_id>', methods=['GET'])
+@response_cache.cached(lambda reporter_id: feed_tags(reporter_id))
 def get_news_by_reporter(reporter_id):
-    articles = NewsArticle.query.filter_by(reporter_id=reporter_id).order_by(NewsArticle.created_at.desc()).all()
-    return jsonify([
-        {
-            'id': a.id,
-            'title': a.title,
-            'content': a.content,
-            'reporter_id': a.reporter_id,
-            'author': (lambda user: user.name if user is not None else None)(User.query.get(a.reporter_id)),
-            'created_at': a.created_at.isoformat() if a.created_at else None,
-            'cover_image': a.cover_image,
-            'category': a.category
-        }
-        for a in articles
-    ]) 
+    return list_articles(reporter_id)
 
 @news_bp.route('/news/<int:article_id>', methods=['DELETE'])
 @jwt_required()
@@ -85,6 +109,8 @@ def delete_news_article(article_id):
     article = NewsArticle.query.get_or_404(article_id)
     if claims.get('role') != 'reporter' or int(identity) != article.reporter_id:
         return jsonify({'msg': 'You can only delete your own articles.'}), 403
+    tags = article_tags(article)
     db.session.delete(article)
     db.session.commit()
+    response_cache.invalidate(tags)
     return jsonify({'msg': 'Article deleted.'}) 
\ No newline at end of file
@@ -12,4 +12,15 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('MYSQL_URI')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'jwtsecret')
-    JWT_ACCESS_TOKEN_EXPIRES = timedelta(days=1) 
\ No newline at end of file
+    JWT_ACCESS_TOKEN_EXPIRES = timedelta(days=1)
+    # Worker processes serving the app; gunicorn reads the same variable as
+    # its default --workers
+    WORKERS = int(os.environ.get('WEB_CONCURRENCY', 1))
+    # News read cache: 'off' (default), 'local' (per process, refused when
+    # WORKERS > 1) or 'shared' (Redis at RESPONSE_CACHE_URL; without a URL an
+    # in-process stand-in, also refused when WORKERS > 1). Entries expire
+    # after RESPONSE_CACHE_TTL
+    RESPONSE_CACHE = os.environ.get('RESPONSE_CACHE', 'off')
+    RESPONSE_CACHE_URL = os.environ.get('RESPONSE_CACHE_URL')
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', 1024))
+    RESPONSE_CACHE_TTL = int(os.environ.get('RESPONSE_CACHE_TTL', 300)) 
\ No newline at end of file
@@ -1,5 +1,9 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_jwt_extended import JWTManager
+from flask_migrate import Migrate
+from response_cache import ResponseCache
 
 db = SQLAlchemy()
-jwt = JWTManager() 
\ No newline at end of file
+jwt = JWTManager()
+migrate = Migrate()
+response_cache = ResponseCache() 
\ No newline at end of file
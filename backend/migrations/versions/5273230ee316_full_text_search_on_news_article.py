@@ -0,0 +1,88 @@
+"""full-text search on news_article
+
+Adds news_article.search_text (the plain text of content), fills it for
+existing rows and indexes it with the title: a FULLTEXT index on MySQL, an
+FTS5 table kept in sync by triggers on SQLite.
+
+Revision ID: 5273230ee316
+Revises: b9feae31b166
+Create Date: 2026-10-17 13:22:42.223405
+
+"""
+import html
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5273230ee316'
+down_revision = 'b9feae31b166'
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH = 1000
+TAG_RE = re.compile(r'<[^>]*(>|$)')
+
+# Same statements as search.SQLITE_FTS_DDL at the time of this revision
+SQLITE_FTS_DDL = [
+    "CREATE VIRTUAL TABLE news_article_fts USING fts5("
+    "title, search_text, content='news_article', content_rowid='id')",
+    "CREATE TRIGGER news_article_fts_ai AFTER INSERT ON news_article BEGIN "
+    "INSERT INTO news_article_fts(rowid, title, search_text) VALUES (new.id, new.title, new.search_text); END",
+    "CREATE TRIGGER news_article_fts_ad AFTER DELETE ON news_article BEGIN "
+    "INSERT INTO news_article_fts(news_article_fts, rowid, title, search_text) "
+    "VALUES ('delete', old.id, old.title, old.search_text); END",
+    "CREATE TRIGGER news_article_fts_au AFTER UPDATE ON news_article BEGIN "
+    "INSERT INTO news_article_fts(news_article_fts, rowid, title, search_text) "
+    "VALUES ('delete', old.id, old.title, old.search_text); "
+    "INSERT INTO news_article_fts(rowid, title, search_text) VALUES (new.id, new.title, new.search_text); END",
+]
+
+
+def html_to_text(content_html):
+    return ' '.join(html.unescape(TAG_RE.sub(' ', content_html or '')).split())
+
+
+def backfill_search_text():
+    bind = op.get_bind()
+    articles = sa.table('news_article', sa.column('id', sa.Integer), sa.column('content', sa.Text),
+                        sa.column('search_text', sa.Text))
+    last_id = 0
+    while True:
+        rows = bind.execute(sa.select(articles.c.id, articles.c.content)
+                            .where(articles.c.id > last_id).order_by(articles.c.id).limit(BACKFILL_BATCH)).all()
+        if not rows:
+            return
+        bind.execute(articles.update().where(articles.c.id == sa.bindparam('row_id'))
+                     .values(search_text=sa.bindparam('text')),
+                     [{'row_id': row.id, 'text': html_to_text(row.content)} for row in rows])
+        last_id = rows[-1].id
+
+
+def upgrade():
+    with op.batch_alter_table('news_article', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('search_text', sa.Text(), nullable=True))
+    backfill_search_text()
+
+    dialect = op.get_bind().dialect.name
+    if dialect == 'mysql':
+        op.create_index('ft_news_article_title_search_text', 'news_article', ['title', 'search_text'],
+                        unique=False, mysql_prefix='FULLTEXT')
+    elif dialect == 'sqlite':
+        for statement in SQLITE_FTS_DDL:
+            op.execute(statement)
+        op.execute("INSERT INTO news_article_fts(news_article_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'mysql':
+        op.drop_index('ft_news_article_title_search_text', table_name='news_article')
+    elif dialect == 'sqlite':
+        for trigger in ('news_article_fts_ai', 'news_article_fts_ad', 'news_article_fts_au'):
+            op.execute('DROP TRIGGER %s' % trigger)
+        op.execute('DROP TABLE news_article_fts')
+    with op.batch_alter_table('news_article', schema=None) as batch_op:
+        batch_op.drop_column('search_text')
@@ -1,5 +1,7 @@
 from extensions import db
 from datetime import datetime
+from sqlalchemy.orm import validates
+from utils import html_to_text
 
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -16,6 +18,17 @@ class User(db.Model):
     reporter_id_card_url = db.Column(db.String(500))
 
 class NewsArticle(db.Model):
+    # One index per feed query, each ending in the (created_at, id) sort key so
+    # a page is an index range scan instead of a filesort over the table
+    __table_args__ = (
+        db.Index('ix_news_article_created_at_id', 'created_at', 'id'),
+        db.Index('ix_news_article_reporter_created_at_id', 'reporter_id', 'created_at', 'id'),
+        db.Index('ix_news_article_category_created_at_id', 'category', 'created_at', 'id'),
+        # Search index on MySQL; SQLite uses the news_article_fts table (search.py)
+        db.Index('ft_news_article_title_search_text', 'title', 'search_text',
+                 mysql_prefix='FULLTEXT').ddl_if(dialect='mysql'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(255), nullable=False)
     content = db.Column(db.Text, nullable=False)
@@ -23,4 +36,13 @@ class NewsArticle(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow) 
     cover_image = db.Column(db.String(500))
-    category = db.Column(db.String(50))
\ No newline at end of file
+    category = db.Column(db.String(50))
+    # Plain text of `content` (no markup), the column full-text search indexes
+    search_text = db.Column(db.Text)
+    # Not loaded by default: listings opt in with joinedload(NewsArticle.reporter)
+    reporter = db.relationship('User', backref=db.backref('articles', lazy='dynamic'))
+
+    @validates('content')
+    def update_search_text(self, key, content):
+        self.search_text = html_to_text(content)
+        return content
\ No newline at end of file
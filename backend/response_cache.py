@@ -0,0 +1,244 @@
+# response_cache.py
+# Cache for public GET responses, with ETag/Last-Modified revalidation and
+# tag-based invalidation when the underlying articles change
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from urllib.parse import urlencode
+from flask import current_app, request
+
+
+# Bumped by every invalidation, so a request can tell whether anything was
+# invalidated while its view ran
+WRITES_TAG = '*'
+
+
+def feed_tags(reporter_id=None, category=None):
+    """Tag of the listing a request reads; writes to that listing bump it"""
+    if reporter_id is not None:
+        return ['reporter:%s' % reporter_id]
+    if category:
+        return ['category:%s' % category]
+    return ['feed']
+
+
+def article_tags(article):
+    """The article and every listing it appears in; bumped when it is posted or deleted"""
+    tags = ['feed', 'article:%s' % article.id, 'reporter:%s' % article.reporter_id]
+    if article.category:
+        tags.append('category:%s' % article.category)
+    return tags
+
+
+def author_tags(reporter_ids):
+    """Tags of responses showing these reporters' articles; bumped when one is revoked"""
+    return ['author:%s' % reporter_id for reporter_id in sorted(set(reporter_ids))]
+
+
+class LRUBackend:
+    """In-process cache. Only correct with a single process: invalidations in
+    one gunicorn worker are not seen by the others (use SharedBackend).
+    Entries also expire after `ttl` seconds, which bounds how long a
+    misconfigured multi-worker deployment can serve stale responses."""
+
+    def __init__(self, max_entries=1024, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.versions = {}
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry, expires = self.entries.get(key, (None, None))
+            if entry is None:
+                return None
+            if expires < time.time():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        with self.lock:
+            self.entries[key] = (entry, time.time() + self.ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def tag_versions(self, tags):
+        with self.lock:
+            return [self.versions.get(tag, 0) for tag in tags]
+
+    def bump(self, tags):
+        with self.lock:
+            for tag in tags:
+                self.versions[tag] = self.versions.get(tag, 0) + 1
+
+
+class LocalStore:
+    """Stand-in for a Redis client (get/set/mget/incr) when RESPONSE_CACHE_URL
+    is unset, so the shared backend runs in development without a server."""
+
+    def __init__(self):
+        self.data = {}
+        self.lock = threading.Lock()
+
+    def get(self, name):
+        with self.lock:
+            value, expires = self.data.get(name, (None, None))
+            if expires is not None and expires < time.time():
+                del self.data[name]
+                return None
+            return value
+
+    def set(self, name, value, ex=None):
+        with self.lock:
+            self.data[name] = (value, time.time() + ex if ex else None)
+
+    def mget(self, names):
+        return [self.get(name) for name in names]
+
+    def incr(self, name):
+        with self.lock:
+            value = int(self.data.get(name, (0, None))[0] or 0) + 1
+            self.data[name] = (value, None)
+            return value
+
+
+class SharedBackend:
+    """Cache shared by every worker through Redis (RESPONSE_CACHE_URL).
+
+    Entries expire after `ttl` seconds so Redis memory stays bounded; tag
+    versions never expire.
+    """
+
+    def __init__(self, url=None, ttl=300, prefix='response-cache:'):
+        if url:
+            import redis  # optional dependency, only needed for a real shared cache
+            self.client = redis.Redis.from_url(url)
+        else:
+            self.client = LocalStore()
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + 'entry:' + key)
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key, entry):
+        self.client.set(self.prefix + 'entry:' + key, json.dumps(entry), ex=self.ttl)
+
+    def tag_versions(self, tags):
+        if not tags:
+            return []
+        return [int(v or 0) for v in self.client.mget([self.prefix + 'tag:' + tag for tag in tags])]
+
+    def bump(self, tags):
+        for tag in tags:
+            self.client.incr(self.prefix + 'tag:' + tag)
+
+
+class ResponseCache:
+    """Caches JSON GET responses keyed by path and query string.
+
+    Each entry records the version of every tag it depends on (the listing or
+    article it reads, plus the authors it shows). invalidate() bumps
+    tag versions, so an entry is dropped exactly when something it contains
+    changes. Every response carries an ETag (hash of the body) and
+    Last-Modified (when it was built); If-None-Match/If-Modified-Since get a
+    304 without a body.
+    """
+
+    def __init__(self, app=None):
+        self.backend = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        kind = app.config.get('RESPONSE_CACHE', 'off')
+        if kind == 'local':
+            workers = app.config.get('WORKERS', 1)
+            if workers > 1:
+                raise ValueError("RESPONSE_CACHE='local' is per process and would serve stale responses "
+                                 "with %d workers; use 'shared'" % workers)
+            self.backend = LRUBackend(app.config.get('RESPONSE_CACHE_MAX_ENTRIES', 1024),
+                                      app.config.get('RESPONSE_CACHE_TTL', 300))
+        elif kind == 'shared':
+            workers = app.config.get('WORKERS', 1)
+            if not app.config.get('RESPONSE_CACHE_URL') and workers > 1:
+                raise ValueError("RESPONSE_CACHE='shared' needs RESPONSE_CACHE_URL with %d workers; "
+                                 "without it every worker keeps its own copy" % workers)
+            self.backend = SharedBackend(app.config.get('RESPONSE_CACHE_URL'),
+                                         app.config.get('RESPONSE_CACHE_TTL', 300))
+        elif kind != 'off':
+            raise ValueError("RESPONSE_CACHE must be 'local', 'shared' or 'off', got %r" % kind)
+        app.extensions['response_cache'] = self
+
+    def invalidate(self, tags):
+        if self.backend is not None:
+            self.backend.bump(list(tags) + [WRITES_TAG])
+
+    def cached(self, tags_for_request):
+        """Decorator for a GET view returning a JSON response.
+
+        tags_for_request(**view_args) names the listing or article the
+        request reads; the view may add tags for what the response contains
+        by setting `response.cache_tags`.
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                backend = self.backend
+                key = request.path + '?' + urlencode(sorted(request.args.items(multi=True)))
+                if backend is not None:
+                    entry = backend.get(key)
+                    if entry is not None and backend.tag_versions(list(entry['tags'])) == list(entry['tags'].values()):
+                        return self.conditional(current_app.response_class(entry['body'], mimetype='application/json'),
+                                                entry, 'HIT')
+
+                # Read before the view runs, so a write to this listing that
+                # lands while it runs leaves the entry stale rather than wrong
+                tags = list(tags_for_request(**kwargs))
+                versions = backend.tag_versions(tags + [WRITES_TAG]) if backend is not None else [0]
+                writes = versions.pop()
+                store = backend is not None
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                extra = [tag for tag in getattr(response, 'cache_tags', []) if tag not in tags]
+                if backend is not None and extra:
+                    # The view names these only once it has read the rows, so
+                    # their versions can only be read now. If any invalidation
+                    # landed while the view ran, they may already count a write
+                    # the body predates: serve the response but do not store it
+                    extra_versions = backend.tag_versions(extra + [WRITES_TAG])
+                    store = extra_versions.pop() == writes
+                    tags += extra
+                    versions += extra_versions
+                body = response.get_data(as_text=True)
+                entry = {
+                    'body': body,
+                    'etag': hashlib.sha1(body.encode()).hexdigest(),
+                    'last_modified': int(time.time()),
+                    'tags': dict(zip(tags, versions)),
+                }
+                if store:
+                    backend.set(key, entry)
+                return self.conditional(response, entry, 'MISS' if backend is not None else None)
+            return wrapper
+        return decorator
+
+    @staticmethod
+    def conditional(response, entry, status):
+        response.set_etag(entry['etag'])
+        response.last_modified = entry['last_modified']
+        # Clients may keep the body but must revalidate it on every use
+        response.cache_control.no_cache = True
+        if status is not None:
+            response.headers['X-Cache'] = status
+        return response.make_conditional(request)
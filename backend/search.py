@@ -0,0 +1,149 @@
+# search.py
+# Full-text search over article titles and bodies: MySQL FULLTEXT in
+# production, an SQLite FTS5 table locally, and an unindexed LIKE scan on
+# any other database
+
+import html
+import re
+from sqlalchemy import DDL, DateTime, case, event, text
+from extensions import db
+from models import NewsArticle, User
+
+SNIPPET_CHARS = 240
+MAX_TERMS = 8
+# Titles count this many times as much as body text when ranking (SQLite)
+TITLE_WEIGHT = 5.0
+TERM_RE = re.compile(r'\w+', re.UNICODE)
+# InnoDB's default innodb_ft_min_token_size; shorter words are not indexed
+MYSQL_MIN_TERM_CHARS = 3
+
+# External-content FTS5 index over news_article(title, search_text), kept
+# in sync by triggers, so posting and deleting articles update it
+# automatically. The same statements are in the search migration.
+SQLITE_FTS_DDL = [
+    "CREATE VIRTUAL TABLE news_article_fts USING fts5("
+    "title, search_text, content='news_article', content_rowid='id')",
+    "CREATE TRIGGER news_article_fts_ai AFTER INSERT ON news_article BEGIN "
+    "INSERT INTO news_article_fts(rowid, title, search_text) VALUES (new.id, new.title, new.search_text); END",
+    "CREATE TRIGGER news_article_fts_ad AFTER DELETE ON news_article BEGIN "
+    "INSERT INTO news_article_fts(news_article_fts, rowid, title, search_text) "
+    "VALUES ('delete', old.id, old.title, old.search_text); END",
+    "CREATE TRIGGER news_article_fts_au AFTER UPDATE ON news_article BEGIN "
+    "INSERT INTO news_article_fts(news_article_fts, rowid, title, search_text) "
+    "VALUES ('delete', old.id, old.title, old.search_text); "
+    "INSERT INTO news_article_fts(rowid, title, search_text) VALUES (new.id, new.title, new.search_text); END",
+]
+
+# db.create_all() (development databases) builds the FTS table too
+for statement in SQLITE_FTS_DDL:
+    event.listen(NewsArticle.__table__, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+
+RESULT_COLUMNS = """
+    a.id, a.title, a.reporter_id, u.name AS author, a.category, a.cover_image,
+    a.created_at, a.search_text
+"""
+
+# The page is ranked and cut inside the FTS table first; joining before the
+# sort would read every matching article's row, several times slower for
+# common words
+SQLITE_QUERY = text(f"""
+    SELECT {RESULT_COLUMNS}, m.rank
+    FROM (
+        SELECT rowid, bm25(news_article_fts, :title_weight, 1.0) AS rank
+        FROM news_article_fts
+        WHERE news_article_fts MATCH :query
+        ORDER BY rank, rowid DESC
+        LIMIT :limit OFFSET :offset
+    ) m
+    JOIN news_article a ON a.id = m.rowid
+    LEFT JOIN user u ON u.id = a.reporter_id
+    ORDER BY m.rank, a.id DESC
+""").columns(created_at=DateTime)
+
+MYSQL_QUERY = text(f"""
+    SELECT {RESULT_COLUMNS}, MATCH (a.title, a.search_text) AGAINST (:query IN BOOLEAN MODE) AS score
+    FROM news_article a
+    LEFT JOIN user u ON u.id = a.reporter_id
+    WHERE MATCH (a.title, a.search_text) AGAINST (:query IN BOOLEAN MODE)
+    ORDER BY score DESC, a.id DESC
+    LIMIT :limit OFFSET :offset
+""").columns(created_at=DateTime)
+
+
+def query_terms(q):
+    """Lowercased words of the user's query, without duplicates"""
+    terms = []
+    for term in TERM_RE.findall(q.lower()):
+        if term not in terms:
+            terms.append(term)
+    return terms[:MAX_TERMS]
+
+
+def like_search(terms, limit, offset):
+    """Rows containing every term, those with the most terms in the title
+    first, then newest first. Scans the whole table: a fallback for databases
+    without a full-text index here, not a substitute for one."""
+    title_hits = sum(case((NewsArticle.title.icontains(term, autoescape=True), 1), else_=0) for term in terms)
+    query = db.session.query(
+        NewsArticle.id, NewsArticle.title, NewsArticle.reporter_id, User.name.label('author'),
+        NewsArticle.category, NewsArticle.cover_image, NewsArticle.created_at, NewsArticle.search_text,
+    ).outerjoin(User, NewsArticle.reporter_id == User.id)
+    for term in terms:
+        query = query.filter(NewsArticle.title.icontains(term, autoescape=True)
+                             | NewsArticle.search_text.icontains(term, autoescape=True))
+    return query.order_by(title_hits.desc(), NewsArticle.created_at.desc(), NewsArticle.id.desc()) \
+        .limit(limit).offset(offset).all()
+
+
+def search_articles(terms, limit, offset):
+    """Rows matching every term, best match first.
+
+    The user's words are quoted, so FTS5 and MySQL boolean-mode operators in
+    the query string are matched literally instead of interpreted.
+    """
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        match = ' '.join('"%s"' % term for term in terms)
+        return db.session.execute(SQLITE_QUERY, {
+            'query': match, 'title_weight': TITLE_WEIGHT, 'limit': limit, 'offset': offset}).all()
+    if dialect == 'mysql':
+        terms = [term for term in terms if len(term) >= MYSQL_MIN_TERM_CHARS]
+        if not terms:
+            return []
+        match = ' '.join('+"%s"' % term for term in terms)
+        return db.session.execute(MYSQL_QUERY, {'query': match, 'limit': limit, 'offset': offset}).all()
+    return like_search(terms, limit, offset)
+
+
+def highlight(text, terms, width=SNIPPET_CHARS):
+    """HTML-escaped window of text around the densest run of matches, with
+    each matching word wrapped in <mark>"""
+    text = text or ''
+    pattern = re.compile(r'\b(?:%s)\b' % '|'.join(map(re.escape, terms)), re.IGNORECASE | re.UNICODE)
+    matches = list(pattern.finditer(text))
+    start = 0
+    if matches:
+        # Start shortly before the match followed by the most others within `width`
+        best, best_count, j = 0, 0, 0
+        for i, m in enumerate(matches):
+            while j < len(matches) and matches[j].start() < m.start() + width:
+                j += 1
+            if j - i > best_count:
+                best, best_count = i, j - i
+        start = max(0, matches[best].start() - width // 5)
+        if start:
+            start = text.find(' ', start) + 1 or start
+    end = min(len(text), start + width)
+    if end < len(text):
+        space = text.rfind(' ', start, end)
+        end = space if space > start else end
+
+    parts, position = [], start
+    for m in matches:
+        if m.start() < start or m.end() > end:
+            continue
+        parts.append(html.escape(text[position:m.start()]))
+        parts.append('<mark>%s</mark>' % html.escape(m.group()))
+        position = m.end()
+    parts.append(html.escape(text[position:end]))
+    return ('...' if start > 0 else '') + ''.join(parts) + ('...' if end < len(text) else '')
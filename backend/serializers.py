@@ -0,0 +1,120 @@
+# serializers.py
+# JSON shapes shared by the news and admin blueprints
+
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload
+from extensions import db
+from models import NewsArticle, User
+from utils import html_to_text
+
+EXCERPT_CHARS = 200
+# Raw HTML read for an excerpt; tags and entities shrink it to roughly a third
+EXCERPT_SOURCE_CHARS = 4 * EXCERPT_CHARS
+
+
+def isoformat(value):
+    return value.isoformat() if value else None
+
+
+def articles_with_reporter():
+    """NewsArticle query that fetches each article's reporter in the same SELECT.
+
+    serialize_article reads article.reporter; without this every article
+    would issue its own User lookup.
+    """
+    return NewsArticle.query.options(joinedload(NewsArticle.reporter))
+
+
+def serialize_article(article):
+    return {
+        'id': article.id,
+        'title': article.title,
+        'content': article.content,
+        'reporter_id': article.reporter_id,
+        'author': article.reporter.name if article.reporter is not None else None,
+        'created_at': isoformat(article.created_at),
+        'cover_image': article.cover_image,
+        'category': article.category
+    }
+
+
+def article_summaries():
+    """Query for the listing columns only: no content, just its first characters.
+
+    The article body never leaves the database; rows carry an `author` name
+    from the joined reporter and `excerpt_source` for make_excerpt.
+    """
+    return db.session.query(
+        NewsArticle.id,
+        NewsArticle.title,
+        NewsArticle.reporter_id,
+        User.name.label('author'),
+        NewsArticle.category,
+        NewsArticle.cover_image,
+        NewsArticle.created_at,
+        func.substr(NewsArticle.content, 1, EXCERPT_SOURCE_CHARS).label('excerpt_source'),
+    ).outerjoin(User, NewsArticle.reporter_id == User.id)
+
+
+def make_excerpt(content_html):
+    """Plain-text start of an HTML article body, cut at a word boundary.
+
+    Entities are decoded, so an escaped "&lt;img&gt;" in the body comes back
+    as "<img>": clients must render the excerpt as text, never as HTML.
+    """
+    content_html = content_html or ''
+    text = html_to_text(content_html)
+    # A source cut at EXCERPT_SOURCE_CHARS may end mid-word even when short
+    if len(text) <= EXCERPT_CHARS and len(content_html) < EXCERPT_SOURCE_CHARS:
+        return text
+    return text[:EXCERPT_CHARS].rsplit(' ', 1)[0] + '...'
+
+
+def serialize_article_summary(row):
+    return {
+        'id': row.id,
+        'title': row.title,
+        'excerpt': make_excerpt(row.excerpt_source),
+        'reporter_id': row.reporter_id,
+        'author': row.author,
+        'created_at': isoformat(row.created_at),
+        'cover_image': row.cover_image,
+        'category': row.category
+    }
+
+
+def serialize_search_result(row, snippet):
+    return {
+        'id': row.id,
+        'title': row.title,
+        'snippet': snippet,
+        'reporter_id': row.reporter_id,
+        'author': row.author,
+        'created_at': isoformat(row.created_at),
+        'cover_image': row.cover_image,
+        'category': row.category
+    }
+
+
+def serialize_reporter_profile(user):
+    """Registration details an admin reviews before approving a reporter"""
+    return {
+        'id': user.id,
+        'name': user.name,
+        'email': user.email,
+        'phone_number': user.phone_number,
+        'citizenship_number': user.citizenship_number,
+        'profile_photo_url': user.profile_photo_url,
+        'reporter_id_card_url': user.reporter_id_card_url,
+        'created_at': isoformat(user.created_at)
+    }
+
+
+def serialize_reporter_license(user):
+    return {
+        'id': user.id,
+        'name': user.name,
+        'email': user.email,
+        'license': user.license_key,
+        'created_at': isoformat(user.created_at)
+    }
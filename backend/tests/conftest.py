@@ -0,0 +1,79 @@
+import os
+import sys
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event, text
+
+# Must be set before app is imported: it reads both when it builds its config
+os.environ['MYSQL_URI'] = 'sqlite://'
+os.environ['RESPONSE_CACHE'] = 'off'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app as flask_app  # noqa: E402
+from extensions import db  # noqa: E402
+from models import NewsArticle, User  # noqa: E402
+
+CATEGORIES = ['politics', 'sports', 'business']
+
+
+@pytest.fixture
+def app():
+    with flask_app.app_context():
+        db.create_all()
+    yield flask_app
+    with flask_app.app_context():
+        db.session.remove()
+        db.drop_all()
+        # The FTS5 table is created with news_article but is not in the metadata
+        db.session.execute(text('DROP TABLE IF EXISTS news_article_fts'))
+        db.session.commit()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def seed(app):
+    """seed(n_articles, n_reporters) -> reporter ids; one reporter per article by default"""
+    def seed_articles(n_articles, n_reporters=None):
+        n_reporters = n_reporters or n_articles
+        with app.app_context():
+            reporters = [User(name='Reporter %d' % i, email='reporter%d@example.com' % i, role='reporter')
+                         for i in range(n_reporters)]
+            db.session.add_all(reporters)
+            db.session.flush()
+            start = datetime(2024, 1, 1)
+            db.session.add_all([
+                NewsArticle(title='Article %d' % i, content='<p>Body of article %d</p>' % i,
+                            reporter_id=reporters[i % n_reporters].id, category=CATEGORIES[i % len(CATEGORIES)],
+                            created_at=start + timedelta(minutes=i))
+                for i in range(n_articles)
+            ])
+            db.session.commit()
+            return [r.id for r in reporters]
+    return seed_articles
+
+
+@pytest.fixture
+def count_queries(app):
+    """Context manager collecting the SQL statements run inside it"""
+    with app.app_context():
+        engine = db.engine
+
+    @contextmanager
+    def counting():
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine, 'before_cursor_execute', record)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, 'before_cursor_execute', record)
+    return counting
@@ -0,0 +1,73 @@
+import os
+import pytest
+from flask_migrate import upgrade
+from sqlalchemy import event, text
+from extensions import db
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
+
+# Each feed shape must be an index range scan in (created_at, id) order, not
+# a table scan followed by a sort
+FEED_INDEXES = [
+    ('/api/news', 'ix_news_article_created_at_id'),
+    ('/api/news?category=sports', 'ix_news_article_category_created_at_id'),
+    ('/api/news/reporter/{reporter_id}', 'ix_news_article_reporter_created_at_id'),
+]
+
+
+@pytest.fixture
+def migrated(app):
+    """Schema built by the migrations (as deployed) rather than db.create_all()"""
+    with app.app_context():
+        db.drop_all()
+        db.session.execute(text('DROP TABLE IF EXISTS news_article_fts'))
+        db.session.commit()
+        upgrade(directory=MIGRATIONS_DIR)
+    yield
+    with app.app_context():
+        db.session.execute(text('DROP TABLE IF EXISTS alembic_version'))
+        db.session.commit()
+
+
+def feed_query(app, client, url):
+    """The SELECT (and its parameters) a feed request sends to the database"""
+    with app.app_context():
+        engine = db.engine
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append((statement, parameters))
+
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        response = client.get(url)
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    assert response.status_code == 200
+    assert len(executed) == 1
+    return response.get_json(), executed[0]
+
+
+def query_plan(app, statement, parameters):
+    """Detail column of SQLite's EXPLAIN QUERY PLAN, one line per step"""
+    with app.app_context():
+        rows = db.session.connection().exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).all()
+    return [row[-1] for row in rows]
+
+
+@pytest.mark.parametrize('page', [1, 2])
+@pytest.mark.parametrize('url, index', FEED_INDEXES)
+def test_feed_uses_its_index(app, migrated, client, seed, url, index, page):
+    reporter_ids = seed(300, n_reporters=10)
+    url = url.format(reporter_id=reporter_ids[0])
+    url += ('&' if '?' in url else '?') + 'limit=10'
+    if page == 2:
+        first, _ = feed_query(app, client, url)
+        url += '&cursor=' + first['next_cursor']
+    _, (statement, parameters) = feed_query(app, client, url)
+    plan = query_plan(app, statement, parameters)
+    news_article_steps = [step for step in plan if 'news_article' in step]
+    assert any(('USING INDEX %s' % index) in step or ('USING COVERING INDEX %s' % index) in step
+               for step in news_article_steps), plan
+    assert not any(step.startswith('SCAN news_article') and 'INDEX' not in step for step in news_article_steps), plan
+    assert not any('TEMP B-TREE' in step for step in plan), plan
@@ -0,0 +1,42 @@
+import pytest
+
+# Listings and article pages must not issue one query per article or reporter
+N_ARTICLES = 30
+
+
+def queries_for(client, count_queries, url):
+    with count_queries() as statements:
+        response = client.get(url)
+    assert response.status_code == 200
+    return len(statements)
+
+
+@pytest.mark.parametrize('view', ['', '&view=full'])
+@pytest.mark.parametrize('n_articles', [1, N_ARTICLES])
+def test_feed_query_count(client, seed, count_queries, n_articles, view):
+    seed(n_articles)
+    assert queries_for(client, count_queries, '/api/news?limit=50' + view) == 1
+
+
+@pytest.mark.parametrize('view', ['', '&view=full'])
+@pytest.mark.parametrize('n_articles', [1, N_ARTICLES])
+def test_reporter_feed_query_count(client, seed, count_queries, n_articles, view):
+    reporter_id = seed(n_articles, n_reporters=1)[0]
+    assert queries_for(client, count_queries, '/api/news/reporter/%d?limit=50%s' % (reporter_id, view)) == 1
+
+
+@pytest.mark.parametrize('n_articles', [1, N_ARTICLES])
+def test_article_query_count(client, seed, count_queries, n_articles):
+    seed(n_articles)
+    assert queries_for(client, count_queries, '/api/news/%d' % n_articles) == 1
+
+
+def test_later_page_query_count(client, seed, count_queries):
+    seed(N_ARTICLES)
+    first = client.get('/api/news?limit=5').get_json()
+    assert len(first['articles']) == 5
+    with count_queries() as statements:
+        page = client.get('/api/news?limit=20&view=full&cursor=' + first['next_cursor']).get_json()
+    assert len(page['articles']) == 20
+    assert [a['author'] for a in page['articles']] == ['Reporter %d' % i for i in range(24, 4, -1)]
+    assert len(statements) == 1
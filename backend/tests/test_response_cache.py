@@ -0,0 +1,151 @@
+import time
+import pytest
+from flask import Flask
+from flask_jwt_extended import create_access_token
+import blueprints.news
+from extensions import db, response_cache
+from models import User
+from response_cache import ResponseCache
+
+
+@pytest.fixture(params=['local', 'shared'])
+def cache(app, request):
+    """The app's response cache switched on ('shared' uses the in-process Redis stand-in)"""
+    app.config['RESPONSE_CACHE'] = request.param
+    response_cache.init_app(app)
+    yield response_cache
+    app.config['RESPONSE_CACHE'] = 'off'
+    response_cache.init_app(app)
+
+
+@pytest.fixture
+def seeded(seed):
+    """Three articles by three reporters: politics by r0, sports by r1, business by r2"""
+    return seed(3)
+
+
+def bearer(app, user_id, role):
+    with app.app_context():
+        return {'Authorization': 'Bearer ' + create_access_token(identity=str(user_id), additional_claims={'role': role})}
+
+
+def warm(client, urls):
+    for url in urls:
+        assert client.get(url).headers['X-Cache'] == 'MISS'
+        assert client.get(url).headers['X-Cache'] == 'HIT'
+
+
+def cache_status(client, urls):
+    return {url: client.get(url).headers['X-Cache'] for url in urls}
+
+
+def test_etag_and_last_modified_revalidate(client, cache, seeded):
+    first = client.get('/api/news')
+    assert first.status_code == 200 and first.headers['X-Cache'] == 'MISS'
+    assert first.headers['ETag'] and first.headers['Last-Modified']
+    assert 'no-cache' in first.headers['Cache-Control']
+
+    not_modified = client.get('/api/news', headers={'If-None-Match': first.headers['ETag']})
+    assert not_modified.status_code == 304 and not_modified.data == b''
+    assert client.get('/api/news', headers={'If-Modified-Since': first.headers['Last-Modified']}).status_code == 304
+
+    hit = client.get('/api/news')
+    assert hit.headers['X-Cache'] == 'HIT'
+    assert hit.headers['ETag'] == first.headers['ETag'] and hit.data == first.data
+    assert client.get('/api/news', headers={'If-None-Match': '"stale"'}).status_code == 200
+
+
+def test_post_invalidates_only_the_listings_it_appears_in(app, client, cache, seeded):
+    r0, r1, r2 = seeded
+    urls = ['/api/news', '/api/news?category=sports', '/api/news?category=politics',
+            '/api/news/reporter/%d' % r1, '/api/news/reporter/%d' % r2, '/api/news/1']
+    warm(client, urls)
+    response = client.post('/api/news', headers=bearer(app, r1, 'reporter'),
+                           json={'title': 'Late goal', 'content': '<p>Match report</p>', 'category': 'sports'})
+    assert response.status_code == 200
+    assert cache_status(client, urls) == {
+        '/api/news': 'MISS', '/api/news?category=sports': 'MISS', '/api/news?category=politics': 'HIT',
+        '/api/news/reporter/%d' % r1: 'MISS', '/api/news/reporter/%d' % r2: 'HIT', '/api/news/1': 'HIT',
+    }
+    assert client.get('/api/news').get_json()['articles'][0]['title'] == 'Late goal'
+
+
+def test_delete_invalidates_the_article_and_its_listings(app, client, cache, seeded):
+    r0, r1, r2 = seeded
+    urls = ['/api/news', '/api/news?category=politics', '/api/news?category=sports',
+            '/api/news/reporter/%d' % r0, '/api/news/reporter/%d' % r1, '/api/news/2']
+    warm(client, urls)
+    # Article 1 is r0's politics article
+    assert client.delete('/api/news/1', headers=bearer(app, r0, 'reporter')).status_code == 200
+    assert cache_status(client, urls) == {
+        '/api/news': 'MISS', '/api/news?category=politics': 'MISS', '/api/news?category=sports': 'HIT',
+        '/api/news/reporter/%d' % r0: 'MISS', '/api/news/reporter/%d' % r1: 'HIT', '/api/news/2': 'HIT',
+    }
+    assert client.get('/api/news/1').status_code == 404
+    assert [a['id'] for a in client.get('/api/news').get_json()['articles']] == [3, 2]
+
+
+def test_revoke_invalidates_pages_showing_the_reporter(app, client, cache, seeded):
+    r0, r1, r2 = seeded
+    with app.app_context():
+        admin = User(name='Admin', email='admin@example.com', role='admin', is_approved=True)
+        db.session.add(admin)
+        db.session.commit()
+        admin_id = admin.id
+    urls = ['/api/news', '/api/news?category=politics', '/api/news?category=sports',
+            '/api/news/reporter/%d' % r0, '/api/news/1', '/api/news/2']
+    warm(client, urls)
+    assert client.post('/api/admin/revoke', headers=bearer(app, admin_id, 'admin'),
+                       json={'user_id': r0}).status_code == 200
+    assert cache_status(client, urls) == {
+        '/api/news': 'MISS', '/api/news?category=politics': 'MISS', '/api/news?category=sports': 'HIT',
+        '/api/news/reporter/%d' % r0: 'MISS', '/api/news/1': 'MISS', '/api/news/2': 'HIT',
+    }
+
+
+def test_entries_expire_after_the_ttl(client, cache, seeded):
+    cache.backend.ttl = 0.05
+    warm(client, ['/api/news'])
+    time.sleep(0.1)
+    assert client.get('/api/news').headers['X-Cache'] == 'MISS'
+
+
+def test_invalidation_while_the_view_runs_is_not_stored(client, cache, seeded, monkeypatch):
+    author_tags = blueprints.news.author_tags
+
+    def revoke_during_view(reporter_ids):
+        # A revoke committing after the view read its rows but before the
+        # cache reads the author tag versions
+        tags = author_tags(reporter_ids)
+        response_cache.invalidate(tags)
+        return tags
+
+    monkeypatch.setattr(blueprints.news, 'author_tags', revoke_during_view)
+    assert client.get('/api/news').headers['X-Cache'] == 'MISS'
+    monkeypatch.setattr(blueprints.news, 'author_tags', author_tags)
+    # Nothing was stored, so the next read rebuilds the page
+    assert client.get('/api/news').headers['X-Cache'] == 'MISS'
+    assert client.get('/api/news').headers['X-Cache'] == 'HIT'
+
+
+@pytest.mark.parametrize('config, error', [
+    ({'RESPONSE_CACHE': 'local', 'WORKERS': 2}, "'local' is per process"),
+    ({'RESPONSE_CACHE': 'shared', 'WORKERS': 2}, 'needs RESPONSE_CACHE_URL'),
+    ({'RESPONSE_CACHE': 'redis'}, "must be 'local', 'shared' or 'off'"),
+])
+def test_unsafe_configurations_are_refused(config, error):
+    app = Flask(__name__)
+    app.config.update(config)
+    with pytest.raises(ValueError, match=error):
+        ResponseCache(app)
+
+
+@pytest.mark.parametrize('config', [
+    {'RESPONSE_CACHE': 'local', 'WORKERS': 1},
+    {'RESPONSE_CACHE': 'shared', 'WORKERS': 1},
+    {'RESPONSE_CACHE': 'off', 'WORKERS': 4},
+])
+def test_single_process_configurations_are_accepted(config):
+    app = Flask(__name__)
+    app.config.update(config)
+    ResponseCache(app)
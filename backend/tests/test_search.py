@@ -0,0 +1,110 @@
+from datetime import datetime, timedelta
+import pytest
+from flask_jwt_extended import create_access_token
+from extensions import db
+from models import NewsArticle, User
+import search
+
+ARTICLES = [
+    # (title, content), oldest first
+    ('Council budget approved', '<p>The river flood defences get more money this year.</p>'),
+    ('Flood warning for the valley', '<p>Residents near the river should prepare.</p>'),
+    ('Market report', '<p>Prices were flat. Nothing about a flood here.</p>'),
+    ('Weekend fixtures', '<p>Football and cricket across the county.</p>'),
+]
+
+
+@pytest.fixture
+def reporter_id(app):
+    with app.app_context():
+        reporter = User(name='Reporter', email='reporter@example.com', role='reporter')
+        db.session.add(reporter)
+        db.session.flush()
+        start = datetime(2024, 1, 1)
+        db.session.add_all([NewsArticle(title=title, content=content, reporter_id=reporter.id,
+                                        created_at=start + timedelta(hours=i))
+                            for i, (title, content) in enumerate(ARTICLES)])
+        db.session.commit()
+        return reporter.id
+
+
+def bearer(app, user_id):
+    with app.app_context():
+        return {'Authorization': 'Bearer ' + create_access_token(identity=str(user_id),
+                                                                  additional_claims={'role': 'reporter'})}
+
+
+def titles(response):
+    assert response.status_code == 200
+    return [r['title'] for r in response.get_json()['results']]
+
+
+def test_title_matches_rank_first(client, reporter_id):
+    found = titles(client.get('/api/news/search?q=flood'))
+    assert found[0] == 'Flood warning for the valley'
+    assert set(found) == {'Flood warning for the valley', 'Council budget approved', 'Market report'}
+
+
+def test_every_word_must_match(client, reporter_id):
+    assert titles(client.get('/api/news/search?q=river flood')) == ['Flood warning for the valley',
+                                                                    'Council budget approved']
+    assert titles(client.get('/api/news/search?q=flood cricket')) == []
+
+
+def test_pages_follow_the_ranking(client, reporter_id):
+    everything = titles(client.get('/api/news/search?q=flood'))
+    first = client.get('/api/news/search?q=flood&limit=2').get_json()
+    assert first['page'] == 1 and first['next_page'] == 2
+    second = client.get('/api/news/search?q=flood&limit=2&page=2').get_json()
+    assert second['next_page'] is None
+    assert [r['title'] for r in first['results'] + second['results']] == everything
+
+
+def test_snippet_highlights_matches_and_escapes_html(app, client, reporter_id):
+    with app.app_context():
+        db.session.add(NewsArticle(title='Injection attempt', reporter_id=reporter_id,
+                                   content='<p>Quoted markup &lt;script&gt;alert(1)&lt;/script&gt; near a flood</p>'))
+        db.session.commit()
+    results = client.get('/api/news/search?q=script flood').get_json()['results']
+    assert [r['title'] for r in results] == ['Injection attempt']
+    snippet = results[0]['snippet']
+    assert '&lt;<mark>script</mark>&gt;' in snippet
+    assert '<mark>flood</mark>' in snippet
+    assert '<script>' not in snippet
+
+
+def test_highlight_cuts_a_window_around_the_densest_matches():
+    text = ' '.join(['filler'] * 100 + ['flood', 'river', 'flood'] + ['filler'] * 100)
+    snippet = search.highlight(text, ['flood', 'river'], width=60)
+    assert snippet.startswith('...') and snippet.endswith('...')
+    assert snippet.count('<mark>') == 3
+
+
+def test_posted_and_deleted_articles_update_the_index(app, client, reporter_id):
+    headers = bearer(app, reporter_id)
+    assert titles(client.get('/api/news/search?q=tornado')) == []
+    assert client.post('/api/news', headers=headers,
+                       json={'title': 'Tornado touches down', 'content': '<p>Roofs lost</p>'}).status_code == 200
+    results = client.get('/api/news/search?q=tornado').get_json()['results']
+    assert [r['title'] for r in results] == ['Tornado touches down']
+    assert client.delete('/api/news/%d' % results[0]['id'], headers=headers).status_code == 200
+    assert titles(client.get('/api/news/search?q=tornado')) == []
+
+
+def test_query_operators_are_matched_literally(client, reporter_id):
+    assert titles(client.get('/api/news/search?q="flood" OR NEAR(')) == []
+    assert titles(client.get('/api/news/search?q=flood*'))[0] == 'Flood warning for the valley'
+
+
+def test_empty_query_is_rejected(client, reporter_id):
+    response = client.get('/api/news/search?q=%20!!')
+    assert response.status_code == 400
+    assert response.get_json() == {'msg': 'Missing search query'}
+
+
+def test_other_databases_fall_back_to_like(app, client, reporter_id, monkeypatch):
+    with app.app_context():
+        monkeypatch.setattr(db.engine.dialect, 'name', 'postgresql')
+    assert titles(client.get('/api/news/search?q=flood')) == [
+        'Flood warning for the valley', 'Market report', 'Council budget approved']
+    assert titles(client.get('/api/news/search?q=river flood&limit=1')) == ['Flood warning for the valley']
@@ -1,4 +1,14 @@
 # utils.py
 # Utility functions for the backend (e.g., email sending)
 
-# TODO: Implement email sending for license keys 
\ No newline at end of file
+import html
+import re
+
+TAG_RE = re.compile(r'<[^>]*(>|$)')
+
+
+def html_to_text(content_html):
+    """Visible text of an HTML fragment with whitespace collapsed"""
+    return ' '.join(html.unescape(TAG_RE.sub(' ', content_html or '')).split())
+
+# TODO: Implement email sending for license keys
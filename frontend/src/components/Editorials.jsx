@@ -6,7 +6,8 @@ export const Editorials = () => {
 
   const [news, setNews] = useState([]);
   useEffect(() => {
-    api.get('/news').then(res => setNews(res.data));
+    // Only the four newest articles are shown
+    api.get('/news', { params: { limit: 4 } }).then(res => setNews(res.data.articles));
   }, []);
 
   // Split featured (first) and rest
@@ -25,7 +26,7 @@ export const Editorials = () => {
             <NewsCard
               id={featured.id}
               title={featured.title}
-              content={featured.content}
+              excerpt={featured.excerpt}
               author={featured.author}
               date={featured.created_at}
               image={featured.cover_image}
@@ -42,7 +43,7 @@ export const Editorials = () => {
               key={article.id}
               id={article.id}
               title={article.title}
-              content={article.content}
+              excerpt={article.excerpt}
               author={article.author}
               date={article.created_at}
               image={article.cover_image}
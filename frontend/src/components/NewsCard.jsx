@@ -1,13 +1,17 @@
 import { useNavigate } from 'react-router-dom';
 
-function truncateHtml(html, maxLength) {
-  const div = document.createElement('div');
-  div.innerHTML = html;
-  let text = div.textContent || div.innerText || '';
+function truncateText(text, maxLength) {
+  text = text || '';
   if (text.length > maxLength) text = text.slice(0, maxLength) + '...';
   return text;
 }
 
+function truncateHtml(html, maxLength) {
+  // DOMParser builds an inert document: no scripts run and no images load
+  const doc = new DOMParser().parseFromString(html || '', 'text/html');
+  return truncateText(doc.body.textContent, maxLength);
+}
+
 function getTimeAgo(date) {
   if (!date) return '';
   const now = new Date();
@@ -29,6 +33,7 @@ export default function NewsCard({
   id,
   title,
   content,
+  excerpt, // plain text (the listing API's excerpt); shown as-is, never parsed as HTML
   author,
   date,
   image,
@@ -40,6 +45,7 @@ export default function NewsCard({
   const displayImg = image;
   const displayTag = tag;
   const displayTime = time || getTimeAgo(date);
+  const summary = (maxLength) => excerpt != null ? truncateText(excerpt, maxLength) : truncateHtml(content, maxLength);
 
   if (layout === 'hero') {
     return (
@@ -80,7 +86,7 @@ export default function NewsCard({
             {title}
           </h2>
           <p className="text-white/90 text-base font-medium drop-shadow mb-2">
-            {truncateHtml(content, 100)}
+            {summary(100)}
           </p>
         </div>
       </div>
@@ -105,7 +111,7 @@ export default function NewsCard({
           {title}
         </h3>
         <p className="text-gray-600 text-xs mb-2 line-clamp-2">
-          {truncateHtml(content, 60)}
+          {summary(60)}
         </p>
         {/* Time and category row */}
         <div className="flex items-center gap-2 text-xs text-gray-600 mt-auto">
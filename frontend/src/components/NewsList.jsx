@@ -7,17 +7,20 @@ export const NewsList = () => {
 
   const { user, token } = useAuth();
   const [articles, setArticles] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
 
-  useEffect(() => {
-    if (!user?.id) return;
+  // Fetches one page; cursor is the previous page's next_cursor (null for the first page)
+  const fetchPage = (cursor) => {
     setLoading(true);
     api.get(`/news/reporter/${user.id}`, {
-      headers: { Authorization: `Bearer ${token}` }
+      headers: { Authorization: `Bearer ${token}` },
+      params: cursor ? { cursor } : {}
     })
       .then(res => {
-        setArticles(res.data);
+        setArticles(articles => cursor ? [...articles, ...res.data.articles] : res.data.articles);
+        setNextCursor(res.data.next_cursor);
         setError(null);
       })
       .catch(err => {
@@ -25,6 +28,11 @@ export const NewsList = () => {
         setArticles([]);
       })
       .finally(() => setLoading(false));
+  };
+
+  useEffect(() => {
+    if (!user?.id) return;
+    fetchPage(null);
   }, []);
 
   const handleDelete = async (id) => {
@@ -42,7 +50,7 @@ export const NewsList = () => {
     }
   };
 
-  if (loading) return <div className="text-gray-500">Loading articles...</div>;
+  if (loading && !articles.length) return <div className="text-gray-500">Loading articles...</div>;
   if (error) return <div className="text-red-600">{error}</div>;
   if (!articles.length) return <div className="text-gray-500">No articles posted yet.</div>;
 
@@ -68,11 +76,20 @@ export const NewsList = () => {
               </button>
             </div>
             <div className="text-sm text-gray-700 mb-1"><b>Category:</b> {article.category || 'Uncategorized'}</div>
-            <div className="text-sm text-gray-600 line-clamp-3" dangerouslySetInnerHTML={{ __html: article.content }} />
+            <div className="text-sm text-gray-600 line-clamp-3">{article.excerpt}</div>
           </div>
           
         </div>
       ))}
+      {nextCursor && (
+        <button
+          className="w-full py-2 text-sm font-semibold text-red-900 border border-red-900 rounded-lg hover:bg-red-50 disabled:opacity-50"
+          onClick={() => fetchPage(nextCursor)}
+          disabled={loading}
+        >
+          {loading ? 'Loading...' : 'Load more'}
+        </button>
+      )}
     </div>
   );
 }
@@ -1,87 +1,219 @@
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, request, jsonify, render_template, Response, stream_with_context, g
 import torch
 import torch.nn as nn
-import re
-from collections import Counter
-from itertools import chain
 import os
+import json
+import threading
+from typing import NamedTuple, Optional
+from batcher import MicroBatcher
+from sentiment import versions
+from sentiment.model import BiGRU_CNN, MODEL_CONFIG_KEYS, ENGINE_FILES, WEIGHTS_FILE, load_trained_model
+from sentiment.tokenizer import BatchTokenizer, load_vocab, vocab_exists, vocab_paths
+from sentiment.inference import format_prediction
+from cache import PredictionCache, cache_key
+import hmac
+import math
+import time
+from metrics import Registry, SamplingProfiler
 
 app = Flask(__name__)
 
-# Model class definition (same as in sentiment_analyzer.py)
-class BiGRU_CNN(nn.Module):
-    def __init__(self, vocab_size, embedding_dim, hidden_dim, output_dim, n_layers, bidirectional, dropout_gru, cnn_kernel_sizes, cnn_num_filters, dropout_cnn, fc_hidden_dim, dropout_fc, pad_idx):
-        super().__init__()
-        self.embedding = nn.Embedding(vocab_size, embedding_dim, padding_idx=pad_idx)
-        self.gru = nn.GRU(embedding_dim, hidden_dim, num_layers=n_layers,
-                            bidirectional=bidirectional, batch_first=True, dropout=dropout_gru)
-        self.convs = nn.ModuleList([
-            nn.Conv1d(in_channels=hidden_dim*2, out_channels=cnn_num_filters, kernel_size=k)
-            for k in cnn_kernel_sizes
-        ])
-        self.dropout_cnn = nn.Dropout(dropout_cnn)
-        self.fc1 = nn.Linear(len(cnn_kernel_sizes)*cnn_num_filters, fc_hidden_dim)
-        self.dropout_fc = nn.Dropout(dropout_fc)
-        self.fc2 = nn.Linear(fc_hidden_dim, output_dim)
-    
-    def forward(self, text):
-        assert (text < self.embedding.num_embeddings).all(), f"Input index out of range for embedding: max {text.max().item()}, vocab size {self.embedding.num_embeddings}"
-        embedded = self.embedding(text)
-        gru_out, _ = self.gru(embedded)
-        gru_out = gru_out.permute(0, 2, 1)
-        conv_outs = [torch.relu(conv(gru_out)) for conv in self.convs]
-        pooled = [torch.max(conv_out, dim=2)[0] for conv_out in conv_outs]
-        cat = torch.cat(pooled, dim=1)
-        x = self.dropout_cnn(cat)
-        x = torch.relu(self.fc1(x))
-        x = self.dropout_fc(x)
-        return self.fc2(x)
-
-# Global variables for model and vocab
-model = None
-vocab = None
+class ServingModel(NamedTuple):
+    """One loaded model version: weights, tokenizer and optional student.
+
+    Never modified in place: a new version is loaded into a new instance and
+    `current` is rebound to it. Each request reads `current` once and scores
+    with that instance throughout, so requests already running when a swap
+    happens finish on the old version.
+    """
+    model: object
+    tokenizer: BatchTokenizer
+    # The convolutions need at least as many positions as their widest kernel
+    min_seq_len: int
+    version: str
+    model_dir: str
+    engine: str
+    # Registry version name, when serving from SENTIMENT_MODEL_REGISTRY
+    label: Optional[str] = None
+    student: object = None
+    student_min_seq_len: int = 1
+    # Weights memory-mapped from the (immutable) registry files
+    mapped: bool = False
+    loaded_at: float = 0.0
+
+# The live model version (None until load_model() succeeds)
+current = None
 device = None
+batcher = None
+model_watcher = None
+# Serializes swaps; scoring never takes it
+swap_lock = threading.Lock()
 MAX_SEQ_LEN = 512
 
-def load_model():
-    global model, vocab, device
-    
-    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-    print(f"Using device: {device}")
-    
-    # Model hyperparameters - updated to match the trained model
-    VOCAB_SIZE = 20002  # Updated to match the trained model
-    EMBEDDING_DIM = 256
-    HIDDEN_DIM = 250
-    OUTPUT_DIM = 1
-    N_LAYERS = 1
-    BIDIRECTIONAL = True
-    DROPOUT_LSTM = 0.0  # Set to 0 since num_layers=1
-    CNN_KERNEL_SIZES = [2, 3, 4, 5]
-    CNN_NUM_FILTERS = 96
-    DROPOUT_CNN = 0.4
-    FC_HIDDEN_DIM = 32
-    DROPOUT_FC = 0.4
-    PAD_IDX = 0
-    
-    # Initialize model
-    model = BiGRU_CNN(VOCAB_SIZE, EMBEDDING_DIM, HIDDEN_DIM, OUTPUT_DIM, N_LAYERS, 
-                      BIDIRECTIONAL, DROPOUT_LSTM, CNN_KERNEL_SIZES, CNN_NUM_FILTERS, 
-                      DROPOUT_CNN, FC_HIDDEN_DIM, DROPOUT_FC, PAD_IDX).to(device)
-    
-    # Load trained model weights
-    model_path = 'result/bigru_cnn_sentiment.pt'
-    if os.path.exists(model_path):
-        model.load_state_dict(torch.load(model_path, map_location=device))
-        model.eval()
-        print(f"Model loaded from {model_path}")
+# Micro-batching: concurrent /api/predict calls are grouped into one forward
+# pass of up to BATCH_MAX_SIZE texts, waiting at most BATCH_MAX_WAIT_MS
+BATCH_MAX_SIZE = int(os.environ.get('SENTIMENT_BATCH_MAX_SIZE', 32))
+BATCH_MAX_WAIT_MS = float(os.environ.get('SENTIMENT_BATCH_MAX_WAIT_MS', 5))
+
+# Bulk scoring: texts are length-bucketed into forward passes of at most
+# PREDICT_BUCKET_SIZE; JSON requests accept up to PREDICT_BATCH_MAX_TEXTS texts,
+# NDJSON streams are scored PREDICT_STREAM_CHUNK lines at a time
+PREDICT_BUCKET_SIZE = int(os.environ.get('SENTIMENT_BUCKET_SIZE', 64))
+PREDICT_BATCH_MAX_TEXTS = int(os.environ.get('SENTIMENT_BATCH_MAX_TEXTS', 1000))
+PREDICT_STREAM_CHUNK = int(os.environ.get('SENTIMENT_STREAM_CHUNK', 512))
+
+# Long documents: split into MAX_SEQ_LEN-token windows starting every
+# LONG_STRIDE tokens (overlap = MAX_SEQ_LEN - LONG_STRIDE), scored together in
+# forward passes of up to LONG_WINDOW_BATCH windows
+LONG_STRIDE = max(1, int(os.environ.get('SENTIMENT_LONG_STRIDE', 384)))
+LONG_WINDOW_BATCH = int(os.environ.get('SENTIMENT_LONG_WINDOW_BATCH', 32))
+
+# Prediction cache: LRU over normalized text + model version, bounded by entry
+# count and approximate memory; set SENTIMENT_CACHE_MAX_ENTRIES=0 to disable
+CACHE_MAX_ENTRIES = int(os.environ.get('SENTIMENT_CACHE_MAX_ENTRIES', 10000))
+CACHE_MAX_MB = float(os.environ.get('SENTIMENT_CACHE_MAX_MB', 16))
+prediction_cache = (PredictionCache(CACHE_MAX_ENTRIES, int(CACHE_MAX_MB * 1024 * 1024))
+                    if CACHE_MAX_ENTRIES > 0 else None)
+
+# Instrumentation exported on /api/metrics (Prometheus text format); with
+# serve.py every worker keeps its own counters
+registry = Registry()
+REQUESTS = registry.counter('sentiment_requests_total', 'HTTP requests by endpoint and status', ['endpoint', 'status'])
+REQUEST_LATENCY = registry.histogram('sentiment_request_duration_seconds', 'End-to-end request latency', ['endpoint'])
+IN_FLIGHT = registry.gauge('sentiment_requests_in_flight', 'Requests currently being handled', ['endpoint'])
+ERRORS = registry.counter('sentiment_errors_total', 'Failed predictions and 5xx responses', ['kind'])
+STAGE_LATENCY = registry.histogram('sentiment_stage_duration_seconds',
+                                   'Time per hot-path stage: parse, tokenize, encode, forward, postprocess', ['stage'])
+CACHE_EVENTS = registry.counter('sentiment_cache_events_total', 'Prediction cache hits, misses and evictions', ['event'])
+CACHE_ENTRIES = registry.gauge('sentiment_cache_entries', 'Entries held by the prediction cache')
+BATCHER_QUEUE = registry.gauge('sentiment_batcher_queue_depth', 'Requests waiting for the micro-batcher')
+BATCHER_TOTALS = registry.counter('sentiment_batcher_total', 'Micro-batches run and items scored', ['kind'])
+ROUTED = registry.counter('sentiment_routed_texts_total', 'Texts scored by the student or the main model', ['model'])
+MODEL_SWAPS = registry.counter('sentiment_model_swaps_total', 'Hot model swaps by result', ['result'])
+# Sampling profiler, switched on and off at runtime through /api/profiler
+profiler = SamplingProfiler()
+# Shortest sampling interval /api/profiler accepts; below it the sampler
+# thread would take most of a core from the requests it is measuring
+PROFILER_MIN_INTERVAL_MS = 1.0
+# Bearer token for the admin endpoints (profiler); without one they only
+# answer requests from this machine
+ADMIN_TOKEN = os.environ.get('SENTIMENT_ADMIN_TOKEN')
+LOOPBACK_ADDRS = {'127.0.0.1', '::1'}
+
+# Model hyperparameters - updated to match the trained model
+VOCAB_SIZE = 20002  # Updated to match the trained model
+EMBEDDING_DIM = 256
+HIDDEN_DIM = 250
+OUTPUT_DIM = 1
+N_LAYERS = 1
+BIDIRECTIONAL = True
+DROPOUT_LSTM = 0.0  # Set to 0 since num_layers=1
+CNN_KERNEL_SIZES = [2, 3, 4, 5]
+CNN_NUM_FILTERS = 96
+DROPOUT_CNN = 0.4
+FC_HIDDEN_DIM = 32
+DROPOUT_FC = 0.4
+PAD_IDX = 0
+
+# Inference engine: 'eager' (fp32 state dict), 'quantized' (dynamic INT8
+# GRU/Linear, 8-bit embedding) or 'scripted' (TorchScript fp32); the last two
+# are written by export_model.py
+MODEL_DIR = os.environ.get('SENTIMENT_MODEL_DIR', 'result')
+MODEL_PATH = os.path.join(MODEL_DIR, WEIGHTS_FILE)
+ENGINE_PATHS = {engine: os.path.join(MODEL_DIR, name) for engine, name in ENGINE_FILES.items()}
+MODEL_ENGINE = os.environ.get('SENTIMENT_ENGINE', 'eager')
+# Training vocabulary saved by sentiment_analyzer.py (vocab.txt + vocab_ids.npy)
+VOCAB_PATH = os.path.join(MODEL_DIR, 'vocab')
+# Hyperparameters saved by sentiment_analyzer.py; overrides the values above
+CONFIG_PATH = os.path.join(MODEL_DIR, 'config.json')
+# Distilled student (sentiment_analyzer.py --distill-from): texts of at most
+# STUDENT_MAX_TOKENS tokens are scored by it, longer ones by the main model;
+# SENTIMENT_STUDENT_MAX_TOKENS=0 turns routing off
+# (default: the model directory's student/)
+STUDENT_DIR = os.environ.get('SENTIMENT_STUDENT_DIR')
+STUDENT_MAX_TOKENS = int(os.environ.get('SENTIMENT_STUDENT_MAX_TOKENS', 64))
+# Versioned model registry (sentiment/versions.py): one model directory per
+# version plus a CURRENT file naming the live one; replaces MODEL_DIR when set
+MODEL_REGISTRY = os.environ.get('SENTIMENT_MODEL_REGISTRY')
+# Seconds between checks of the registry's CURRENT for a new live version;
+# 0 turns the watcher off. Without a registry nothing is watched: files in
+# MODEL_DIR are rewritten one at a time, so polling them could load weights,
+# vocabulary and config from different training runs
+MODEL_POLL_SECONDS = float(os.environ.get('SENTIMENT_MODEL_POLL_SECONDS', 5))
+# Scored by a newly loaded version before it takes traffic, so the first real
+# requests do not pay for allocator growth and kernel selection
+WARMUP_TEXTS = [
+    "Great film.",
+    "The plot was thin and the acting wooden, but the soundtrack almost saved it.",
+    " ".join(["A long, careful review that goes on about the cast, the script and the pacing."] * 40),
+]
+
+def model_config(model_dir):
+    """The serving hyperparameters above, overridden by config.json in model_dir"""
+    config = {key: globals()[key] for key in MODEL_CONFIG_KEYS}
+    path = os.path.join(model_dir, 'config.json')
+    if os.path.exists(path):
+        with open(path) as f:
+            config.update((key, value) for key, value in json.load(f).items() if key in MODEL_CONFIG_KEYS)
+    return config
+
+def load_model_config():
+    """Apply the hyperparameters saved next to the weights, if any"""
+    globals().update(model_config(MODEL_DIR))
+
+def build_model(config=None):
+    """Create an untrained BiGRU_CNN with the serving hyperparameters (or those in config)"""
+    config = config or model_config(MODEL_DIR)
+    return BiGRU_CNN(*(config[key] for key in MODEL_CONFIG_KEYS))
+
+def load_weights(net, path, device, mmap=False):
+    """Load a state dict into net.
+
+    With mmap the parameters point straight into the file: pages are read on
+    first use instead of copied onto the heap, and every process mapping the
+    file shares them. Only safe for files that are never rewritten in place
+    (registry versions), as truncating a mapped file crashes its readers.
+    """
+    if not mmap:
+        net.load_state_dict(torch.load(path, map_location=device))
+        return net.to(device)
+    state = torch.load(path, map_location='cpu', mmap=True, weights_only=True)
+    net.load_state_dict(state, assign=True)
+    return net.to(device)
+
+def quantize_model(fp32_model):
+    """Dynamically quantize GRU/Linear to INT8 and the embedding weights to uint8 (CPU only)"""
+    from torch.ao.quantization import default_dynamic_qconfig, float_qparams_weight_only_qconfig
+    return torch.ao.quantization.quantize_dynamic(fp32_model.cpu().eval(), {
+        nn.GRU: default_dynamic_qconfig,
+        nn.Linear: default_dynamic_qconfig,
+        # The 20k x 256 embedding is most of the model's size
+        nn.Embedding: float_qparams_weight_only_qconfig,
+    })
+
+def load_engine(engine, device, model_dir=MODEL_DIR, config=None, mmap=False):
+    """Load the model for the given inference engine, or None if missing"""
+    if engine not in ENGINE_FILES:
+        raise ValueError(f"Unknown engine '{engine}', expected one of {sorted(ENGINE_FILES)}")
+    path = os.path.join(model_dir, ENGINE_FILES[engine])
+    eager_path = os.path.join(model_dir, WEIGHTS_FILE)
+    if engine == 'quantized' and not os.path.exists(path) and os.path.exists(eager_path):
+        # No exported artifact yet: quantizing the fp32 weights takes well under a second
+        print(f"{path} not found, quantizing {eager_path} at load time")
+        return quantize_model(load_weights(build_model(config), eager_path, 'cpu', mmap))
+    if not os.path.exists(path):
+        print(f"Warning: Model file {path} not found. Please train the model first.")
+        return None
+    if engine == 'eager':
+        loaded = load_weights(build_model(config), path, device, mmap)
     else:
-        print(f"Warning: Model file {model_path} not found. Please train the model first.")
-        return False
-    
-    # For now, create a simple vocabulary for inference
-    # In a production environment, you should save and load the actual vocabulary from training
-    vocab = {'<pad>': 0, '<unk>': 1}
+        loaded = torch.jit.load(path, map_location=device)
+    print(f"Model loaded from {path} ({engine} engine)")
+    return loaded.eval()
+
+def fallback_vocab():
+    """Small hand-written vocabulary for models trained before the vocab was saved"""
+    fallback = {'<pad>': 0, '<unk>': 1}
     
     # Add some common words to the vocabulary
     common_words = [
@@ -98,51 +230,381 @@ def load_model():
     ]
     
     for i, word in enumerate(common_words, start=2):
-        vocab[word] = i
+        fallback[word] = i
+    return fallback
+
+def set_vocab(new_vocab):
+    """Score the live model with another vocabulary (for benchmarks of models saved without one)"""
+    global current
+    current = current._replace(tokenizer=BatchTokenizer(new_vocab))
+
+def load_student(student_dir, vocab):
+    """The distilled student for short texts and its minimum length, if one was
+    trained on the same vocabulary; (None, 1) otherwise"""
+    if STUDENT_MAX_TOKENS <= 0 or not os.path.exists(os.path.join(student_dir, WEIGHTS_FILE)):
+        return None, 1
+    loaded, config, student_vocab = load_trained_model(student_dir, device)
+    if student_vocab != vocab:
+        print(f"Warning: student in {student_dir} was trained on a different vocabulary, not routing to it")
+        return None, 1
+    print(f"Student loaded from {student_dir}: texts up to {STUDENT_MAX_TOKENS} tokens are scored by it")
+    return loaded, max(config['CNN_KERNEL_SIZES'])
+
+def load_version(model_dir, engine, label=None):
+    """Load weights, vocabulary and student from model_dir; None if unusable"""
+    config = model_config(model_dir)
+    # Published versions are never modified, so their weights can be mapped
+    mapped = label is not None
+    net = load_engine(engine, device, model_dir, config, mapped)
+    if net is None:
+        return None
     
-    print("Model and vocabulary loaded successfully")
-    return True
+    vocab_path = os.path.join(model_dir, 'vocab')
+    if vocab_exists(vocab_path):
+        vocab = load_vocab(vocab_path)
+        print(f"Vocabulary loaded from {vocab_path} ({len(vocab)} words)")
+    else:
+        print(f"Warning: vocabulary {vocab_path} not found, falling back to a small built-in word list. "
+              "Retrain with sentiment_analyzer.py to save the real vocabulary.")
+        vocab = fallback_vocab()
+    
+    # Token ids only ever come from this vocabulary, so checking its range once
+    # here replaces the per-call range check that used to run in forward()
+    if max(vocab.values()) >= config['VOCAB_SIZE']:
+        print(f"Error: vocabulary has ids beyond the model's {config['VOCAB_SIZE']} embeddings")
+        return None
+    student_dir = STUDENT_DIR or os.path.join(model_dir, versions.STUDENT_DIR)
+    student, student_min_seq_len = load_student(student_dir, vocab)
+    
+    # Cached predictions are only valid for the exact weights and vocabulary
+    weights_path = os.path.join(model_dir, ENGINE_FILES[engine])
+    if not os.path.exists(weights_path):
+        weights_path = os.path.join(model_dir, WEIGHTS_FILE)
+    version_paths = [weights_path, *vocab_paths(vocab_path)]
+    if student is not None:
+        version_paths.append(os.path.join(student_dir, WEIGHTS_FILE))
+    version = f"{engine}-{versions.file_fingerprint(version_paths)}"
+    if label is not None:
+        version = f"{label}-{version}"
+    return ServingModel(net, BatchTokenizer(vocab), max(config['CNN_KERNEL_SIZES']), version, model_dir, engine,
+                        label, student, student_min_seq_len, mapped, time.time())
+
+def live_model_dir():
+    """(directory, registry version name) of the model that should be served"""
+    if MODEL_REGISTRY:
+        label = versions.current_version(MODEL_REGISTRY)
+        if label is not None:
+            return versions.version_dir(MODEL_REGISTRY, label), label
+        print(f"Warning: no versions published in {MODEL_REGISTRY}, serving {MODEL_DIR}")
+    return MODEL_DIR, None
+
+def warm_up(serving):
+    """Run every network of a new version on WARMUP_TEXTS before it takes traffic"""
+    token_lists = serving.tokenizer.tokenize_batch(WARMUP_TEXTS, MAX_SEQ_LEN)
+    with torch.no_grad():
+        for net, min_len in [(serving.model, serving.min_seq_len), (serving.student, serving.student_min_seq_len)]:
+            if net is not None:
+                net(*encode_batch(serving, token_lists, min_len))
 
-def preprocess_text(text):
-    """Preprocess text for sentiment analysis"""
-    # Convert to lowercase and tokenize
-    tokens = re.findall(r'\w+', text.lower())
+def load_model(engine=None):
+    global current, device
     
-    # Convert tokens to indices
-    ids = [vocab.get(token, vocab['<unk>']) for token in tokens]
+    engine = engine or MODEL_ENGINE
+    load_model_config()
+    # Quantized kernels only run on CPU
+    if torch.cuda.is_available() and engine != 'quantized':
+        device = torch.device("cuda")
+    else:
+        device = torch.device("cpu")
+    print(f"Using device: {device}")
+    
+    model_dir, label = live_model_dir()
+    serving = load_version(model_dir, engine, label)
+    if serving is None:
+        return False
+    warm_up(serving)
+    current = serving
+    if prediction_cache is not None:
+        prediction_cache.clear()
     
-    # Pad/truncate to MAX_SEQ_LEN
-    if len(ids) < MAX_SEQ_LEN:
-        ids += [vocab['<pad>']] * (MAX_SEQ_LEN - len(ids))
+    print(f"Model and vocabulary loaded successfully (version {current.version})")
+    return True
+
+def swap_model(model_dir, label=None):
+    """Load model_dir beside the live version, warm it up and switch to it.
+
+    Requests keep being served by the old version while the new one loads;
+    the ones already running when the switch happens finish on it. Returns
+    the new ServingModel, or None (old version kept) if loading failed.
+    """
+    global current
+    with swap_lock:
+        start = time.perf_counter()
+        try:
+            serving = load_version(model_dir, current.engine if current else MODEL_ENGINE, label)
+            if serving is not None:
+                warm_up(serving)
+        except Exception as e:
+            print(f"Error loading {model_dir}: {e}")
+            serving = None
+        if serving is None:
+            MODEL_SWAPS.inc(result='failed')
+            print(f"Model swap to {model_dir} failed; still serving {current.version if current else 'nothing'}")
+            return None
+        previous, current = current, serving
+        MODEL_SWAPS.inc(result='swapped')
+    # Old entries can no longer be hit (the version is part of the key)
+    if prediction_cache is not None:
+        prediction_cache.clear()
+    print(f"Swapped {previous.version if previous else 'nothing'} -> {serving.version} "
+          f"in {time.perf_counter() - start:.1f} s")
+    return serving
+
+def reload_live_model():
+    """Swap to the registry's live version (or re-read MODEL_DIR) unless it is already served"""
+    model_dir, label = live_model_dir()
+    if current is not None and label is not None and label == current.label:
+        return current
+    return swap_model(model_dir, label)
+
+def watch_model():
+    """Follow the registry's CURRENT, which set_current() replaces atomically"""
+    seen = versions.current_version(MODEL_REGISTRY)
+    while True:
+        time.sleep(MODEL_POLL_SECONDS)
+        try:
+            label = versions.current_version(MODEL_REGISTRY)
+        except OSError:
+            continue
+        if label != seen:
+            seen = label
+            reload_live_model()
+
+def start_model_watcher():
+    """Poll the registry for a new live version every MODEL_POLL_SECONDS in a background thread"""
+    global model_watcher
+    if model_watcher is None and MODEL_REGISTRY and MODEL_POLL_SECONDS > 0 and current is not None:
+        model_watcher = threading.Thread(target=watch_model, name="model-watcher", daemon=True)
+        model_watcher.start()
+    return model_watcher
+
+def encode_batch(serving, token_lists, min_len=None):
+    """Id matrix padded to the longest token list (not to MAX_SEQ_LEN).
+
+    Returns the ids and the real length of each row for the packed GRU.
+    """
+    ids, lengths = serving.tokenizer.to_matrix(token_lists, min_len=min_len or serving.min_seq_len)
+    # Empty texts are scored as a single pad token
+    lengths = torch.from_numpy(lengths).clamp(min=1)
+    return torch.from_numpy(ids).to(device), lengths
+
+def length_buckets(token_lists, bucket_size):
+    """Group indices of similar token length, longest first"""
+    order = sorted(range(len(token_lists)), key=lambda i: len(token_lists[i]), reverse=True)
+    return [order[i:i + bucket_size] for i in range(0, len(order), bucket_size)]
+
+def score_tokens(serving, token_lists, bucket_size=None, use_student=True):
+    """Positive-class probabilities for tokenized texts, in input order.
+
+    Texts are sorted by token length and split into buckets of at most
+    `bucket_size` items; each bucket is padded only to its own longest text
+    and scored with one forward pass. When a distilled student is loaded,
+    texts of at most STUDENT_MAX_TOKENS tokens are scored by it instead,
+    unless use_student is False.
+    """
+    probabilities = [None] * len(token_lists)
+    if serving.student is None or not use_student:
+        routes = [('main', serving.model, serving.min_seq_len, list(range(len(token_lists))))]
     else:
-        ids = ids[:MAX_SEQ_LEN]
+        short = [i for i, tokens in enumerate(token_lists) if len(tokens) <= STUDENT_MAX_TOKENS]
+        long = [i for i, tokens in enumerate(token_lists) if len(tokens) > STUDENT_MAX_TOKENS]
+        routes = [('student', serving.student, serving.student_min_seq_len, short),
+                  ('main', serving.model, serving.min_seq_len, long)]
+    with torch.no_grad():
+        for name, net, min_len, indices in routes:
+            if not indices:
+                continue
+            ROUTED.inc(len(indices), model=name)
+            routed = [token_lists[i] for i in indices]
+            for bucket in length_buckets(routed, bucket_size or PREDICT_BUCKET_SIZE):
+                with STAGE_LATENCY.time(stage='encode'):
+                    input_tensor, lengths = encode_batch(serving, [routed[j] for j in bucket], min_len)
+                with STAGE_LATENCY.time(stage='forward'):
+                    logits = net(input_tensor, lengths)
+                with STAGE_LATENCY.time(stage='postprocess'):
+                    scores = torch.sigmoid(logits).squeeze(1).tolist()
+                for j, probability in zip(bucket, scores):
+                    probabilities[indices[j]] = probability
+    return probabilities
+
+def predict_tokens(serving, token_lists, bucket_size=None):
+    """Predict sentiment for tokenized texts, returned in input order"""
+    return [dict(format_prediction(p), model_version=serving.version)
+            for p in score_tokens(serving, token_lists, bucket_size)]
+
+def predict_queued(items):
+    """MicroBatcher callback: items are (serving, tokens) pairs.
+
+    A batch collected across a swap holds requests for both versions; each
+    group is scored by the version its request started on.
+    """
+    results = [None] * len(items)
+    groups = {}
+    for i, (serving, _) in enumerate(items):
+        groups.setdefault(id(serving), (serving, []))[1].append(i)
+    for serving, indices in groups.values():
+        for i, prediction in zip(indices, predict_tokens(serving, [items[i][1] for i in indices])):
+            results[i] = prediction
+    return results
+
+def predict_batch(texts, bucket_size=None):
+    """Predict sentiment for a list of texts, returned in input order.
+
+    Texts already in the prediction cache skip id lookup and the forward
+    pass; only the misses are scored.
+    """
+    serving = current
+    with STAGE_LATENCY.time(stage='tokenize'):
+        token_lists = serving.tokenizer.tokenize_batch(texts, MAX_SEQ_LEN)
+    if prediction_cache is None:
+        return predict_tokens(serving, token_lists, bucket_size)
     
-    return torch.tensor([ids], dtype=torch.long).to(device)
+    keys = [cache_key(tokens, serving.version) for tokens in token_lists]
+    results = [prediction_cache.get(key) for key in keys]
+    missing = [i for i, result in enumerate(results) if result is None]
+    if missing:
+        predictions = predict_tokens(serving, [token_lists[i] for i in missing], bucket_size)
+        for i, prediction in zip(missing, predictions):
+            results[i] = prediction
+            prediction_cache.put(keys[i], prediction)
+    return results
+
+def start_batcher():
+    """Start the micro-batching scheduler in front of predict_queued"""
+    global batcher
+    if batcher is None:
+        batcher = MicroBatcher(predict_queued, max_batch_size=BATCH_MAX_SIZE,
+                               max_wait_ms=BATCH_MAX_WAIT_MS).start()
+    return batcher
 
 def predict_sentiment(text):
     """Predict sentiment for given text"""
-    if model is None:
+    serving = current
+    if serving is None:
         return {"error": "Model not loaded"}
     
     try:
-        # Preprocess text
-        input_tensor = preprocess_text(text)
+        with STAGE_LATENCY.time(stage='tokenize'):
+            tokens = serving.tokenizer.tokenize_batch([text], MAX_SEQ_LEN)[0]
+        key = cache_key(tokens, serving.version) if prediction_cache is not None else None
+        if key is not None:
+            cached = prediction_cache.get(key)
+            if cached is not None:
+                return cached
         
-        # Get prediction
-        with torch.no_grad():
-            prediction = model(input_tensor)
-            probability = torch.sigmoid(prediction).item()
-            sentiment = "Positive" if probability > 0.5 else "Negative"
-            confidence = probability if sentiment == "Positive" else 1 - probability
+        if batcher is not None:
+            result = batcher.submit((serving, tokens))
+        else:
+            result = predict_tokens(serving, [tokens])[0]
         
-        return {
-            "sentiment": sentiment,
-            "confidence": round(confidence * 100, 2),
-            "probability": round(probability * 100, 2)
-        }
+        if key is not None:
+            prediction_cache.put(key, result)
+        return result
     except Exception as e:
+        ERRORS.inc(kind='prediction')
         return {"error": f"Prediction failed: {str(e)}"}
 
+def window_spans(num_tokens, window, stride):
+    """(start, end) token spans of overlapping windows covering the document"""
+    spans = []
+    start = 0
+    while True:
+        end = min(start + window, num_tokens)
+        spans.append((start, end))
+        if end >= num_tokens:
+            return spans
+        start += stride
+
+def reduce_mean(probabilities, spans):
+    return sum(probabilities) / len(probabilities)
+
+def reduce_length_weighted(probabilities, spans):
+    weights = [max(1, end - start) for start, end in spans]
+    return sum(p * w for p, w in zip(probabilities, weights)) / sum(weights)
+
+def reduce_max_confidence(probabilities, spans):
+    return max(probabilities, key=lambda p: abs(p - 0.5))
+
+REDUCERS = {
+    'mean': reduce_mean,
+    'length_weighted': reduce_length_weighted,
+    'max_confidence': reduce_max_confidence,
+}
+
+def predict_long(text, reducer='mean'):
+    """Score every window of a long document and aggregate the window scores"""
+    serving = current
+    with STAGE_LATENCY.time(stage='tokenize'):
+        tokens = serving.tokenizer.tokenize_batch([text])[0]
+    spans = window_spans(len(tokens), MAX_SEQ_LEN, LONG_STRIDE)
+    # Every window goes to the main model: a short trailing window scored by
+    # the student would mix two models' scores in the aggregate
+    probabilities = score_tokens(serving, [tokens[start:end] for start, end in spans],
+                                 bucket_size=LONG_WINDOW_BATCH, use_student=False)
+    result = format_prediction(REDUCERS[reducer](probabilities, spans))
+    result.update({
+        "model_version": serving.version,
+        "reducer": reducer,
+        "tokens": len(tokens),
+        "windows": [
+            {"start": start, "end": end, "probability": round(p * 100, 2)}
+            for (start, end), p in zip(spans, probabilities)
+        ]
+    })
+    return result
+
+@app.before_request
+def start_request_metrics():
+    g.metrics_endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    g.metrics_start = time.perf_counter()
+    IN_FLIGHT.inc(endpoint=g.metrics_endpoint)
+
+@app.after_request
+def count_response(response):
+    REQUESTS.inc(endpoint=g.metrics_endpoint, status=str(response.status_code))
+    if response.status_code >= 500:
+        ERRORS.inc(kind='server')
+    return response
+
+@app.teardown_request
+def finish_request_metrics(exc):
+    if 'metrics_start' in g:
+        IN_FLIGHT.dec(endpoint=g.metrics_endpoint)
+        REQUEST_LATENCY.observe(time.perf_counter() - g.metrics_start, endpoint=g.metrics_endpoint)
+
+def collect_component_metrics():
+    """Copy cache and batcher stats into the registry before each scrape"""
+    if prediction_cache is not None:
+        stats = prediction_cache.stats()
+        for event in ('hits', 'misses', 'evictions'):
+            CACHE_EVENTS.set_total(stats[event], event=event)
+        CACHE_ENTRIES.set(stats['entries'])
+    if batcher is not None:
+        stats = batcher.stats()
+        BATCHER_QUEUE.set(stats['queue_depth'])
+        BATCHER_TOTALS.set_total(stats['batches'], kind='batches')
+        BATCHER_TOTALS.set_total(stats['items'], kind='items')
+
+registry.add_collector(collect_component_metrics)
+
+def admin_authorized(require_token=False):
+    """Requests must carry SENTIMENT_ADMIN_TOKEN; with no token configured,
+    only loopback clients are let in (the app listens on 0.0.0.0), or no one
+    at all for endpoints that change what is served"""
+    if ADMIN_TOKEN is None:
+        return not require_token and request.remote_addr in LOOPBACK_ADDRS
+    return hmac.compare_digest(request.headers.get('Authorization', ''), f"Bearer {ADMIN_TOKEN}")
+
 @app.route('/')
 def index():
     """Serve the main page"""
@@ -152,7 +614,8 @@ def index():
 def predict():
     """API endpoint for sentiment prediction"""
     try:
-        data = request.get_json()
+        with STAGE_LATENCY.time(stage='parse'):
+            data = request.get_json()
         text = data.get('text', '').strip()
         
         if not text:
@@ -164,14 +627,186 @@ def predict():
     except Exception as e:
         return jsonify({"error": f"Server error: {str(e)}"}), 500
 
+def score_texts(texts):
+    """Score a list of request texts; empty entries get a per-item error"""
+    indexed = [(i, text.strip()) for i, text in enumerate(texts) if text.strip()]
+    results = [{"error": "No text provided"}] * len(texts)
+    if indexed:
+        predictions = predict_batch([text for _, text in indexed])
+        for (i, _), prediction in zip(indexed, predictions):
+            results[i] = prediction
+    return results
+
+def parse_ndjson_line(line):
+    """Accept either a bare JSON string or an object with a `text` field"""
+    item = json.loads(line)
+    if isinstance(item, dict):
+        item = item.get('text', '')
+    if not isinstance(item, str):
+        raise ValueError("Each line must be a JSON string or an object with a 'text' field")
+    return item
+
+def stream_predictions(lines):
+    """Score NDJSON input lines in chunks and yield NDJSON results in order"""
+    chunk = []
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            chunk.append(parse_ndjson_line(line))
+        except ValueError as e:
+            # Flush what we have so the error lands at the right position
+            for result in score_texts(chunk):
+                yield json.dumps(result) + "\n"
+            chunk = []
+            yield json.dumps({"error": f"Invalid line: {str(e)}"}) + "\n"
+            continue
+        if len(chunk) >= PREDICT_STREAM_CHUNK:
+            for result in score_texts(chunk):
+                yield json.dumps(result) + "\n"
+            chunk = []
+    for result in score_texts(chunk):
+        yield json.dumps(result) + "\n"
+
+@app.route('/api/predict/batch', methods=['POST'])
+def predict_bulk():
+    """API endpoint for bulk sentiment prediction (JSON or NDJSON stream)"""
+    if current is None:
+        return jsonify({"error": "Model not loaded"}), 503
+    
+    if request.mimetype == 'application/x-ndjson':
+        lines = (line.decode('utf-8') for line in request.stream)
+        return Response(stream_with_context(stream_predictions(lines)),
+                        mimetype='application/x-ndjson')
+    
+    try:
+        with STAGE_LATENCY.time(stage='parse'):
+            data = request.get_json()
+        texts = data.get('texts') if isinstance(data, dict) else None
+        
+        if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+            return jsonify({"error": "'texts' must be a list of strings"}), 400
+        if len(texts) > PREDICT_BATCH_MAX_TEXTS:
+            return jsonify({"error": f"Too many texts (max {PREDICT_BATCH_MAX_TEXTS}); use NDJSON streaming for large jobs"}), 413
+        
+        return jsonify({"results": score_texts(texts)})
+    
+    except Exception as e:
+        return jsonify({"error": f"Server error: {str(e)}"}), 500
+
+@app.route('/api/predict/long', methods=['POST'])
+def predict_long_document():
+    """API endpoint for sliding-window scoring of documents beyond MAX_SEQ_LEN"""
+    if current is None:
+        return jsonify({"error": "Model not loaded"}), 503
+    
+    try:
+        with STAGE_LATENCY.time(stage='parse'):
+            data = request.get_json()
+        text = data.get('text', '').strip()
+        reducer = data.get('reducer', 'mean')
+        
+        if not text:
+            return jsonify({"error": "No text provided"}), 400
+        if reducer not in REDUCERS:
+            return jsonify({"error": f"Unknown reducer '{reducer}', expected one of {sorted(REDUCERS)}"}), 400
+        
+        return jsonify(predict_long(text, reducer))
+    
+    except Exception as e:
+        return jsonify({"error": f"Server error: {str(e)}"}), 500
+
+@app.route('/api/metrics')
+def metrics():
+    """Prometheus scrape endpoint"""
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/profiler', methods=['GET', 'POST'])
+def sampling_profiler():
+    """Start/stop the sampling profiler (POST) or fetch its folded stacks (GET)"""
+    if not admin_authorized():
+        return jsonify({"error": "Unauthorized"}), 401
+    
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        if data.get('enabled'):
+            try:
+                interval_ms = float(data.get('interval_ms', 5))
+            except (TypeError, ValueError):
+                interval_ms = math.nan
+            if not (math.isfinite(interval_ms) and interval_ms >= PROFILER_MIN_INTERVAL_MS):
+                return jsonify({"error": f"interval_ms must be a number of at least {PROFILER_MIN_INTERVAL_MS:g}"}), 400
+            profiler.start(interval=interval_ms / 1000.0)
+        else:
+            profiler.stop()
+    
+    limit = request.args.get('limit', type=int)
+    return jsonify(profiler.report(limit))
+
+def model_status():
+    serving = current
+    if serving is None:
+        return {"model_version": None}
+    status = {
+        "model_version": serving.version,
+        "model_dir": serving.model_dir,
+        "engine": serving.engine,
+        "student_loaded": serving.student is not None,
+        "loaded_at": serving.loaded_at,
+    }
+    if MODEL_REGISTRY:
+        status.update(registry_dir=MODEL_REGISTRY, label=serving.label,
+                      available=versions.list_versions(MODEL_REGISTRY))
+    return status
+
+@app.route('/api/admin/model', methods=['GET', 'POST'])
+def admin_model():
+    """Show the live model (GET) or load and swap in a new one (POST).
+
+    With SENTIMENT_MODEL_REGISTRY set, POST {"version": "v0003"} makes that
+    version live (default: the newest published one); without a registry,
+    POST reloads the files in SENTIMENT_MODEL_DIR.
+    """
+    if not admin_authorized(require_token=True):
+        return jsonify({"error": "Unauthorized"}), 401
+    if request.method == 'GET':
+        return jsonify(model_status())
+    
+    data = request.get_json(silent=True) or {}
+    if MODEL_REGISTRY:
+        available = versions.list_versions(MODEL_REGISTRY)
+        label = data.get('version') or (available[-1] if available else None)
+        if label not in available:
+            return jsonify({"error": f"Unknown version '{label}'", "available": available}), 404
+        if current is not None and current.label == label:
+            return jsonify(model_status())
+        # Load before publishing the choice, so a broken version never becomes CURRENT
+        if swap_model(versions.version_dir(MODEL_REGISTRY, label), label) is None:
+            return jsonify({"error": f"Failed to load version '{label}'", **model_status()}), 500
+        versions.set_current(MODEL_REGISTRY, label)
+    elif swap_model(MODEL_DIR) is None:
+        return jsonify({"error": f"Failed to load {MODEL_DIR}", **model_status()}), 500
+    return jsonify(model_status())
+
 @app.route('/api/health')
 def health():
     """Health check endpoint"""
-    return jsonify({"status": "healthy", "model_loaded": model is not None})
+    serving = current
+    return jsonify({
+        "status": "healthy",
+        "model_loaded": serving is not None,
+        "student_loaded": serving is not None and serving.student is not None,
+        "model_version": serving.version if serving is not None else None,
+        "batcher": batcher.stats() if batcher is not None else None,
+        "cache": prediction_cache.stats() if prediction_cache is not None else None
+    })
 
 if __name__ == '__main__':
     # Load model on startup
     if load_model():
+        start_batcher()
+        start_model_watcher()
         print("Starting Flask app...")
         app.run(debug=True, host='0.0.0.0', port=5000)
     else:
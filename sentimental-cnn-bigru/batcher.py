@@ -0,0 +1,112 @@
+import threading
+import time
+import queue
+from collections import Counter
+from concurrent.futures import Future
+
+
+class MicroBatcher:
+    """Collects concurrent requests into batches for a single forward pass.
+
+    A background thread waits for the first queued item, then keeps
+    collecting until either `max_batch_size` items are queued or
+    `max_wait_ms` has elapsed. The whole batch is handed to `process_fn`,
+    which must return one result per item in the same order.
+    """
+
+    def __init__(self, process_fn, max_batch_size=32, max_wait_ms=5):
+        self.process_fn = process_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._batch_sizes = Counter()
+        self._batches = 0
+        self._items = 0
+        self._thread = None
+        self._running = False
+
+    def start(self):
+        if self._running:
+            return self
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._running = False
+        self._queue.put(None)
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def submit(self, item, timeout=None):
+        """Queue one item and block until its result is ready"""
+        if not self._running:
+            raise RuntimeError("Batcher is not running")
+        future = Future()
+        self._queue.put((item, future))
+        return future.result(timeout=timeout)
+
+    def stats(self):
+        """Queue depth and batch-size histogram for tuning"""
+        with self._lock:
+            histogram = {str(size): count for size, count in sorted(self._batch_sizes.items())}
+            return {
+                "queue_depth": self._queue.qsize(),
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000.0,
+                "batches": self._batches,
+                "items": self._items,
+                "mean_batch_size": round(self._items / self._batches, 2) if self._batches else 0.0,
+                "batch_size_histogram": histogram,
+            }
+
+    def _collect(self):
+        first = self._queue.get()
+        if first is None:
+            return []
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                entry = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if entry is None:
+                self._running = False
+                break
+            batch.append(entry)
+        return batch
+
+    def _run(self):
+        while self._running:
+            batch = self._collect()
+            if not batch:
+                continue
+            items = [item for item, _ in batch]
+            futures = [future for _, future in batch]
+            with self._lock:
+                self._batch_sizes[len(batch)] += 1
+                self._batches += 1
+                self._items += len(batch)
+            try:
+                results = self.process_fn(items)
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                continue
+            for future, result in zip(futures, results):
+                future.set_result(result)
+        # Fail anything still waiting so callers do not hang on shutdown
+        while True:
+            try:
+                entry = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is not None:
+                entry[1].set_exception(RuntimeError("Batcher stopped"))
@@ -0,0 +1,112 @@
+import argparse
+import io
+import json
+import os
+import random
+import time
+import torch
+import app
+from sentiment.tokenizer import load_vocab, tokenize, vocab_exists
+from dataset_cache import read_split, build_vocab
+
+ENGINES = ['eager', 'quantized', 'scripted']
+
+
+def build_training_vocab(root_dir):
+    """Rebuild the 20k training vocabulary for models saved without one"""
+    texts, _ = read_split(root_dir, 'train')
+    return build_vocab(tokenize(s) for s in texts)
+
+
+def serialized_size(model):
+    """Size in bytes of the model as it would be written to disk"""
+    buffer = io.BytesIO()
+    if isinstance(model, torch.jit.ScriptModule):
+        torch.jit.save(model, buffer)
+    else:
+        torch.save(model.state_dict(), buffer)
+    return buffer.tell()
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+def benchmark_engine(engine, vocab, texts, labels, latency_samples):
+    if not app.load_model(engine):
+        return None
+    # Score with the real training vocabulary, not the serving fallback
+    app.set_vocab(vocab)
+
+    # Warm up allocator and kernels before timing
+    app.predict_batch(texts[:app.PREDICT_BUCKET_SIZE])
+
+    latencies = []
+    for text in latency_samples:
+        start = time.perf_counter()
+        app.predict_batch([text])
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    results = app.predict_batch(texts)
+    elapsed = time.perf_counter() - start
+
+    correct = sum((r['sentiment'] == 'Positive') == bool(label) for r, label in zip(results, labels))
+    return {
+        'engine': engine,
+        'size_mb': round(serialized_size(app.current.model) / 1e6, 2),
+        'latency_p50_ms': round(percentile(latencies, 50), 2),
+        'latency_p95_ms': round(percentile(latencies, 95), 2),
+        'throughput_texts_per_s': round(len(texts) / elapsed, 1),
+        'accuracy': round(correct / len(texts) * 100, 2),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare inference engines on the IMDb test split")
+    parser.add_argument('--imdb-root', default='imdb_data/aclImdb')
+    parser.add_argument('--engines', nargs='+', default=ENGINES, choices=ENGINES)
+    parser.add_argument('--limit', type=int, default=0, help="Score a random subset of the test split (0 = all 25k)")
+    parser.add_argument('--latency-samples', type=int, default=200)
+    parser.add_argument('--threads', type=int, default=0, help="torch intra-op threads (0 = torch default)")
+    parser.add_argument('--output', help="Also write the results as JSON to this file")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    # Every text must reach the model, or cached hits would inflate throughput
+    app.prediction_cache = None
+
+    if vocab_exists(app.VOCAB_PATH):
+        vocab = load_vocab(app.VOCAB_PATH)
+    else:
+        print(f"{app.VOCAB_PATH} not found, rebuilding the vocabulary from the training split")
+        vocab = build_training_vocab(args.imdb_root)
+    texts, labels = read_split(args.imdb_root, 'test')
+    rng = random.Random(42)
+    if args.limit:
+        picked = rng.sample(range(len(texts)), args.limit)
+        texts, labels = [texts[i] for i in picked], [labels[i] for i in picked]
+    latency_samples = rng.sample(texts, min(args.latency_samples, len(texts)))
+
+    rows = []
+    for engine in args.engines:
+        row = benchmark_engine(engine, vocab, texts, labels, latency_samples)
+        if row is None:
+            print(f"Skipping {engine}: model not available")
+            continue
+        rows.append(row)
+
+    baseline = next((r for r in rows if r['engine'] == 'eager'), None)
+    print(f"\n{'engine':<10} {'size MB':>8} {'p50 ms':>8} {'p95 ms':>8} {'texts/s':>9} {'acc %':>7} {'Δacc':>7}")
+    for row in rows:
+        row['accuracy_delta'] = round(row['accuracy'] - baseline['accuracy'], 2) if baseline else None
+        delta = f"{row['accuracy_delta']:+.2f}" if baseline else 'n/a'
+        print(f"{row['engine']:<10} {row['size_mb']:>8} {row['latency_p50_ms']:>8} {row['latency_p95_ms']:>8} "
+              f"{row['throughput_texts_per_s']:>9} {row['accuracy']:>7} {delta:>7}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'texts': len(texts), 'threads': torch.get_num_threads(), 'results': rows}, f, indent=2)
+        print(f"\nResults written to {args.output}")
@@ -0,0 +1,69 @@
+import argparse
+import time
+import torch
+import torch.nn as nn
+from torch.utils.data import DataLoader
+import app
+from training_data import IMDBDataset, LengthBucketSampler, PadCollate, loader_options
+
+
+def build_loader(dataset, mode, batch_size, min_len, num_workers=0):
+    pipeline = loader_options(num_workers)
+    if mode == 'fixed':
+        # The old pipeline: shuffled batches, every review padded to max_seq_len
+        collate = PadCollate(dataset.pad_id, fixed_len=dataset.max_seq_len)
+        return DataLoader(dataset, batch_size=batch_size, shuffle=True, collate_fn=collate, **pipeline)
+    collate = PadCollate(dataset.pad_id, min_len=min_len)
+    return DataLoader(dataset, batch_sampler=LengthBucketSampler(dataset.lengths, batch_size), collate_fn=collate,
+                      **pipeline)
+
+
+def time_epoch(model, loader, mode, max_batches=None):
+    """Train for one pass over the loader; returns (seconds, samples, padded tokens, real tokens)"""
+    optimizer = torch.optim.AdamW(model.parameters(), lr=2e-5)
+    criterion = nn.BCEWithLogitsLoss()
+    model.train()
+    samples = padded_tokens = real_tokens = 0
+    start = time.perf_counter()
+    for i, (texts, lengths, labels) in enumerate(loader):
+        if max_batches is not None and i >= max_batches:
+            break
+        optimizer.zero_grad()
+        # Fixed padding trains the way the old loop did, without lengths
+        predictions = model(texts, None if mode == 'fixed' else lengths).squeeze(1)
+        loss = criterion(predictions, labels)
+        loss.backward()
+        torch.nn.utils.clip_grad_norm_(model.parameters(), 1.0)
+        optimizer.step()
+        samples += len(labels)
+        padded_tokens += texts.numel()
+        real_tokens += int(lengths.sum())
+    return time.perf_counter() - start, samples, padded_tokens, real_tokens
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare training epoch time with fixed vs length-bucketed padding")
+    parser.add_argument('--imdb-root', default='imdb_data/aclImdb')
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--max-seq-len', type=int, default=512)
+    parser.add_argument('--max-batches', type=int, default=None,
+                        help="Stop each run after this many batches (default: a full epoch)")
+    parser.add_argument('--loader-workers', type=int, default=0, help="DataLoader worker processes")
+    args = parser.parse_args()
+
+    dataset = IMDBDataset(args.imdb_root, 'train', max_seq_len=args.max_seq_len)
+    app.VOCAB_SIZE = len(dataset.vocab)
+    print(f"{len(dataset)} reviews, mean length {dataset.lengths.mean():.0f} tokens "
+          f"(truncated to {args.max_seq_len})")
+
+    results = {}
+    for mode in ['fixed', 'bucketed']:
+        torch.manual_seed(0)
+        model = app.build_model()
+        loader = build_loader(dataset, mode, args.batch_size, max(app.CNN_KERNEL_SIZES), args.loader_workers)
+        seconds, samples, padded, real = time_epoch(model, loader, mode, args.max_batches)
+        results[mode] = seconds / samples
+        print(f"{mode:>9}: {seconds:8.1f} s for {samples} samples, {samples / seconds:7.1f} samples/sec, "
+              f"{100 * (1 - real / padded):5.1f}% padding")
+
+    print(f"\nBucketed padding: {results['fixed'] / results['bucketed']:.2f}x faster per sample")
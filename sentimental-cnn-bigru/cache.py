@@ -0,0 +1,80 @@
+import hashlib
+import sys
+import threading
+from collections import OrderedDict
+
+
+def cache_key(tokens, model_version):
+    """Hash of the normalized (lowercased, tokenized) text and model version.
+
+    Texts that differ only in case, punctuation or whitespace produce the
+    same tokens and therefore share an entry.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(model_version.encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(' '.join(tokens).encode('utf-8'))
+    return digest.digest()
+
+
+def entry_size(key, value):
+    """Approximate memory held by one cache entry, in bytes"""
+    return sys.getsizeof(key) + sys.getsizeof(value) + sum(sys.getsizeof(v) for v in value.values())
+
+
+class PredictionCache:
+    """Thread-safe LRU cache of prediction results bounded by count and memory"""
+
+    def __init__(self, max_entries=10000, max_bytes=16 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        size = entry_size(key, value)
+        if size > self.max_bytes or self.max_entries <= 0:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,209 @@
+import glob
+import hashlib
+import multiprocessing
+import os
+import shutil
+import tarfile
+import urllib.request
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import chain
+import numpy as np
+from sentiment.tokenizer import TOKENIZER_VERSION, PAD_TOKEN, UNK_TOKEN, tokenize, save_vocab, load_vocab, vocab_exists
+
+DEFAULT_CACHE_DIR = 'data_cache'
+VOCAB_MAX_WORDS = 20000
+# Arrays making up one cached split
+SPLIT_ARRAYS = ('ids', 'offsets', 'labels')
+
+
+def worker_processes(env_var, default):
+    """Worker process count from env_var (else default), or 0 unless workers are forked.
+
+    sentiment_analyzer.py trains at module level and refuses to be imported,
+    so children started with spawn or forkserver (the default on Windows and
+    macOS), which re-import __main__, die on start; only fork skips that.
+    """
+    requested = int(os.environ.get(env_var, default))
+    method = multiprocessing.get_start_method()
+    if requested > 0 and method != 'fork':
+        if env_var in os.environ:
+            print(f"Ignoring {env_var}={requested}: worker processes need the 'fork' start method, not '{method}'")
+        return 0
+    return requested
+
+
+# Processes used to read and tokenize the corpus when building the cache
+DATA_WORKERS = worker_processes('SENTIMENT_DATA_WORKERS', os.cpu_count() or 1)
+# Shards per worker, so a slow shard does not leave the other workers idle
+SHARDS_PER_WORKER = 4
+
+
+def download_and_extract_imdb(data_dir='imdb_data'):
+    url = "https://ai.stanford.edu/~amaas/data/sentiment/aclImdb_v1.tar.gz"
+    if not os.path.exists(data_dir):
+        os.makedirs(data_dir, exist_ok=True)
+    tar_path = os.path.join(data_dir, "aclImdb_v1.tar.gz")
+    if not os.path.exists(os.path.join(data_dir, "aclImdb")):
+        if not os.path.exists(tar_path):
+            print("Downloading IMDb dataset...")
+            urllib.request.urlretrieve(url, tar_path)
+        print("Extracting IMDb dataset...")
+        with tarfile.open(tar_path, "r:gz") as tar:
+            tar.extractall(path=data_dir)
+        print("IMDb dataset downloaded and extracted.")
+    else:
+        print("IMDb dataset already present.")
+
+
+def list_split(root_dir, split):
+    """(paths, labels) for an IMDb split, positives first, files in name order"""
+    paths, labels = [], []
+    for label in ['pos', 'neg']:
+        files = sorted(glob.glob(os.path.join(root_dir, split, label, '*.txt')))
+        paths.extend(files)
+        labels.extend([1 if label == 'pos' else 0] * len(files))
+    return paths, labels
+
+
+def read_text(path):
+    with open(path, encoding='utf-8') as file:
+        return file.read().strip()
+
+
+def read_split(root_dir, split):
+    """Read (texts, labels) for an IMDb split, positives first, files in name order"""
+    paths, labels = list_split(root_dir, split)
+    return [read_text(path) for path in paths], labels
+
+
+def vocab_from_counter(counter, max_words=VOCAB_MAX_WORDS):
+    vocab = {PAD_TOKEN: 0, UNK_TOKEN: 1}
+    for word, _ in counter.most_common(max_words):
+        vocab[word] = len(vocab)
+    return vocab
+
+
+def build_vocab(token_lists, max_words=VOCAB_MAX_WORDS):
+    return vocab_from_counter(Counter(chain.from_iterable(token_lists)), max_words)
+
+
+def count_shard(paths):
+    """Map step: token counts for one shard of review files"""
+    counter = Counter()
+    for path in paths:
+        counter.update(tokenize(read_text(path)))
+    return counter
+
+
+def encode_shard(paths, vocab):
+    """Token ids (flat int32) and per-review lengths for one shard of review files"""
+    unk_id = vocab[UNK_TOKEN]
+    token_lists = [tokenize(read_text(path)) for path in paths]
+    lengths = np.fromiter(map(len, token_lists), dtype=np.int64, count=len(token_lists))
+    ids = np.fromiter((vocab.get(token, unk_id) for token in chain.from_iterable(token_lists)),
+                      dtype=np.int32, count=int(lengths.sum()))
+    return ids, lengths
+
+
+def shards(items, workers):
+    count = max(1, workers * SHARDS_PER_WORKER)
+    size = max(1, -(-len(items) // count))
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def map_shards(fn, paths, workers):
+    """Run fn over shards of paths, in a process pool when workers > 1; results in shard order"""
+    if workers <= 1:
+        return [fn(paths)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(fn, shards(paths, workers)))
+
+
+def parallel_vocab(paths, workers=DATA_WORKERS, max_words=VOCAB_MAX_WORDS):
+    """Map-reduce vocab build: per-shard Counters merged in the parent"""
+    counter = Counter()
+    for partial_counts in map_shards(count_shard, paths, workers):
+        counter.update(partial_counts)
+    return vocab_from_counter(counter, max_words)
+
+
+def vocab_fingerprint(vocab):
+    digest = hashlib.sha256()
+    for word in sorted(vocab):
+        digest.update(f"{word}\t{vocab[word]}\n".encode('utf-8'))
+    return digest.hexdigest()[:12]
+
+
+def corpus_key(root_dir):
+    """Identifies a corpus as seen by the current tokenizer"""
+    source = f"{os.path.abspath(root_dir)}\0{TOKENIZER_VERSION}"
+    return hashlib.sha256(source.encode('utf-8')).hexdigest()[:12]
+
+
+def vocab_prefix(cache_dir, root_dir):
+    return os.path.join(cache_dir, f"vocab-{corpus_key(root_dir)}", 'vocab')
+
+
+def split_dir(cache_dir, root_dir, split, vocab):
+    """Cached split location, keyed by corpus, tokenizer version and vocab"""
+    return os.path.join(cache_dir, f"{split}-{corpus_key(root_dir)}-{vocab_fingerprint(vocab)}")
+
+
+def write_split(path, ids, lengths, labels):
+    """Write a split as a flat int32 id array, row offsets and labels.
+
+    Files go to a temporary directory that is renamed into place, so an
+    interrupted run never leaves a half-written cache behind.
+    """
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    arrays = {'ids': ids, 'offsets': offsets, 'labels': np.asarray(labels, dtype=np.int8)}
+
+    tmp_path = path + '.tmp'
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp_path, f"{name}.npy"), array)
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path)
+
+
+def split_exists(path):
+    return all(os.path.exists(os.path.join(path, f"{name}.npy")) for name in SPLIT_ARRAYS)
+
+
+def load_split(path):
+    """Memory-map a cached split: (ids, offsets, labels), nothing is copied"""
+    return tuple(np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r') for name in SPLIT_ARRAYS)
+
+
+def load_or_build_split(root_dir, split, vocab=None, cache_dir=DEFAULT_CACHE_DIR, workers=DATA_WORKERS):
+    """Return (vocab, ids, offsets, labels) for a split, preprocessing it on first use.
+
+    Without a vocab, the vocabulary is built from this split (the training
+    corpus) and cached alongside it. Reading and tokenizing the review files
+    is spread over `workers` processes; later runs only memory-map the arrays.
+    """
+    if vocab is None and vocab_exists(vocab_prefix(cache_dir, root_dir)):
+        vocab = load_vocab(vocab_prefix(cache_dir, root_dir))
+    if vocab is not None:
+        path = split_dir(cache_dir, root_dir, split, vocab)
+        if split_exists(path):
+            return (vocab, *load_split(path))
+
+    paths, labels = list_split(root_dir, split)
+    if not paths:
+        raise ValueError(f"No samples found in {root_dir}/{split}")
+    print(f"Preprocessing {split} split of {root_dir} into {cache_dir} ({workers} workers)...")
+    if vocab is None:
+        vocab = parallel_vocab(paths, workers)
+        os.makedirs(os.path.dirname(vocab_prefix(cache_dir, root_dir)), exist_ok=True)
+        save_vocab(vocab, vocab_prefix(cache_dir, root_dir))
+    encoded = map_shards(partial(encode_shard, vocab=vocab), paths, workers)
+    ids = np.concatenate([shard_ids for shard_ids, _ in encoded])
+    lengths = np.concatenate([shard_lengths for _, shard_lengths in encoded])
+    path = split_dir(cache_dir, root_dir, split, vocab)
+    write_split(path, ids, lengths, labels)
+    return (vocab, *load_split(path))
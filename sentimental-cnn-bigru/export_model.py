@@ -0,0 +1,35 @@
+import argparse
+import os
+import torch
+import app
+
+
+def export(model_path, quantized_path, scripted_path):
+    """Write the INT8 and TorchScript artifacts next to the fp32 weights"""
+    app.load_model_config()
+    fp32_model = app.build_model()
+    fp32_model.load_state_dict(torch.load(model_path, map_location='cpu'))
+    fp32_model.eval()
+
+    # TorchScript fp32: no Python class needed at load time
+    scripted = torch.jit.script(fp32_model)
+    torch.jit.save(scripted, scripted_path)
+    print(f"Scripted fp32 model saved to {scripted_path} ({os.path.getsize(scripted_path) / 1e6:.1f} MB)")
+
+    # Dynamic INT8 quantization, scripted so it loads without the Python class
+    quantized = torch.jit.script(app.quantize_model(fp32_model))
+    torch.jit.save(quantized, quantized_path)
+    print(f"Quantized INT8 model saved to {quantized_path} ({os.path.getsize(quantized_path) / 1e6:.1f} MB)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Export quantized and TorchScript sentiment models")
+    parser.add_argument('--model', default=app.MODEL_PATH, help="fp32 state dict produced by sentiment_analyzer.py")
+    parser.add_argument('--quantized', default=app.ENGINE_PATHS['quantized'])
+    parser.add_argument('--scripted', default=app.ENGINE_PATHS['scripted'])
+    args = parser.parse_args()
+
+    if not os.path.exists(args.model):
+        print(f"Model file {args.model} not found. Please train the model first.")
+    else:
+        export(args.model, args.quantized, args.scripted)
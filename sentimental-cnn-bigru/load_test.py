@@ -0,0 +1,289 @@
+import argparse
+import itertools
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import requests
+import torch
+from sentiment.model import build_model
+from sentiment.tokenizer import tokenize, save_vocab
+
+# Token-length buckets used to split the latency report
+LENGTH_BUCKETS = [(32, 'short (<=32)'), (128, 'medium (33-128)'), (512, 'long (129-512)'),
+                  (float('inf'), 'very long (>512)')]
+
+SAMPLE_SENTENCES = [
+    "This movie was absolutely fantastic! The acting was superb and the plot was engaging.",
+    "This was the worst experience ever. Terrible service and poor quality.",
+    "The food was delicious and the service was excellent. Highly recommended!",
+    "Awful product. Broke after a week and customer service was unhelpful.",
+    "Great book! The writing is brilliant and the story is captivating.",
+]
+
+
+def default_corpus():
+    """Headlines, paragraphs, articles and long articles built from the quick test samples"""
+    corpus = []
+    for repeats in [1, 6, 25, 80]:
+        for i in range(len(SAMPLE_SENTENCES)):
+            rotated = SAMPLE_SENTENCES[i:] + SAMPLE_SENTENCES[:i]
+            corpus.append(' '.join(itertools.islice(itertools.cycle(rotated), repeats)))
+    return corpus
+
+
+def load_corpus(path):
+    """One text per line, or JSON lines with a 'text' field (.jsonl / .ndjson)"""
+    texts = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if path.endswith(('.jsonl', '.ndjson')):
+                line = json.loads(line)['text']
+            texts.append(line)
+    return texts
+
+
+def length_bucket(text):
+    num_tokens = len(tokenize(text))
+    return next(name for limit, name in LENGTH_BUCKETS if num_tokens <= limit)
+
+
+def write_test_model(model_dir, corpus):
+    """Small randomly initialised model and a vocab from the corpus, for capacity runs"""
+    config = {
+        'EMBEDDING_DIM': 32, 'HIDDEN_DIM': 32, 'OUTPUT_DIM': 1, 'N_LAYERS': 1,
+        'BIDIRECTIONAL': True, 'DROPOUT_LSTM': 0.0, 'CNN_KERNEL_SIZES': [2, 3, 4, 5],
+        'CNN_NUM_FILTERS': 16, 'DROPOUT_CNN': 0.0, 'FC_HIDDEN_DIM': 8, 'DROPOUT_FC': 0.0,
+        'PAD_IDX': 0,
+    }
+    vocab = {'<pad>': 0, '<unk>': 1}
+    for text in corpus:
+        for token in tokenize(text):
+            vocab.setdefault(token, len(vocab))
+    config['VOCAB_SIZE'] = len(vocab)
+
+    torch.manual_seed(0)
+    model = build_model(config)
+    torch.save(model.state_dict(), os.path.join(model_dir, 'bigru_cnn_sentiment.pt'))
+    save_vocab(vocab, os.path.join(model_dir, 'vocab'))
+    with open(os.path.join(model_dir, 'config.json'), 'w') as f:
+        json.dump(config, f)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(model_dir, workers, cache, timeout=120):
+    """Run serve.py in a subprocess and wait until /api/health answers"""
+    port = free_port()
+    env = dict(os.environ, SENTIMENT_MODEL_DIR=model_dir)
+    if not cache:
+        # A replayed corpus would otherwise be served almost entirely from cache
+        env['SENTIMENT_CACHE_MAX_ENTRIES'] = '0'
+    process = subprocess.Popen(
+        [sys.executable, 'serve.py', '--bind', f'127.0.0.1:{port}', '--workers', str(workers)],
+        cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("Server exited during startup")
+        try:
+            if requests.get(f'{url}/api/health', timeout=1).json().get('model_loaded'):
+                return process, url
+        except requests.exceptions.RequestException:
+            pass
+        time.sleep(0.25)
+    process.terminate()
+    raise RuntimeError("Server did not become healthy in time")
+
+
+class LoadRunner:
+    """Replays texts against the API and records (bucket, latency, ok) per request"""
+
+    def __init__(self, url, endpoint, texts):
+        self.url = url + endpoint
+        self.texts = texts
+        self.buckets = [length_bucket(text) for text in texts]
+        self.records = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _session(self):
+        if not hasattr(self._local, 'session'):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def send(self, index, scheduled=None):
+        start = time.perf_counter()
+        try:
+            response = self._session().post(self.url, json={'text': self.texts[index]}, timeout=60)
+            ok = response.status_code == 200 and 'error' not in response.json()
+        except requests.exceptions.RequestException:
+            ok = False
+        end = time.perf_counter()
+        # Open-loop latency counts from the scheduled send time, so a backed-up
+        # server is not hidden by requests that were sent late
+        latency = end - (scheduled if scheduled is not None else start)
+        with self._lock:
+            self.records.append((self.buckets[index], latency, ok))
+
+    def run_closed_loop(self, concurrency, num_requests):
+        """Fixed concurrency: each client sends its next request when the last one returns"""
+        counter = itertools.count()
+        def client():
+            while (i := next(counter)) < num_requests:
+                self.send(i % len(self.texts))
+        threads = [threading.Thread(target=client) for _ in range(concurrency)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - start
+
+    def run_open_loop(self, rate, num_requests, max_inflight):
+        """Fixed arrival rate, independent of how fast responses come back"""
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max_inflight) as pool:
+            for i in range(num_requests):
+                scheduled = start + i / rate
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(self.send, i % len(self.texts), scheduled)
+        return time.perf_counter() - start
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+def summarize(records, elapsed=None):
+    latencies = [latency * 1000 for _, latency, ok in records if ok]
+    summary = {
+        'requests': len(records),
+        'errors': sum(1 for _, _, ok in records if not ok),
+    }
+    if elapsed:
+        summary['throughput_rps'] = round(len(records) / elapsed, 2)
+    if latencies:
+        summary.update({
+            'p50_ms': round(percentile(latencies, 50), 2),
+            'p95_ms': round(percentile(latencies, 95), 2),
+            'p99_ms': round(percentile(latencies, 99), 2),
+            'max_ms': round(max(latencies), 2),
+        })
+    return summary
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Load test the sentiment API")
+    parser.add_argument('--corpus', help="Text file (one text per line) or .jsonl/.ndjson with a 'text' field")
+    parser.add_argument('--endpoint', default='/api/predict')
+    parser.add_argument('--requests', type=int, default=500, help="Total requests to send")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--concurrency', type=int, default=8, help="Closed loop: clients in flight")
+    mode.add_argument('--rate', type=float, help="Open loop: requests per second")
+    parser.add_argument('--max-inflight', type=int, default=256, help="Open loop: client thread cap")
+    parser.add_argument('--url', help="Test an already running server instead of starting one")
+    parser.add_argument('--model-dir', help="Serve this model directory instead of a small test model")
+    parser.add_argument('--workers', type=int, default=1, help="serve.py worker processes")
+    parser.add_argument('--cache', action='store_true', help="Keep the prediction cache enabled")
+    parser.add_argument('--output', help="JSON results file (default: result/load_tests/<time>_<commit>.json)")
+    args = parser.parse_args()
+
+    texts = load_corpus(args.corpus) if args.corpus else default_corpus()
+    commit = git_commit()
+
+    process = None
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        try:
+            if args.url:
+                url = args.url.rstrip('/')
+            else:
+                model_dir = args.model_dir
+                if model_dir is None:
+                    model_dir = tmp_dir
+                    write_test_model(model_dir, texts)
+                print(f"Starting serve.py with {args.workers} worker(s) on {os.path.abspath(model_dir)}")
+                process, url = start_server(os.path.abspath(model_dir), args.workers, args.cache)
+
+            runner = LoadRunner(url, args.endpoint, texts)
+            # Warm up every worker's allocator and kernels before measuring
+            for i in range(min(len(texts), 20)):
+                runner.send(i)
+            runner.records.clear()
+
+            if args.rate:
+                print(f"Open loop: {args.requests} requests at {args.rate} req/s")
+                elapsed = runner.run_open_loop(args.rate, args.requests, args.max_inflight)
+            else:
+                print(f"Closed loop: {args.requests} requests at concurrency {args.concurrency}")
+                elapsed = runner.run_closed_loop(args.concurrency, args.requests)
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
+
+    by_length = {}
+    for _, name in LENGTH_BUCKETS:
+        records = [r for r in runner.records if r[0] == name]
+        if records:
+            by_length[name] = summarize(records)
+    result = {
+        'commit': commit,
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'config': {
+            'endpoint': args.endpoint,
+            'mode': 'open' if args.rate else 'closed',
+            'rate': args.rate,
+            'concurrency': None if args.rate else args.concurrency,
+            'requests': args.requests,
+            'workers': None if args.url else args.workers,
+            'model': args.url or args.model_dir or 'test-size model',
+            'cache': args.cache,
+            'corpus': args.corpus or 'built-in',
+            'corpus_texts': len(texts),
+        },
+        'summary': summarize(runner.records, elapsed),
+        'by_length': by_length,
+    }
+
+    summary = result['summary']
+    print(f"\nThroughput: {summary['throughput_rps']} req/s, errors: {summary['errors']}")
+    print(f"{'length':<18} {'requests':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for name, row in [('all', summary), *by_length.items()]:
+        print(f"{name:<18} {row['requests']:>8} {row.get('p50_ms', '-'):>8} "
+              f"{row.get('p95_ms', '-'):>8} {row.get('p99_ms', '-'):>8}")
+
+    output = args.output
+    if output is None:
+        stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')
+        output = os.path.join('result', 'load_tests', f"{stamp}_{commit or 'nogit'}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(result, f, indent=2)
+    print(f"\nResults written to {output}")
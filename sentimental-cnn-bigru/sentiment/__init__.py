@@ -0,0 +1,40 @@
+"""BiGRU-CNN sentiment model and its distilled TextCNN student: definition, tokenizer, vocabulary and inference.
+
+Importing the package is cheap: torch and numpy are only imported when one
+of the names below is first used.
+
+    from sentiment import Predictor
+    predictor = Predictor('result')
+    predictor.predict(["A wonderful film", "Dull and far too long"])
+
+Command line: python -m sentiment {train,evaluate,export,serve,publish} --help
+"""
+import importlib
+
+# Public name -> submodule that defines it
+_EXPORTS = {
+    'BiGRU_CNN': 'model',
+    'TextCNN': 'model',
+    'MODEL_CONFIG_KEYS': 'model',
+    'build_model': 'model',
+    'load_trained_model': 'model',
+    'BatchTokenizer': 'tokenizer',
+    'tokenize': 'tokenizer',
+    'load_vocab': 'tokenizer',
+    'save_vocab': 'tokenizer',
+    'Predictor': 'inference',
+    'format_prediction': 'inference',
+}
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{_EXPORTS[name]}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
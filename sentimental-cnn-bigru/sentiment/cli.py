@@ -0,0 +1,110 @@
+"""python -m sentiment <command> [options]
+
+Each command imports what it needs only when it runs, so `--help` and the
+package import stay fast.
+"""
+import argparse
+import os
+import runpy
+import sys
+
+# The training, export and serving scripts live next to the package
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def use_project_modules():
+    """Make the top-level modules (training_data, train_metrics, app, ...)
+    importable from any working directory, as running a script there would"""
+    if PROJECT_DIR not in sys.path:
+        sys.path.insert(0, PROJECT_DIR)
+
+
+def run_script(name, argv):
+    """Run one of the project's scripts as `python <name> <argv>` would"""
+    use_project_modules()
+    sys.argv = [name, *argv]
+    runpy.run_path(os.path.join(PROJECT_DIR, name), run_name='__main__')
+    return 0
+
+
+def train(argv):
+    return run_script('sentiment_analyzer.py', argv)
+
+
+def export(argv):
+    return run_script('export_model.py', argv)
+
+
+def serve(argv):
+    return run_script('serve.py', argv)
+
+
+def evaluate(argv):
+    """Accuracy and classification report of a trained model on an IMDb split"""
+    parser = argparse.ArgumentParser(prog='python -m sentiment evaluate', description=evaluate.__doc__)
+    parser.add_argument('--model-dir', default='result')
+    parser.add_argument('--imdb-root', default='imdb_data/aclImdb')
+    parser.add_argument('--split', choices=['train', 'test'], default='test')
+    parser.add_argument('--max-seq-len', type=int, default=512)
+    parser.add_argument('--batch-size', type=int, default=64)
+    args = parser.parse_args(argv)
+    if not os.path.isdir(os.path.join(args.imdb_root, args.split)):
+        parser.error(f"{args.imdb_root}/{args.split} not found; `python -m sentiment train` downloads IMDb")
+
+    use_project_modules()
+    import torch
+    from torch.utils.data import DataLoader
+    from training_data import IMDBDataset, LengthBucketSampler, PadCollate
+    from train_metrics import BinaryMetrics, report_from_confusion
+    from .inference import Predictor
+
+    predictor = Predictor(args.model_dir, max_len=args.max_seq_len)
+    dataset = IMDBDataset(args.imdb_root, args.split, vocab=predictor.tokenizer.vocab, max_seq_len=args.max_seq_len)
+    loader = DataLoader(dataset, collate_fn=PadCollate(dataset.pad_id, min_len=predictor.min_len),
+                        batch_sampler=LengthBucketSampler(dataset.lengths, args.batch_size, shuffle=False))
+    metrics = BinaryMetrics(predictor.device)
+    with torch.no_grad():
+        for texts, lengths, labels in loader:
+            logits = predictor.model(texts.to(predictor.device), lengths).squeeze(1)
+            metrics.update(logits, labels.to(predictor.device))
+    result = metrics.compute()
+    print(f"{args.model_dir} on {args.split} ({result['samples']} reviews): accuracy {result['accuracy']*100:.2f}%")
+    print(report_from_confusion(result['confusion']))
+    return 0
+
+
+def publish(argv):
+    """Copy a trained model into the versioned registry app.py serves from"""
+    parser = argparse.ArgumentParser(prog='python -m sentiment publish', description=publish.__doc__)
+    parser.add_argument('--model-dir', default='result')
+    parser.add_argument('--registry', default=os.environ.get('SENTIMENT_MODEL_REGISTRY', 'result/registry'))
+    parser.add_argument('--name', default=None, help="Version name (default: next vNNNN)")
+    parser.add_argument('--no-activate', action='store_true', help="Publish without making it the live version")
+    args = parser.parse_args(argv)
+
+    from . import versions
+    name = versions.publish(args.model_dir, args.registry, args.name, make_current=not args.no_activate)
+    print(f"Published {args.model_dir} as {name} in {args.registry}" + ('' if args.no_activate else ' (live)'))
+    return 0
+
+
+COMMANDS = {
+    'train': (train, "Train the model on IMDb (sentiment_analyzer.py)"),
+    'evaluate': (evaluate, "Evaluate a trained model on an IMDb split"),
+    'export': (export, "Write the INT8 and TorchScript engines (export_model.py)"),
+    'serve': (serve, "Serve the HTTP API with gunicorn workers (serve.py)"),
+    'publish': (publish, "Add a trained model to the versioned registry and make it live"),
+}
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    parser = argparse.ArgumentParser(
+        prog='python -m sentiment', description="BiGRU-CNN sentiment model",
+        epilog='\n'.join(f"  {name:<9} {help}" for name, (_, help) in COMMANDS.items()) +
+               "\n\nOptions after the command go to it, e.g. python -m sentiment train --help",
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=list(COMMANDS))
+    # Only the command name is parsed here; everything after it is the command's
+    args = parser.parse_args(argv[:1])
+    return COMMANDS[args.command][0](argv[1:])
@@ -0,0 +1,55 @@
+import torch
+from .model import load_trained_model
+from .tokenizer import BatchTokenizer
+
+
+def format_prediction(probability):
+    """Build the API response for a positive-class probability"""
+    sentiment = "Positive" if probability > 0.5 else "Negative"
+    confidence = probability if sentiment == "Positive" else 1 - probability
+    return {
+        "sentiment": sentiment,
+        "confidence": round(confidence * 100, 2),
+        "probability": round(probability * 100, 2)
+    }
+
+
+class Predictor:
+    """Scores texts with a model trained by sentiment_analyzer.py.
+
+    Weights, config and vocabulary are all loaded from model_dir in the
+    constructor, so the first predict() call only tokenizes and runs the
+    forward pass.
+    """
+
+    def __init__(self, model_dir='result', device=None, max_len=512, batch_size=64):
+        self.device = torch.device(device or ("cuda" if torch.cuda.is_available() else "cpu"))
+        self.model, self.config, vocab = load_trained_model(model_dir, self.device)
+        self.tokenizer = BatchTokenizer(vocab)
+        # The convolutions need at least as many positions as their widest kernel
+        self.min_len = max(self.config['CNN_KERNEL_SIZES'])
+        self.max_len = max_len
+        self.batch_size = batch_size
+
+    def score(self, texts):
+        """Positive-class probabilities, in input order.
+
+        Texts are scored in length-sorted batches, each padded only to its
+        own longest text.
+        """
+        token_lists = self.tokenizer.tokenize_batch(texts, self.max_len)
+        order = sorted(range(len(token_lists)), key=lambda i: len(token_lists[i]), reverse=True)
+        probabilities = [None] * len(token_lists)
+        with torch.no_grad():
+            for start in range(0, len(order), self.batch_size):
+                batch = order[start:start + self.batch_size]
+                ids, lengths = self.tokenizer.to_matrix([token_lists[i] for i in batch], min_len=self.min_len)
+                # Empty texts are scored as a single pad token
+                logits = self.model(torch.from_numpy(ids).to(self.device), torch.from_numpy(lengths).clamp(min=1))
+                for i, probability in zip(batch, torch.sigmoid(logits).squeeze(1).tolist()):
+                    probabilities[i] = probability
+        return probabilities
+
+    def predict(self, texts):
+        """API-style predictions ({sentiment, confidence, probability}) for a list of texts"""
+        return [format_prediction(p) for p in self.score(texts)]
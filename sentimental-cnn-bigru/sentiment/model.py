@@ -0,0 +1,145 @@
+import json
+import os
+from typing import Optional
+import torch
+import torch.nn as nn
+from .tokenizer import load_vocab, vocab_paths
+
+# Constructor arguments of BiGRU_CNN, in order, as saved in config.json
+MODEL_CONFIG_KEYS = ['VOCAB_SIZE', 'EMBEDDING_DIM', 'HIDDEN_DIM', 'OUTPUT_DIM', 'N_LAYERS',
+                     'BIDIRECTIONAL', 'DROPOUT_LSTM', 'CNN_KERNEL_SIZES', 'CNN_NUM_FILTERS',
+                     'DROPOUT_CNN', 'FC_HIDDEN_DIM', 'DROPOUT_FC', 'PAD_IDX']
+# Constructor arguments of TextCNN, the distilled student
+STUDENT_CONFIG_KEYS = ['VOCAB_SIZE', 'EMBEDDING_DIM', 'OUTPUT_DIM', 'CNN_KERNEL_SIZES', 'CNN_NUM_FILTERS',
+                       'DROPOUT_CNN', 'PAD_IDX']
+# Files sentiment_analyzer.py writes to its result directory
+WEIGHTS_FILE = 'bigru_cnn_sentiment.pt'
+CONFIG_FILE = 'config.json'
+VOCAB_PREFIX = 'vocab'
+# Weights per inference engine; the INT8 and TorchScript files come from export_model.py
+ENGINE_FILES = {
+    'eager': WEIGHTS_FILE,
+    'quantized': 'bigru_cnn_sentiment_int8.pt',
+    'scripted': 'bigru_cnn_sentiment_scripted.pt',
+}
+
+
+def masked_max_pool(conv_out, lengths: Optional[torch.Tensor], kernel_size: int):
+    """Max over time of (batch, channels, windows) conv outputs.
+
+    With `lengths`, windows reaching into the padding are masked out, so a
+    row scores the same however far it is padded.
+    """
+    if lengths is not None:
+        # Keep at least one window so texts shorter than the kernel still score
+        valid = (lengths.to(conv_out.device) - kernel_size + 1).clamp(min=1)
+        positions = torch.arange(conv_out.size(2), device=conv_out.device)
+        conv_out = conv_out.masked_fill(positions[None, None, :] >= valid[:, None, None], 0.0)
+    return torch.max(conv_out, dim=2)[0]
+
+
+class BiGRU_CNN(nn.Module):
+    def __init__(self, vocab_size, embedding_dim, hidden_dim, output_dim, n_layers, bidirectional, dropout_gru, cnn_kernel_sizes, cnn_num_filters, dropout_cnn, fc_hidden_dim, dropout_fc, pad_idx):
+        super().__init__()
+        self.embedding = nn.Embedding(vocab_size, embedding_dim, padding_idx=pad_idx)
+        self.gru = nn.GRU(embedding_dim, hidden_dim, num_layers=n_layers,
+                            bidirectional=bidirectional, batch_first=True, dropout=dropout_gru)
+        self.convs = nn.ModuleList([
+            nn.Conv1d(in_channels=hidden_dim*2, out_channels=cnn_num_filters, kernel_size=k)
+            for k in cnn_kernel_sizes
+        ])
+        self.dropout_cnn = nn.Dropout(dropout_cnn)
+        self.fc1 = nn.Linear(len(cnn_kernel_sizes)*cnn_num_filters, fc_hidden_dim)
+        self.dropout_fc = nn.Dropout(dropout_fc)
+        self.fc2 = nn.Linear(fc_hidden_dim, output_dim)
+    
+    def forward(self, text, lengths: Optional[torch.Tensor] = None):
+        """Score a padded batch of token ids.
+
+        With `lengths` (real tokens per row) the GRU runs over packed
+        sequences and conv windows reaching into the padding are masked out
+        of the max-pool, so a row scores the same however far it is padded.
+        """
+        return self.head(self.encode(text, lengths), lengths)
+
+    def encode(self, text, lengths: Optional[torch.Tensor] = None):
+        """Embedding + BiGRU outputs, (batch, seq, 2 * hidden); zero past each row's length"""
+        embedded = self.embedding(text)
+        if lengths is None:
+            gru_out, _ = self.gru(embedded)
+        else:
+            packed = nn.utils.rnn.pack_padded_sequence(embedded, lengths.cpu(), batch_first=True, enforce_sorted=False)
+            packed_out, _ = self.gru(packed)
+            gru_out, _ = nn.utils.rnn.pad_packed_sequence(packed_out, batch_first=True, total_length=text.size(1))
+        return gru_out
+
+    def head(self, gru_out, lengths: Optional[torch.Tensor] = None):
+        """Conv/max-pool/FC classifier over encoder outputs"""
+        gru_out = gru_out.permute(0, 2, 1)
+        pooled = []
+        for conv in self.convs:
+            pooled.append(masked_max_pool(torch.relu(conv(gru_out)), lengths, conv.kernel_size[0]))
+        cat = torch.cat(pooled, dim=1)
+        x = self.dropout_cnn(cat)
+        x = torch.relu(self.fc1(x))
+        x = self.dropout_fc(x)
+        return self.fc2(x)
+
+
+class TextCNN(nn.Module):
+    """Embedding + parallel Conv1d branches + linear output, no recurrence.
+
+    The student that sentiment_analyzer.py --distill-from trains on a
+    BiGRU_CNN teacher's soft targets; its forward pass is a few
+    convolutions, so short texts score in a fraction of the teacher's time.
+    """
+
+    def __init__(self, vocab_size, embedding_dim, output_dim, cnn_kernel_sizes, cnn_num_filters, dropout_cnn, pad_idx):
+        super().__init__()
+        self.embedding = nn.Embedding(vocab_size, embedding_dim, padding_idx=pad_idx)
+        self.convs = nn.ModuleList([
+            nn.Conv1d(in_channels=embedding_dim, out_channels=cnn_num_filters, kernel_size=k)
+            for k in cnn_kernel_sizes
+        ])
+        self.dropout_cnn = nn.Dropout(dropout_cnn)
+        self.fc = nn.Linear(len(cnn_kernel_sizes) * cnn_num_filters, output_dim)
+
+    def forward(self, text, lengths: Optional[torch.Tensor] = None):
+        embedded = self.embedding(text).permute(0, 2, 1)
+        pooled = []
+        for conv in self.convs:
+            pooled.append(masked_max_pool(torch.relu(conv(embedded)), lengths, conv.kernel_size[0]))
+        return self.fc(self.dropout_cnn(torch.cat(pooled, dim=1)))
+
+
+# config.json 'ARCHITECTURE' -> model class and its constructor arguments;
+# configs written before the student existed have no ARCHITECTURE key
+ARCHITECTURES = {
+    'bigru_cnn': (BiGRU_CNN, MODEL_CONFIG_KEYS),
+    'textcnn': (TextCNN, STUDENT_CONFIG_KEYS),
+}
+
+
+def build_model(config):
+    """Create an untrained model (BiGRU_CNN or TextCNN) from a config.json dict"""
+    model_class, keys = ARCHITECTURES[config.get('ARCHITECTURE', 'bigru_cnn')]
+    return model_class(*(config[key] for key in keys))
+
+
+def load_trained_model(model_dir, device='cpu'):
+    """The model, config and vocabulary saved by sentiment_analyzer.py in model_dir.
+
+    Only reads files: a missing model is an error, never a download or a
+    training run.
+    """
+    weights_path = os.path.join(model_dir, WEIGHTS_FILE)
+    config_path = os.path.join(model_dir, CONFIG_FILE)
+    vocab_prefix = os.path.join(model_dir, VOCAB_PREFIX)
+    missing = [path for path in [weights_path, config_path, *vocab_paths(vocab_prefix)] if not os.path.exists(path)]
+    if missing:
+        raise FileNotFoundError(f"{', '.join(missing)} not found; train a model first (python -m sentiment train)")
+    with open(config_path) as f:
+        config = json.load(f)
+    model = build_model(config)
+    model.load_state_dict(torch.load(weights_path, map_location=device))
+    return model.to(device).eval(), config, load_vocab(vocab_prefix)
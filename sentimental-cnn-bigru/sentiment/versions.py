@@ -0,0 +1,99 @@
+"""Versioned model registry.
+
+REGISTRY/<version>/ holds one complete model directory (weights, config.json,
+vocabulary and an optional student/), and REGISTRY/CURRENT names the version
+being served. app.py watches CURRENT and swaps models without a restart.
+"""
+import hashlib
+import os
+import shutil
+from .model import CONFIG_FILE, ENGINE_FILES, VOCAB_PREFIX
+from .tokenizer import vocab_paths
+
+CURRENT_FILE = 'CURRENT'
+STUDENT_DIR = 'student'
+
+
+def model_files(model_dir):
+    """Files in model_dir that make up a servable model"""
+    names = [*ENGINE_FILES.values(), CONFIG_FILE, *vocab_paths(VOCAB_PREFIX)]
+    return [name for name in names if os.path.exists(os.path.join(model_dir, name))]
+
+
+def file_fingerprint(paths):
+    """Short content hash of the files a model version is built from"""
+    digest = hashlib.sha256()
+    for path in paths:
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(block)
+    return digest.hexdigest()[:12]
+
+
+def list_versions(registry_dir):
+    """Published versions, oldest first"""
+    if not os.path.isdir(registry_dir):
+        return []
+    return sorted(name for name in os.listdir(registry_dir)
+                  if not name.startswith('.') and os.path.isdir(os.path.join(registry_dir, name)))
+
+
+def version_dir(registry_dir, name):
+    return os.path.join(registry_dir, name)
+
+
+def current_version(registry_dir):
+    """The version named in CURRENT, or the newest one if CURRENT is missing"""
+    try:
+        with open(os.path.join(registry_dir, CURRENT_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        versions = list_versions(registry_dir)
+        return versions[-1] if versions else None
+
+
+def set_current(registry_dir, name):
+    """Point CURRENT at a published version; the rename makes the change atomic for readers"""
+    if name not in list_versions(registry_dir):
+        raise ValueError(f"No version {name!r} in {registry_dir}")
+    tmp_path = os.path.join(registry_dir, f".{CURRENT_FILE}.tmp")
+    with open(tmp_path, 'w') as f:
+        f.write(name + '\n')
+    os.replace(tmp_path, os.path.join(registry_dir, CURRENT_FILE))
+
+
+def next_version(registry_dir):
+    numbers = [int(name[1:]) for name in list_versions(registry_dir) if name[:1] == 'v' and name[1:].isdigit()]
+    return f"v{max(numbers, default=0) + 1:04d}"
+
+
+def publish(model_dir, registry_dir, name=None, make_current=True):
+    """Copy a trained model directory into the registry as a new version.
+
+    The files are copied into a hidden directory that is renamed into place
+    once complete, so a watcher never sees a half-written version.
+    """
+    files = model_files(model_dir)
+    if ENGINE_FILES['eager'] not in files:
+        raise FileNotFoundError(f"{os.path.join(model_dir, ENGINE_FILES['eager'])} not found")
+    os.makedirs(registry_dir, exist_ok=True)
+    name = name or next_version(registry_dir)
+    target = version_dir(registry_dir, name)
+    if os.path.exists(target):
+        raise FileExistsError(f"Version {name} already exists in {registry_dir}")
+    tmp_dir = os.path.join(registry_dir, f".{name}.tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    for file_name in files:
+        shutil.copy2(os.path.join(model_dir, file_name), tmp_dir)
+    student_dir = os.path.join(model_dir, STUDENT_DIR)
+    student_files = model_files(student_dir) if os.path.isdir(student_dir) else []
+    if student_files:
+        os.makedirs(os.path.join(tmp_dir, STUDENT_DIR))
+        for file_name in student_files:
+            shutil.copy2(os.path.join(student_dir, file_name), os.path.join(tmp_dir, STUDENT_DIR))
+    os.replace(tmp_dir, target)
+    if make_current:
+        set_current(registry_dir, name)
+    return name
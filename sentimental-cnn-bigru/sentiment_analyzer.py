@@ -1,107 +1,59 @@
+# Training runs at module level, so refuse to be imported: the model lives in
+# the sentiment package, and training starts with `python sentiment_analyzer.py`
+# or `python -m sentiment train`
+if __name__ != '__main__':
+    raise ImportError("sentiment_analyzer.py is a training script; import the model from the sentiment package")
+
+import argparse
 import torch
 import torch.nn as nn
 import torch.optim as optim
-from torch.utils.data import Dataset, DataLoader, random_split
+from torch.utils.data import DataLoader, random_split
 import numpy as np
-from sklearn.metrics import classification_report, confusion_matrix, ConfusionMatrixDisplay
+from sklearn.metrics import ConfusionMatrixDisplay
 import matplotlib.pyplot as plt
 from tqdm import tqdm
 import os
-import urllib.request
-import tarfile
-import glob
-import re
-from collections import Counter
-from itertools import chain
+import json
+import time
 from torch.optim.lr_scheduler import ReduceLROnPlateau
+from sentiment.model import BiGRU_CNN, TextCNN, load_trained_model
+from sentiment.tokenizer import save_vocab
+from dataset_cache import download_and_extract_imdb, worker_processes
+from training_data import IMDBDataset, LengthBucketSampler, PadCollate, dataset_lengths, loader_options
+from train_metrics import BinaryMetrics, report_from_confusion
+from trials import (HISTORY_FILE, TRIAL_FILE, load_checkpoint, save_checkpoint, should_prune,
+                    write_json)
 
-# 1. IMDb Dataset Download and Loader
+parser = argparse.ArgumentParser(description="Train the BiGRU-CNN sentiment model on IMDb")
+parser.add_argument('--precision', choices=['fp32', 'bf16'], default='fp32',
+                    help="bf16 runs training forward/backward under autocast")
+parser.add_argument('--compile', action='store_true', help="Train through torch.compile(model)")
+parser.add_argument('--threads', type=int, default=None, help="torch intra-op threads (default: torch's choice)")
+parser.add_argument('--benchmark-steps', type=int, default=0,
+                    help="Time this many training steps, report step time and memory, then exit")
+parser.add_argument('--result-dir', default=None,
+                    help="Where the model, vocab, metrics and plots are written (default: result, or "
+                         "<teacher>/student with --distill-from)")
+parser.add_argument('--set', dest='overrides', action='append', default=[], metavar='NAME=VALUE',
+                    help="Override a hyperparameter, e.g. --set LEARNING_RATE=2e-4 --set CNN_KERNEL_SIZES=[2,3,4]")
+parser.add_argument('--resume', action='store_true', help="Continue from the last epoch checkpoint in --result-dir")
+parser.add_argument('--patience', type=int, default=None,
+                    help="Stop after this many epochs without a lower validation loss and keep the best weights")
+parser.add_argument('--prune-against', metavar='SWEEP_DIR', default=None,
+                    help="Stop early when validation accuracy is below the median of the sweep's other trials")
+parser.add_argument('--distill-from', metavar='TEACHER_DIR', default=None,
+                    help="Train a small TextCNN student on the soft targets of the model trained in TEACHER_DIR")
+args = parser.parse_args()
+if args.threads:
+    torch.set_num_threads(args.threads)
 
-def download_and_extract_imdb(data_dir='imdb_data'):
-    url = "https://ai.stanford.edu/~amaas/data/sentiment/aclImdb_v1.tar.gz"
-    if not os.path.exists(data_dir):
-        os.makedirs(data_dir, exist_ok=True)
-    tar_path = os.path.join(data_dir, "aclImdb_v1.tar.gz")
-    if not os.path.exists(os.path.join(data_dir, "aclImdb")):
-        if not os.path.exists(tar_path):
-            print("Downloading IMDb dataset...")
-            urllib.request.urlretrieve(url, tar_path)
-        print("Extracting IMDb dataset...")
-        with tarfile.open(tar_path, "r:gz") as tar:
-            tar.extractall(path=data_dir)
-        print("IMDb dataset downloaded and extracted.")
-    else:
-        print("IMDb dataset already present.")
+# 1. IMDb Dataset Download and Loader
 
 download_and_extract_imdb()
 
-class IMDBDataset(Dataset):
-    def __init__(self, root_dir, split, vocab=None, max_seq_len=256):
-        self.samples = []
-        self.labels = []
-        self.max_seq_len = max_seq_len
-        for label in ['pos', 'neg']:
-            files = glob.glob(os.path.join(root_dir, split, label, '*.txt'))
-            for f in files:
-                with open(f, encoding='utf-8') as file:
-                    text = file.read().strip()
-                    self.samples.append(text)
-                    self.labels.append(1 if label == 'pos' else 0)
-        # Always build vocab if not provided
-        if vocab is None:
-            self.vocab = self.build_vocab()
-        else:
-            self.vocab = vocab
-        # Pre-tokenize for speed
-        self.tokenized = [re.findall(r'\w+', s.lower()) for s in self.samples]
-        if len(self.samples) == 0:
-            raise ValueError(f"No samples found in {root_dir}/{split}")
-    def build_vocab(self):
-        counter = Counter(chain.from_iterable([re.findall(r'\w+', s.lower()) for s in self.samples]))
-        vocab = {'<pad>': 0, '<unk>': 1}
-        for word, _ in counter.most_common(20000):
-            vocab[word] = len(vocab)
-        return vocab
-    def __len__(self):
-        return len(self.samples)
-    def __getitem__(self, idx):
-        tokens = self.tokenized[idx]
-        ids = [self.vocab.get(token, self.vocab['<unk>']) for token in tokens]
-        # Pad/truncate
-        if len(ids) < self.max_seq_len:
-            ids += [self.vocab['<pad>']] * (self.max_seq_len - len(ids))
-        else:
-            ids = ids[:self.max_seq_len]
-        return torch.tensor(ids, dtype=torch.long), torch.tensor(self.labels[idx], dtype=torch.float)
-
 # 2. Model: BiGRU + CNN Hybrid (with recommended settings)
-class BiGRU_CNN(nn.Module):
-    def __init__(self, vocab_size, embedding_dim, hidden_dim, output_dim, n_layers, bidirectional, dropout_gru, cnn_kernel_sizes, cnn_num_filters, dropout_cnn, fc_hidden_dim, dropout_fc, pad_idx):
-        super().__init__()
-        self.embedding = nn.Embedding(vocab_size, embedding_dim, padding_idx=pad_idx)
-        self.gru = nn.GRU(embedding_dim, hidden_dim, num_layers=n_layers,
-                            bidirectional=bidirectional, batch_first=True, dropout=dropout_gru)
-        self.convs = nn.ModuleList([
-            nn.Conv1d(in_channels=hidden_dim*2, out_channels=cnn_num_filters, kernel_size=k)
-            for k in cnn_kernel_sizes
-        ])
-        self.dropout_cnn = nn.Dropout(dropout_cnn)
-        self.fc1 = nn.Linear(len(cnn_kernel_sizes)*cnn_num_filters, fc_hidden_dim)
-        self.dropout_fc = nn.Dropout(dropout_fc)
-        self.fc2 = nn.Linear(fc_hidden_dim, output_dim)
-    def forward(self, text):
-        # Assert all indices are in range
-        assert (text < self.embedding.num_embeddings).all(), f"Input index out of range for embedding: max {text.max().item()}, vocab size {self.embedding.num_embeddings}"
-        embedded = self.embedding(text)
-        gru_out, _ = self.gru(embedded)
-        gru_out = gru_out.permute(0, 2, 1)
-        conv_outs = [torch.relu(conv(gru_out)) for conv in self.convs]
-        pooled = [torch.max(conv_out, dim=2)[0] for conv_out in conv_outs]
-        cat = torch.cat(pooled, dim=1)
-        x = self.dropout_cnn(cat)
-        x = torch.relu(self.fc1(x))
-        x = self.dropout_fc(x)
-        return self.fc2(x)
+# (defined in sentiment/model.py, shared with app.py)
 
 # 3. Hyperparameters (Exp. 20 from Table)
 VOCAB_SIZE = 10000
@@ -123,12 +75,62 @@ EPOCHS = 50
 WEIGHT_DECAY = 0.15
 GRAD_CLIP = 1.0
 MAX_SEQ_LEN = 512
+# Input pipeline: loader worker processes, pinned host memory for faster
+# host-to-GPU copies, and batches prefetched per worker (no workers where the
+# start method is not fork, see worker_processes)
+NUM_WORKERS = worker_processes('SENTIMENT_LOADER_WORKERS', min(4, os.cpu_count() or 1))
+PIN_MEMORY = torch.cuda.is_available()
+PREFETCH_FACTOR = int(os.environ.get('SENTIMENT_PREFETCH_FACTOR', 2))
+# Largest test accuracy drop (absolute) accepted from a bf16/compiled run
+# compared with the last fp32 eager run
+ACCURACY_TOLERANCE = 0.01
+# Distillation (--distill-from): student size, and the loss mix
+# DISTILL_ALPHA * T^2 * BCE(student / T, sigmoid(teacher / T)) + (1 - DISTILL_ALPHA) * BCE(student, label)
+# with T = DISTILL_TEMPERATURE
+STUDENT_EMBEDDING_DIM = 64
+STUDENT_NUM_FILTERS = 64
+DISTILL_TEMPERATURE = 2.0
+DISTILL_ALPHA = 0.5
+# Test reviews timed one at a time for the teacher/student comparison, in
+# full and cut to SHORT_TEXT_TOKENS (the app's default student routing limit)
+LATENCY_SAMPLES = 200
+SHORT_TEXT_TOKENS = 64
+BENCHMARK_WARMUP_STEPS = 3
+# Hyperparameters that --set may override
+TUNABLE = ['EMBEDDING_DIM', 'HIDDEN_DIM', 'N_LAYERS', 'BIDIRECTIONAL', 'DROPOUT_LSTM', 'CNN_KERNEL_SIZES',
+           'CNN_NUM_FILTERS', 'DROPOUT_CNN', 'FC_HIDDEN_DIM', 'DROPOUT_FC', 'BATCH_SIZE', 'LEARNING_RATE',
+           'EPOCHS', 'WEIGHT_DECAY', 'GRAD_CLIP', 'MAX_SEQ_LEN', 'STUDENT_EMBEDDING_DIM', 'STUDENT_NUM_FILTERS',
+           'DISTILL_TEMPERATURE', 'DISTILL_ALPHA']
+
+def parse_override(item):
+    name, sep, value = item.partition('=')
+    if not sep or name not in TUNABLE:
+        parser.error(f"--set expects NAME=VALUE with NAME one of {', '.join(TUNABLE)}")
+    try:
+        return name, json.loads(value)
+    except ValueError:
+        return name, value
+
+hyperparameters = dict(parse_override(item) for item in args.overrides)
+globals().update(hyperparameters)
+RESULT_DIR = args.result_dir or (os.path.join(args.distill_from, 'student') if args.distill_from else 'result')
+device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+
+# Distillation: the student reads the teacher's token ids, so both share the
+# teacher's vocabulary
+teacher, teacher_config, teacher_vocab = None, None, None
+if args.distill_from:
+    teacher, teacher_config, teacher_vocab = load_trained_model(args.distill_from, device)
+    print(f"Distilling from {args.distill_from} into a TextCNN student")
 
 # 4. Data (use IMDb)
 imdb_root = 'imdb_data/aclImdb'
-train_dataset = IMDBDataset(imdb_root, 'train', max_seq_len=MAX_SEQ_LEN)
+train_dataset = IMDBDataset(imdb_root, 'train', vocab=teacher_vocab, max_seq_len=MAX_SEQ_LEN)
 # Set VOCAB_SIZE to match the actual vocab size
 VOCAB_SIZE = len(train_dataset.vocab)
+# Token ids come only from this vocab, so one range check here replaces the
+# per-batch check that used to run inside BiGRU_CNN.forward
+assert max(train_dataset.vocab.values()) < VOCAB_SIZE, "Vocabulary ids out of range for the embedding"
 test_dataset = IMDBDataset(imdb_root, 'test', vocab=train_dataset.vocab, max_seq_len=MAX_SEQ_LEN)
 
 # Optionally split train into train/val
@@ -136,153 +138,357 @@ train_size = int(0.80 * len(train_dataset))
 val_size = len(train_dataset) - train_size
 train_dataset, val_dataset = random_split(train_dataset, [train_size, val_size], generator=torch.Generator().manual_seed(42))
 
-train_loader = DataLoader(train_dataset, batch_size=BATCH_SIZE, shuffle=True)
-val_loader = DataLoader(val_dataset, batch_size=BATCH_SIZE)
-test_loader = DataLoader(test_dataset, batch_size=BATCH_SIZE)
+# Batches of similar-length reviews, padded only to the longest one in the
+# batch (and never below the widest conv kernel, the teacher's included)
+MIN_SEQ_LEN = max(CNN_KERNEL_SIZES + (teacher_config['CNN_KERNEL_SIZES'] if teacher is not None else []))
+collate = PadCollate(PAD_IDX, min_len=MIN_SEQ_LEN)
+pipeline = loader_options(NUM_WORKERS, PIN_MEMORY, PREFETCH_FACTOR)
+train_loader = DataLoader(train_dataset, batch_sampler=LengthBucketSampler(dataset_lengths(train_dataset), BATCH_SIZE),
+                          collate_fn=collate, **pipeline)
+val_loader = DataLoader(val_dataset, batch_sampler=LengthBucketSampler(dataset_lengths(val_dataset), BATCH_SIZE, shuffle=False),
+                        collate_fn=collate, **pipeline)
+test_loader = DataLoader(test_dataset, batch_sampler=LengthBucketSampler(dataset_lengths(test_dataset), BATCH_SIZE, shuffle=False),
+                         collate_fn=collate, **pipeline)
 
 # 5. Training Setup
-os.makedirs('result', exist_ok=True)
-device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-model = BiGRU_CNN(VOCAB_SIZE, EMBEDDING_DIM, HIDDEN_DIM, OUTPUT_DIM, N_LAYERS, BIDIRECTIONAL, DROPOUT_LSTM, CNN_KERNEL_SIZES, CNN_NUM_FILTERS, DROPOUT_CNN, FC_HIDDEN_DIM, DROPOUT_FC, PAD_IDX).to(device)
+os.makedirs(RESULT_DIR, exist_ok=True)
+if teacher is not None:
+    model = TextCNN(VOCAB_SIZE, STUDENT_EMBEDDING_DIM, OUTPUT_DIM, CNN_KERNEL_SIZES, STUDENT_NUM_FILTERS, DROPOUT_CNN, PAD_IDX).to(device)
+else:
+    model = BiGRU_CNN(VOCAB_SIZE, EMBEDDING_DIM, HIDDEN_DIM, OUTPUT_DIM, N_LAYERS, BIDIRECTIONAL, DROPOUT_LSTM, CNN_KERNEL_SIZES, CNN_NUM_FILTERS, DROPOUT_CNN, FC_HIDDEN_DIM, DROPOUT_FC, PAD_IDX).to(device)
 optimizer = optim.AdamW(model.parameters(), lr=LEARNING_RATE, weight_decay=WEIGHT_DECAY)
 criterion = nn.BCEWithLogitsLoss().to(device)
 scheduler = ReduceLROnPlateau(optimizer, mode='min', factor=0.5, patience=2)
+# bf16 and compilation only change how training runs; the saved weights stay
+# fp32 and the final evaluation below always uses the eager fp32 model
+train_model = torch.compile(model, dynamic=True) if args.compile else model
 
-# Early stopping
-# if val_loss < best_val_loss:
-#     best_val_loss = val_loss
-#     counter = 0
-#     # Save best model
-#     torch.save(model.state_dict(), 'result/best_model.pt')
-# else:
-#     counter += 1
-#     if counter >= patience:
-#         print('Early stopping!')
-#         break
-
-def binary_accuracy(preds, y):
-    rounded = torch.round(torch.sigmoid(preds))
-    return (rounded == y).float().sum() / len(y)
+def autocast(enabled=True):
+    return torch.autocast(device.type, dtype=torch.bfloat16, enabled=enabled and args.precision == 'bf16')
 
-# 6. Training Loop (with grad clip and tqdm)
-train_losses, val_losses = [], []
-train_accuracies, val_accuracies = [], []
-for epoch in range(EPOCHS):
-    print(f"Epoch {epoch+1}/{EPOCHS}")
-    # Training with tqdm progress bar
-    model.train()
-    epoch_loss, epoch_acc = 0, 0
-    all_preds, all_labels = [], []
-    train_bar = tqdm(train_loader, desc=f"Train Epoch {epoch+1}/{EPOCHS}")
-    for texts, labels in train_bar:
-        texts, labels = texts.to(device), labels.to(device)
-        optimizer.zero_grad()
-        try:
-            predictions = model(texts).squeeze(1)
+def distillation_loss(predictions, labels, texts, lengths):
+    """Soft-target loss against the frozen teacher mixed with the true-label loss"""
+    with torch.no_grad(), autocast():
+        soft_targets = torch.sigmoid(teacher(texts, lengths).squeeze(1).float() / DISTILL_TEMPERATURE)
+    soft_loss = nn.functional.binary_cross_entropy_with_logits(predictions / DISTILL_TEMPERATURE, soft_targets)
+    return DISTILL_ALPHA * DISTILL_TEMPERATURE ** 2 * soft_loss + (1 - DISTILL_ALPHA) * criterion(predictions, labels)
+
+def train_step(texts, lengths, labels):
+    optimizer.zero_grad()
+    try:
+        with autocast():
+            predictions = train_model(texts, lengths).squeeze(1).float()
+        if teacher is not None:
+            loss = distillation_loss(predictions, labels, texts, lengths)
+        else:
             loss = criterion(predictions, labels)
-            acc = binary_accuracy(predictions, labels)
-            loss.backward()
-            torch.nn.utils.clip_grad_norm_(model.parameters(), GRAD_CLIP)
-            optimizer.step()
-        except RuntimeError as e:
-            if 'CUDA error' in str(e):
-                print('CUDA error detected. Try running with CUDA_LAUNCH_BLOCKING=1 for more info.')
-                raise
-            else:
-                raise
-        epoch_loss += loss.item()
-        epoch_acc += acc.item()
-        all_preds += torch.round(torch.sigmoid(predictions)).detach().cpu().numpy().tolist()
-        all_labels += labels.detach().cpu().numpy().tolist()
-        train_bar.set_postfix({'loss': loss.item(), 'acc': acc.item() * 100})
-    train_loss = epoch_loss / len(train_loader)
-    train_acc = epoch_acc / len(train_loader)
-    train_losses.append(train_loss)
-    train_accuracies.append(train_acc)
+        loss.backward()
+        torch.nn.utils.clip_grad_norm_(model.parameters(), GRAD_CLIP)
+        optimizer.step()
+    except RuntimeError as e:
+        if 'CUDA error' in str(e):
+            print('CUDA error detected. Try running with CUDA_LAUNCH_BLOCKING=1 for more info.')
+        raise
+    return predictions, loss
 
-    # Validation with tqdm progress bar
-    model.eval()
-    val_loss, val_acc = 0, 0
-    val_preds, val_labels = [], []
-    val_bar = tqdm(val_loader, desc=f"Validation Epoch {epoch+1}/{EPOCHS}")
+def peak_memory_mb():
+    """Peak memory of this run in MB; None where it cannot be measured (CPU on Windows)"""
+    if device.type == 'cuda':
+        return torch.cuda.max_memory_allocated() / 2**20
+    try:
+        import resource  # Unix only
+    except ImportError:
+        return None
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+if args.benchmark_steps:
+    # Load the batches up front so only the training step is timed, in the
+    # same order on every run so configurations are compared on equal work
+    model.train()
+    train_loader.batch_sampler.generator.manual_seed(0)
+    batches = []
+    while len(batches) < BENCHMARK_WARMUP_STEPS + args.benchmark_steps:
+        batches.extend(train_loader)
+    batches = [(texts.to(device), lengths, labels.to(device)) for texts, lengths, labels in batches]
+    for batch in batches[:BENCHMARK_WARMUP_STEPS]:
+        train_step(*batch)
+    if device.type == 'cuda':
+        torch.cuda.synchronize()
+    start = time.perf_counter()
+    for batch in batches[BENCHMARK_WARMUP_STEPS:BENCHMARK_WARMUP_STEPS + args.benchmark_steps]:
+        train_step(*batch)
+    if device.type == 'cuda':
+        torch.cuda.synchronize()
+    elapsed = time.perf_counter() - start
+    mode = args.precision + (' + compile' if args.compile else '')
+    peak = peak_memory_mb()
+    print(f"{mode}, {torch.get_num_threads()} intra-op threads: {1000 * elapsed / args.benchmark_steps:.1f} ms/step, "
+          f"{args.benchmark_steps * BATCH_SIZE / elapsed:.1f} samples/sec, "
+          f"peak memory {'n/a' if peak is None else f'{peak:.0f} MB'}")
+    raise SystemExit(0)
+
+# 6. Training Loop (with grad clip and tqdm)
+def evaluate(net, loader, desc, use_autocast=True):
+    """Loss and confusion counts over a loader, accumulated on the device"""
+    net.eval()
+    metrics = BinaryMetrics(device)
     with torch.no_grad():
-        for texts, labels in val_bar:
+        for texts, lengths, labels in tqdm(loader, desc=desc):
             texts, labels = texts.to(device), labels.to(device)
             try:
-                predictions = model(texts).squeeze(1)
+                with autocast(use_autocast):
+                    predictions = net(texts, lengths).squeeze(1).float()
                 loss = criterion(predictions, labels)
-                acc = binary_accuracy(predictions, labels)
             except RuntimeError as e:
                 if 'CUDA error' in str(e):
                     print('CUDA error detected. Try running with CUDA_LAUNCH_BLOCKING=1 for more info.')
-                    raise
-                else:
-                    raise
-            val_loss += loss.item()
-            val_acc += acc.item()
-            val_preds += torch.round(torch.sigmoid(predictions)).detach().cpu().numpy().tolist()
-            val_labels += labels.detach().cpu().numpy().tolist()
-            val_bar.set_postfix({'loss': loss.item(), 'acc': acc.item() * 100})
-    val_loss = val_loss / len(val_loader)
-    val_acc = val_acc / len(val_loader)
-    val_losses.append(val_loss)
-    val_accuracies.append(val_acc)
-
-    print(f'  Train Loss: {train_loss:.3f} | Train Acc: {train_acc*100:.2f}%')
-    print(f'  Val   Loss: {val_loss:.3f} | Val   Acc: {val_acc*100:.2f}%')
+                raise
+            metrics.update(predictions, labels, loss)
+    return metrics.compute()
+
+train_losses, val_losses = [], []
+train_accuracies, val_accuracies = [], []
+train_metrics = BinaryMetrics(device)
+BEST_MODEL_PATH = os.path.join(RESULT_DIR, 'best_model.pt')
+history = []
+start_epoch, elapsed_before, best_val_loss, bad_epochs, best_val_result = 0, 0.0, float('inf'), 0, None
+status = 'running'
+checkpoint = load_checkpoint(RESULT_DIR) if args.resume else None
+if checkpoint is not None:
+    model.load_state_dict(checkpoint['model'])
+    optimizer.load_state_dict(checkpoint['optimizer'])
+    scheduler.load_state_dict(checkpoint['scheduler'])
+    train_loader.batch_sampler.generator.set_state(checkpoint['sampler_rng'])
+    torch.set_rng_state(checkpoint['torch_rng'])
+    history, status = checkpoint['history'], checkpoint['status']
+    start_epoch, elapsed_before = len(history), checkpoint['elapsed']
+    best_val_loss, bad_epochs = checkpoint['best_val_loss'], checkpoint['bad_epochs']
+    train_result, val_result, best_val_result = checkpoint['train_result'], checkpoint['val_result'], checkpoint['best_val_result']
+    for row in history:
+        train_losses.append(row['train_loss'])
+        train_accuracies.append(row['train_accuracy'])
+        val_losses.append(row['val_loss'])
+        val_accuracies.append(row['val_accuracy'])
+    print(f"Resuming {RESULT_DIR} after epoch {start_epoch} ({status})")
+run_start = time.time()
+
+for epoch in range(start_epoch, EPOCHS):
+    if status != 'running':
+        break
+    print(f"Epoch {epoch+1}/{EPOCHS}")
+    # Training with tqdm progress bar; loss and accuracy stay on the device
+    # until the end of the epoch
+    model.train()
+    train_metrics.reset()
+    train_bar = tqdm(train_loader, desc=f"Train Epoch {epoch+1}/{EPOCHS}")
+    # Time spent waiting on the loader vs the whole epoch shows whether the
+    # input pipeline or the model limits throughput
+    data_time, samples = 0.0, 0
+    epoch_start = batch_start = time.perf_counter()
+    for texts, lengths, labels in train_bar:
+        data_time += time.perf_counter() - batch_start
+        texts, labels = texts.to(device, non_blocking=PIN_MEMORY), labels.to(device, non_blocking=PIN_MEMORY)
+        predictions, loss = train_step(texts, lengths, labels)
+        train_metrics.update(predictions, labels, loss)
+        samples += len(labels)
+        batch_start = time.perf_counter()
+    train_result = train_metrics.compute()
+    epoch_time = time.perf_counter() - epoch_start
+    train_losses.append(train_result['loss'])
+    train_accuracies.append(train_result['accuracy'])
+
+    # Validation with tqdm progress bar
+    val_result = evaluate(train_model, val_loader, f"Validation Epoch {epoch+1}/{EPOCHS}")
+    val_losses.append(val_result['loss'])
+    val_accuracies.append(val_result['accuracy'])
+
+    print(f"  Train Loss: {train_result['loss']:.3f} | Train Acc: {train_result['accuracy']*100:.2f}%")
+    print(f"  Val   Loss: {val_result['loss']:.3f} | Val   Acc: {val_result['accuracy']*100:.2f}%")
+    print(f'  Train Throughput: {samples / epoch_time:.1f} samples/sec '
+          f'({100 * data_time / epoch_time:.0f}% of the epoch waiting for data)')
 
     # Step the learning rate scheduler
-    scheduler.step(val_loss)
-
-    # Early stopping
-    # if val_loss < best_val_loss:
-    #     best_val_loss = val_loss
-    #     counter = 0
-    #     # Save best model
-    #     torch.save(model.state_dict(), 'result/best_model.pt')
-    # else:
-    #     counter += 1
-    #     if counter >= patience:
-    #         print('Early stopping!')
-    #         break
+    scheduler.step(val_result['loss'])
+
+    # Early stopping on validation loss, keeping the best weights
+    if val_result['loss'] < best_val_loss:
+        best_val_loss, bad_epochs, best_val_result = val_result['loss'], 0, val_result
+        if args.patience is not None:
+            torch.save(model.state_dict(), BEST_MODEL_PATH)
+    else:
+        bad_epochs += 1
+        if args.patience is not None and bad_epochs >= args.patience:
+            print('Early stopping!')
+            status = 'early_stopped'
+
+    history.append({
+        'epoch': epoch + 1,
+        'train_loss': train_result['loss'], 'train_accuracy': train_result['accuracy'],
+        'val_loss': val_result['loss'], 'val_accuracy': val_result['accuracy'],
+        'epoch_seconds': round(epoch_time, 2),
+    })
+    write_json(os.path.join(RESULT_DIR, HISTORY_FILE), history)
+    if status == 'running' and args.prune_against and should_prune(RESULT_DIR, args.prune_against, history):
+        print('Pruned: validation accuracy is below the median of the other trials')
+        status = 'pruned'
+
+    # Checkpoint every epoch, so an interrupted run continues with --resume
+    save_checkpoint(RESULT_DIR, {
+        'model': model.state_dict(), 'optimizer': optimizer.state_dict(), 'scheduler': scheduler.state_dict(),
+        'sampler_rng': train_loader.batch_sampler.generator.get_state(), 'torch_rng': torch.get_rng_state(),
+        'history': history, 'status': status, 'elapsed': elapsed_before + time.time() - run_start,
+        'best_val_loss': best_val_loss, 'bad_epochs': bad_epochs,
+        'train_result': train_result, 'val_result': val_result, 'best_val_result': best_val_result,
+    })
+
+if status == 'running':
+    status = 'completed'
+wall_clock = elapsed_before + time.time() - run_start
+trial = {
+    'status': status,
+    'epochs': len(history),
+    'hyperparameters': hyperparameters,
+    'best_val_loss': best_val_loss,
+    'best_val_accuracy': max(val_accuracies) if val_accuracies else None,
+    'wall_clock_seconds': round(wall_clock, 1),
+}
+if status == 'pruned':
+    # A pruned trial is not worth a test pass or saved artifacts
+    write_json(os.path.join(RESULT_DIR, TRIAL_FILE), trial)
+    raise SystemExit(0)
+if status == 'early_stopped':
+    model.load_state_dict(torch.load(BEST_MODEL_PATH, map_location=device))
+    val_result = best_val_result
 
 # Save the trained model
-MODEL_PATH = 'result/bigru_cnn_sentiment.pt'
+MODEL_PATH = os.path.join(RESULT_DIR, 'bigru_cnn_sentiment.pt')
 torch.save(model.state_dict(), MODEL_PATH)
 print(f"Trained model saved to {MODEL_PATH}")
 
+# Save the vocabulary the model was trained with, for app.py to serve
+VOCAB_PATH = os.path.join(RESULT_DIR, 'vocab')
+save_vocab(train_dataset.dataset.vocab, VOCAB_PATH)
+print(f"Vocabulary saved to {VOCAB_PATH}.txt / {VOCAB_PATH}_ids.npy")
+
+# Save the hyperparameters so app.py builds a matching model
+CONFIG_PATH = os.path.join(RESULT_DIR, 'config.json')
+if teacher is not None:
+    config = {
+        'ARCHITECTURE': 'textcnn', 'VOCAB_SIZE': VOCAB_SIZE, 'EMBEDDING_DIM': STUDENT_EMBEDDING_DIM,
+        'OUTPUT_DIM': OUTPUT_DIM, 'CNN_KERNEL_SIZES': CNN_KERNEL_SIZES,
+        'CNN_NUM_FILTERS': STUDENT_NUM_FILTERS, 'DROPOUT_CNN': DROPOUT_CNN, 'PAD_IDX': PAD_IDX,
+    }
+else:
+    config = {
+        'VOCAB_SIZE': VOCAB_SIZE, 'EMBEDDING_DIM': EMBEDDING_DIM, 'HIDDEN_DIM': HIDDEN_DIM,
+        'OUTPUT_DIM': OUTPUT_DIM, 'N_LAYERS': N_LAYERS, 'BIDIRECTIONAL': BIDIRECTIONAL,
+        'DROPOUT_LSTM': DROPOUT_LSTM, 'CNN_KERNEL_SIZES': CNN_KERNEL_SIZES,
+        'CNN_NUM_FILTERS': CNN_NUM_FILTERS, 'DROPOUT_CNN': DROPOUT_CNN,
+        'FC_HIDDEN_DIM': FC_HIDDEN_DIM, 'DROPOUT_FC': DROPOUT_FC, 'PAD_IDX': PAD_IDX,
+    }
+with open(CONFIG_PATH, 'w') as f:
+    json.dump(config, f, indent=2)
+print(f"Model config saved to {CONFIG_PATH}")
+
 # 7. Evaluation and Metrics
-model.eval()
-def get_preds_labels(loader, desc):
-    all_preds, all_labels = [], []
+# Train metrics come from the last epoch's running counts (training mode,
+# weights still updating) rather than a second pass over the training set.
+# The last validation pass already used the final weights, so it is reused
+# unless it ran in bf16 or through the compiled model; the reports always
+# describe the fp32 eager model.
+if args.precision != 'fp32' or args.compile:
+    val_result = evaluate(model, val_loader, 'Validation (Eval)', use_autocast=False)
+test_result = evaluate(model, test_loader, 'Test (Eval)', use_autocast=False)
+
+# Record the test accuracy; fp32 eager runs become the baseline that bf16
+# and compiled runs are checked against
+test_accuracy = test_result['accuracy']
+metrics = {'precision': args.precision, 'compile': args.compile, 'test_accuracy': test_accuracy}
+BASELINE_METRICS_PATH = os.path.join(RESULT_DIR, 'fp32_baseline_metrics.json')
+with open(os.path.join(RESULT_DIR, 'metrics.json'), 'w') as f:
+    json.dump(metrics, f, indent=2)
+if args.precision == 'fp32' and not args.compile:
+    with open(BASELINE_METRICS_PATH, 'w') as f:
+        json.dump(metrics, f, indent=2)
+elif os.path.exists(BASELINE_METRICS_PATH):
+    with open(BASELINE_METRICS_PATH) as f:
+        baseline_accuracy = json.load(f)['test_accuracy']
+    drop = baseline_accuracy - test_accuracy
+    status = 'within' if drop <= ACCURACY_TOLERANCE else 'OUTSIDE'
+    print(f"Test accuracy {test_accuracy*100:.2f}% vs fp32 baseline {baseline_accuracy*100:.2f}%: "
+          f"{status} the {ACCURACY_TOLERANCE*100:.1f} point tolerance")
+else:
+    print(f"No fp32 baseline at {BASELINE_METRICS_PATH}; run once without --precision bf16/--compile to create it")
+trial.update(val_accuracy=val_result['accuracy'], test_accuracy=test_accuracy)
+write_json(os.path.join(RESULT_DIR, TRIAL_FILE), trial)
+
+def single_text_latency(net, samples):
+    """Forward latency (p50/p95 ms) and accuracy scoring (ids, label) samples one at a time"""
+    net.eval()
+    times, correct = [], 0
     with torch.no_grad():
-        for texts, labels in tqdm(loader, desc=desc):
-            texts, labels = texts.to(device), labels.to(device)
-            predictions = model(texts).squeeze(1)
-            preds = torch.round(torch.sigmoid(predictions)).cpu().numpy()
-            all_preds.extend(preds)
-            all_labels.extend(labels.cpu().numpy())
-    return all_preds, all_labels
+        for ids, label in samples:
+            texts = torch.full((1, max(MIN_SEQ_LEN, len(ids))), PAD_IDX, dtype=torch.long)
+            texts[0, :len(ids)] = ids
+            start = time.perf_counter()
+            logit = net(texts.to(device), torch.tensor([max(1, len(ids))])).item()
+            times.append(time.perf_counter() - start)
+            correct += (logit > 0) == (float(label) > 0.5)
+    times_ms = 1000 * np.array(times)
+    return {'p50_ms': float(np.percentile(times_ms, 50)), 'p95_ms': float(np.percentile(times_ms, 95)),
+            'accuracy': correct / len(samples)}
+
+def bulk_throughput(net):
+    """Test reviews per second through the bucketed test loader"""
+    net.eval()
+    reviews = 0
+    start = time.perf_counter()
+    with torch.no_grad():
+        for texts, lengths, labels in test_loader:
+            net(texts.to(device), lengths)
+            reviews += len(labels)
+    return reviews / (time.perf_counter() - start)
 
-# Get predictions and labels for all splits
-train_preds, train_labels = get_preds_labels(train_loader, 'Train (Eval)')
-val_preds, val_labels = get_preds_labels(val_loader, 'Validation (Eval)')
-test_preds, test_labels = get_preds_labels(test_loader, 'Test (Eval)')
+if teacher is not None:
+    # Accuracy/latency trade-off of the student against its teacher on the test split
+    teacher_test = evaluate(teacher, test_loader, 'Teacher Test (Eval)', use_autocast=False)
+    # Spread over the split: reviews are stored positives first
+    sample_ids = np.linspace(0, len(test_dataset) - 1, min(LATENCY_SAMPLES, len(test_dataset))).astype(int)
+    samples = [test_dataset[i] for i in sample_ids]
+    short_samples = [(ids[:SHORT_TEXT_TOKENS], label) for ids, label in samples]
+    distillation = {'temperature': DISTILL_TEMPERATURE, 'alpha': DISTILL_ALPHA}
+    for name, net, result in [('teacher', teacher, teacher_test), ('student', model, test_result)]:
+        distillation[name] = {
+            'parameters': sum(p.numel() for p in net.parameters()),
+            'test_accuracy': result['accuracy'],
+            'reviews_per_sec': bulk_throughput(net),
+            'single_text': single_text_latency(net, samples),
+            f"first_{SHORT_TEXT_TOKENS}_tokens": single_text_latency(net, short_samples),
+        }
+    with open(os.path.join(RESULT_DIR, 'distillation.json'), 'w') as f:
+        json.dump(distillation, f, indent=2)
+    print(f"\n{'':8} {'params':>10} {'test acc':>9} {'reviews/s':>10} {'1-text p50':>11} "
+          f"{f'{SHORT_TEXT_TOKENS}-tok p50':>11} {f'{SHORT_TEXT_TOKENS}-tok acc':>11}")
+    for name in ['teacher', 'student']:
+        row = distillation[name]
+        short = row[f"first_{SHORT_TEXT_TOKENS}_tokens"]
+        print(f"{name:8} {row['parameters']:>10,} {row['test_accuracy']*100:>8.2f}% {row['reviews_per_sec']:>10.1f} "
+              f"{row['single_text']['p50_ms']:>9.2f}ms {short['p50_ms']:>9.2f}ms {short['accuracy']*100:>10.2f}%")
 
 splits = {
-    'train': (train_loader, train_preds, train_labels),
-    'val': (val_loader, val_preds, val_labels),
-    'test': (test_loader, test_preds, test_labels)
+    'train': train_result,
+    'val': val_result,
+    'test': test_result,
 }
 
-for split, (loader, preds, labels) in splits.items():
+for split, result in splits.items():
     print(f"\n{split.capitalize()} Classification Report:")
-    print(classification_report(labels, preds, digits=4))
-    cm = confusion_matrix(labels, preds)
-    disp = ConfusionMatrixDisplay(confusion_matrix=cm)
+    print(report_from_confusion(result['confusion']))
+    disp = ConfusionMatrixDisplay(confusion_matrix=result['confusion'])
     disp.plot(cmap='Blues')
     plt.title(f"{split.capitalize()} Confusion Matrix")
-    plt.savefig(f"result/{split}_confusion_matrix.png")
+    plt.savefig(os.path.join(RESULT_DIR, f"{split}_confusion_matrix.png"))
     plt.close()
 
 # 8. Plot Loss and Accuracy
@@ -293,7 +499,7 @@ plt.ylabel('Loss')
 plt.legend()
 plt.title('Loss Over Epochs')
 plt.grid(True)
-plt.savefig('result/loss_plot.png')
+plt.savefig(os.path.join(RESULT_DIR, 'loss_plot.png'))
 plt.close()
 
 plt.plot(train_accuracies, label='Train Accuracy')
@@ -303,5 +509,5 @@ plt.ylabel('Accuracy')
 plt.legend()
 plt.title('Accuracy Over Epochs')
 plt.grid(True)
-plt.savefig('result/accuracy_plot.png')
+plt.savefig(os.path.join(RESULT_DIR, 'accuracy_plot.png'))
 plt.close()
@@ -0,0 +1,89 @@
+import argparse
+import gc
+import os
+import torch
+from gunicorn.app.base import BaseApplication
+import app as sentiment_app
+
+
+def default_workers():
+    return max(1, os.cpu_count() or 1)
+
+
+class SentimentServer(BaseApplication):
+    """Gunicorn server that forks its workers after the model is loaded.
+
+    The master process loads the weights and vocabulary once; workers are
+    forked from it and share those pages copy-on-write instead of each
+    loading their own copy. Each worker then pins its own intra-op thread
+    count so the workers together use the cores without oversubscribing.
+    """
+
+    def __init__(self, bind, workers, worker_threads, intra_op_threads):
+        self.options = {
+            'bind': bind,
+            'workers': workers,
+            # Threaded workers, so concurrent requests meet in the micro-batcher
+            'worker_class': 'gthread',
+            'threads': worker_threads,
+            'preload_app': True,
+            'post_fork': self.post_fork,
+        }
+        self.intra_op_threads = intra_op_threads
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        return sentiment_app.app
+
+    def post_fork(self, server, worker):
+        torch.set_num_threads(self.intra_op_threads)
+        # Threads do not survive fork, so each worker starts its own batcher
+        # and its own watcher for newly published model versions
+        sentiment_app.start_batcher()
+        sentiment_app.start_model_watcher()
+        server.log.info(f"Worker {worker.pid}: {self.intra_op_threads} intra-op threads")
+
+
+def load_shared_model(engine=None):
+    """Load the model in the master so every forked worker shares it"""
+    # Keep the master single-threaded: forking after an OpenMP thread pool
+    # has started can deadlock the workers' first forward pass
+    torch.set_num_threads(1)
+    if not sentiment_app.load_model(engine):
+        return False
+    serving = sentiment_app.current
+    # Registry versions are memory-mapped and already shared through the page
+    # cache (as are the versions each worker swaps in later); share_memory()
+    # would copy them out of the mapping
+    if not serving.mapped and isinstance(serving.model, torch.nn.Module):
+        # Shared-memory storages stay shared even if a page is written to later
+        serving.model.share_memory()
+    # Move everything allocated so far out of the collector's reach, so its
+    # bookkeeping writes do not copy the master's pages into every worker
+    gc.freeze()
+    return True
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Serve the sentiment API with N workers sharing one model")
+    parser.add_argument('--bind', default='0.0.0.0:5000')
+    parser.add_argument('--workers', type=int, default=default_workers(),
+                        help="Worker processes (default: one per core)")
+    parser.add_argument('--worker-threads', type=int, default=8,
+                        help="Request threads per worker feeding its micro-batcher")
+    parser.add_argument('--intra-op-threads', type=int, default=0,
+                        help="torch threads per worker (default: cores / workers)")
+    parser.add_argument('--engine', choices=sorted(sentiment_app.ENGINE_PATHS), default=None,
+                        help="Inference engine (default: SENTIMENT_ENGINE or eager)")
+    args = parser.parse_args()
+
+    intra_op_threads = args.intra_op_threads or max(1, (os.cpu_count() or 1) // args.workers)
+    if load_shared_model(args.engine):
+        print(f"Starting {args.workers} workers x {intra_op_threads} intra-op threads on {args.bind}")
+        SentimentServer(args.bind, args.workers, args.worker_threads, intra_op_threads).run()
+    else:
+        print("Failed to load model. Please ensure the model is trained first.")
@@ -0,0 +1,171 @@
+import argparse
+import csv
+import itertools
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataset_cache import download_and_extract_imdb, load_or_build_split
+from training_data import DATA_CACHE_DIR
+from trials import HISTORY_FILE, TRIAL_FILE, read_json, write_json
+
+IMDB_ROOT = 'imdb_data/aclImdb'
+PARAMS_FILE = 'params.json'
+TABLE_COLUMNS = ['trial', 'status', 'epochs', 'best_val_accuracy', 'val_accuracy', 'test_accuracy',
+                 'best_val_loss', 'wall_clock_seconds']
+
+
+def sample_value(rng, space):
+    """One draw from a random-search space: a list of choices, or
+    {"uniform": [lo, hi]}, {"loguniform": [lo, hi]}, {"int": [lo, hi]}"""
+    if isinstance(space, list):
+        return rng.choice(space)
+    (kind, (low, high)), = space.items()
+    if kind == 'uniform':
+        return rng.uniform(low, high)
+    if kind == 'loguniform':
+        return math.exp(rng.uniform(math.log(low), math.log(high)))
+    if kind == 'int':
+        return rng.randint(low, high)
+    raise ValueError(f"Unknown search space {kind!r}")
+
+
+def expand_spec(spec):
+    """List of hyperparameter dicts, one per trial, in a stable order"""
+    fixed = spec.get('fixed', {})
+    params = spec.get('params', {})
+    if spec.get('search', 'grid') == 'grid':
+        names = sorted(params)
+        for name in names:
+            if not isinstance(params[name], list):
+                raise ValueError(f"Grid search needs a list of values for {name}")
+        combos = itertools.product(*(params[name] for name in names))
+        return [{**fixed, **dict(zip(names, values))} for values in combos]
+    rng = random.Random(spec.get('seed', 0))
+    return [{**fixed, **{name: sample_value(rng, params[name]) for name in sorted(params)}}
+            for _ in range(spec['trials'])]
+
+
+def trial_command(trial_dir, params, threads, sweep_dir, patience, prune, head_only=None):
+    """Full training with sentiment_analyzer.py, or with head_only=MODEL_DIR
+    train_head.py on that model's cached encoder features"""
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                          'train_head.py' if head_only else 'sentiment_analyzer.py')
+    command = [sys.executable, script, '--result-dir', trial_dir,
+               '--resume', '--threads', str(threads)]
+    if head_only:
+        command += ['--model-dir', head_only]
+    for name, value in params.items():
+        command += ['--set', f"{name}={json.dumps(value)}"]
+    if patience is not None:
+        command += ['--patience', str(patience)]
+    if prune:
+        command += ['--prune-against', sweep_dir]
+    return command
+
+
+def run_trial(trial_dir, command, threads):
+    """Run one trial in its own process, pinned to `threads` threads"""
+    env = dict(os.environ, OMP_NUM_THREADS=str(threads), MKL_NUM_THREADS=str(threads),
+               SENTIMENT_LOADER_WORKERS=os.environ.get('SENTIMENT_LOADER_WORKERS', '0'),
+               SENTIMENT_DATA_WORKERS='1')
+    with open(os.path.join(trial_dir, 'train.log'), 'a') as log:
+        returncode = subprocess.call(command, stdout=log, stderr=subprocess.STDOUT, env=env)
+    name = os.path.basename(trial_dir)
+    print(f"{name}: {'finished' if returncode == 0 else f'failed (exit {returncode}), see train.log'}")
+    return returncode
+
+
+def trial_row(trial_dir):
+    """Results table row for a trial, finished or not"""
+    trial = read_json(os.path.join(trial_dir, TRIAL_FILE))
+    row = {'trial': os.path.basename(trial_dir)}
+    if trial is None:
+        history = read_json(os.path.join(trial_dir, HISTORY_FILE), [])
+        row.update(status='incomplete', epochs=len(history),
+                   best_val_accuracy=max((h['val_accuracy'] for h in history), default=None))
+    else:
+        row.update({column: trial.get(column) for column in TABLE_COLUMNS[1:]})
+    row.update(read_json(os.path.join(trial_dir, PARAMS_FILE), {}))
+    return row
+
+
+def format_cell(value):
+    if isinstance(value, float):
+        return f"{value:.4g}"
+    return '' if value is None else str(value)
+
+
+def write_results(sweep_dir, trial_dirs, param_names):
+    """results.csv plus a markdown table sorted by best validation accuracy"""
+    rows = sorted((trial_row(d) for d in trial_dirs),
+                  key=lambda row: -(row.get('best_val_accuracy') or 0.0))
+    columns = TABLE_COLUMNS + param_names
+    with open(os.path.join(sweep_dir, 'results.csv'), 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=columns, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(rows)
+    lines = ['| ' + ' | '.join(columns) + ' |', '|' + ' --- |' * len(columns)]
+    lines += ['| ' + ' | '.join(format_cell(row.get(c)) for c in columns) + ' |' for row in rows]
+    table = '\n'.join(lines) + '\n'
+    with open(os.path.join(sweep_dir, 'results.md'), 'w') as f:
+        f.write(table)
+    return table
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run a grid or random hyperparameter sweep of sentiment_analyzer.py")
+    parser.add_argument('spec', help="JSON sweep spec: search, params, fixed, trials, seed")
+    parser.add_argument('--sweep-dir', help="Where trials and results go (default: result/sweeps/<spec name>)")
+    parser.add_argument('--parallel', type=int, default=2, help="Trials run at the same time")
+    parser.add_argument('--threads-per-trial', type=int, default=0,
+                        help="torch/OpenMP threads per trial (default: cores / parallel)")
+    parser.add_argument('--patience', type=int, default=3, help="Early-stopping patience per trial")
+    parser.add_argument('--no-prune', action='store_true',
+                        help="Do not stop trials that fall below the median of the others")
+    parser.add_argument('--head-only', metavar='MODEL_DIR', default=None,
+                        help="Only tune the CNN/FC head of a trained model with train_head.py")
+    args = parser.parse_args()
+
+    with open(args.spec) as f:
+        spec = json.load(f)
+    sweep_dir = os.path.abspath(args.sweep_dir or os.path.join(
+        'result', 'sweeps', os.path.splitext(os.path.basename(args.spec))[0]))
+    threads = args.threads_per_trial or max(1, (os.cpu_count() or 1) // args.parallel)
+    trials = expand_spec(spec)
+    param_names = sorted(spec.get('params', {}))
+
+    # Download and pre-tokenize once, before trials race to build the cache
+    download_and_extract_imdb()
+    vocab, *_ = load_or_build_split(IMDB_ROOT, 'train', cache_dir=DATA_CACHE_DIR)
+    load_or_build_split(IMDB_ROOT, 'test', vocab, cache_dir=DATA_CACHE_DIR)
+    if args.head_only:
+        # Head-only trials share one feature cache; encode it once up front
+        import train_head
+        args.head_only = os.path.abspath(args.head_only)
+        train_head.prepare_features(args.head_only, train_head.MAX_SEQ_LEN, False, 'cpu')
+
+    trial_dirs, pending = [], []
+    for i, params in enumerate(trials):
+        trial_dir = os.path.join(sweep_dir, f"trial_{i:03d}")
+        os.makedirs(trial_dir, exist_ok=True)
+        saved = read_json(os.path.join(trial_dir, PARAMS_FILE))
+        if saved is not None and saved != params:
+            raise SystemExit(f"{trial_dir} was run with different parameters; use a new --sweep-dir")
+        write_json(os.path.join(trial_dir, PARAMS_FILE), params)
+        trial_dirs.append(trial_dir)
+        if not os.path.exists(os.path.join(trial_dir, TRIAL_FILE)):
+            pending.append((trial_dir, trial_command(trial_dir, params, threads, sweep_dir,
+                                                     args.patience, not args.no_prune, args.head_only)))
+
+    print(f"{len(trials)} trials in {sweep_dir}: {len(trials) - len(pending)} already done, "
+          f"running {len(pending)} ({args.parallel} at a time, {threads} threads each)")
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=args.parallel) as pool:
+        list(pool.map(lambda job: run_trial(job[0], job[1], threads), pending))
+    print(f"Sweep ran for {time.time() - start:.0f} s\n")
+    print(write_results(sweep_dir, trial_dirs, param_names))
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The tests import the sentiment package and the top-level scripts from the project directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
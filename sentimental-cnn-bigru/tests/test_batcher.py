@@ -0,0 +1,96 @@
+import threading
+import time
+import pytest
+from batcher import MicroBatcher
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+class Recorder:
+    """process_fn that records each batch; the first batch blocks until released"""
+
+    def __init__(self):
+        self.batches = []
+        self.release = threading.Event()
+
+    def __call__(self, items):
+        self.batches.append(list(items))
+        if len(self.batches) == 1:
+            self.release.wait(5)
+        return [item * 10 for item in items]
+
+
+def submit_in_order(batcher, items):
+    """Submit items from one thread each, in order, each queued before the next"""
+    results, threads = {}, []
+    for n, item in enumerate(items):
+        thread = threading.Thread(target=lambda item=item: results.__setitem__(item, batcher.submit(item, timeout=5)))
+        thread.start()
+        threads.append(thread)
+        wait_for(lambda: batcher.stats()['queue_depth'] == n + 1)
+    return results, threads
+
+
+@pytest.fixture
+def recorder():
+    return Recorder()
+
+
+@pytest.fixture
+def batcher(recorder):
+    batcher = MicroBatcher(recorder, max_batch_size=4, max_wait_ms=50).start()
+    yield batcher
+    recorder.release.set()
+    batcher.stop()
+
+
+def test_queued_items_split_at_max_batch_size(batcher, recorder):
+    # Hold the worker inside a first batch while ten more items queue up
+    first = threading.Thread(target=batcher.submit, args=(-1,))
+    first.start()
+    wait_for(lambda: recorder.batches)
+    results, threads = submit_in_order(batcher, range(10))
+    recorder.release.set()
+    for thread in threads + [first]:
+        thread.join(5)
+
+    assert recorder.batches == [[-1], [0, 1, 2, 3], [4, 5, 6, 7], [8, 9]]
+    assert results == {item: item * 10 for item in range(10)}
+    stats = batcher.stats()
+    assert stats['batches'] == 4 and stats['items'] == 11
+    assert stats['batch_size_histogram'] == {'1': 1, '2': 1, '4': 2}
+
+
+def test_each_caller_gets_its_own_result(batcher, recorder):
+    recorder.release.set()
+    results = {}
+    threads = [threading.Thread(target=lambda i=i: results.__setitem__(i, batcher.submit(i, timeout=5)))
+               for i in range(25)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert results == {i: i * 10 for i in range(25)}
+    assert all(len(batch) <= 4 for batch in recorder.batches)
+
+
+def test_a_failing_batch_fails_every_caller_in_it():
+    def fail(items):
+        raise ValueError("bad batch")
+
+    batcher = MicroBatcher(fail, max_batch_size=4, max_wait_ms=1).start()
+    try:
+        with pytest.raises(ValueError, match="bad batch"):
+            batcher.submit('x', timeout=5)
+    finally:
+        batcher.stop()
+
+
+def test_submit_requires_a_running_batcher():
+    with pytest.raises(RuntimeError):
+        MicroBatcher(lambda items: items).submit('x')
@@ -0,0 +1,58 @@
+from cache import PredictionCache, cache_key, entry_size
+
+VALUE = {'sentiment': 'Positive', 'probability': 97.5, 'model_version': 'eager-abc'}
+
+
+def key(text):
+    return cache_key(text.split(), 'eager-abc')
+
+
+def test_least_recently_used_entry_is_evicted_by_count():
+    cache = PredictionCache(max_entries=2)
+    cache.put(key('a'), VALUE)
+    cache.put(key('b'), VALUE)
+    assert cache.get(key('a')) == VALUE  # a is now the most recent
+    cache.put(key('c'), VALUE)
+    assert cache.get(key('b')) is None
+    assert cache.get(key('a')) == VALUE and cache.get(key('c')) == VALUE
+    stats = cache.stats()
+    assert stats['entries'] == 2 and stats['evictions'] == 1
+
+
+def test_entries_are_evicted_to_stay_within_the_byte_budget():
+    size = entry_size(key('a'), VALUE)
+    cache = PredictionCache(max_entries=100, max_bytes=int(2.5 * size))
+    for text in ['a', 'b', 'c']:
+        cache.put(key(text), VALUE)
+    assert cache.get(key('a')) is None
+    assert cache.get(key('b')) == VALUE and cache.get(key('c')) == VALUE
+    assert cache.stats()['bytes'] == 2 * size <= cache.max_bytes
+
+
+def test_replacing_an_entry_does_not_double_count_it():
+    cache = PredictionCache()
+    cache.put(key('a'), VALUE)
+    cache.put(key('a'), dict(VALUE, probability=12.0))
+    assert cache.stats()['entries'] == 1
+    assert cache.stats()['bytes'] == entry_size(key('a'), VALUE)
+    assert cache.get(key('a'))['probability'] == 12.0
+
+
+def test_entry_larger_than_the_budget_is_not_stored():
+    cache = PredictionCache(max_bytes=entry_size(key('a'), VALUE) - 1)
+    cache.put(key('a'), VALUE)
+    assert cache.get(key('a')) is None and cache.stats()['entries'] == 0
+
+
+def test_zero_max_entries_disables_the_cache():
+    cache = PredictionCache(max_entries=0)
+    cache.put(key('a'), VALUE)
+    assert cache.get(key('a')) is None
+    stats = cache.stats()
+    assert stats['entries'] == 0 and stats['bytes'] == 0 and stats['misses'] == 1
+
+
+def test_key_depends_on_tokens_and_model_version():
+    assert cache_key(['great', 'film'], 'v1') == cache_key(['great', 'film'], 'v1')
+    assert cache_key(['great', 'film'], 'v1') != cache_key(['great', 'film'], 'v2')
+    assert cache_key(['great', 'film'], 'v1') != cache_key(['great', 'films'], 'v1')
@@ -0,0 +1,73 @@
+import pytest
+import torch
+import app as sentiment_app
+from app import REDUCERS, window_spans
+from sentiment.model import BiGRU_CNN
+from sentiment.tokenizer import BatchTokenizer
+
+
+@pytest.mark.parametrize('num_tokens', [1, 100, 512, 513, 896, 897, 1300, 5000])
+def test_windows_cover_the_document_with_the_configured_overlap(num_tokens):
+    window, stride = 512, 384
+    spans = window_spans(num_tokens, window, stride)
+    assert spans[0][0] == 0 and spans[-1][1] == num_tokens
+    assert all(0 < end - start <= window for start, end in spans)
+    covered = set()
+    for start, end in spans:
+        covered.update(range(start, end))
+    assert covered == set(range(num_tokens))
+    for (start, end), (next_start, next_end) in zip(spans, spans[1:]):
+        assert next_start == start + stride
+        # Neighbours share window - stride tokens (fewer only when the next window is the short last one)
+        assert end - next_start == window - stride
+        assert next_end > end
+
+
+def test_short_document_is_one_window():
+    assert window_spans(300, 512, 384) == [(0, 300)]
+    assert window_spans(512, 512, 384) == [(0, 512)]
+
+
+def test_window_boundaries():
+    assert window_spans(1000, 512, 384) == [(0, 512), (384, 896), (768, 1000)]
+    assert window_spans(10, 4, 4) == [(0, 4), (4, 8), (8, 10)]
+
+
+def test_empty_document_still_gets_a_window():
+    assert window_spans(0, 512, 384) == [(0, 0)]
+
+
+SPANS = [(0, 512), (384, 896), (768, 868)]
+PROBABILITIES = [0.9, 0.6, 0.05]
+
+
+def test_mean_reducer():
+    assert REDUCERS['mean'](PROBABILITIES, SPANS) == pytest.approx((0.9 + 0.6 + 0.05) / 3)
+
+
+def test_length_weighted_reducer():
+    expected = (0.9 * 512 + 0.6 * 512 + 0.05 * 100) / (512 + 512 + 100)
+    assert REDUCERS['length_weighted'](PROBABILITIES, SPANS) == pytest.approx(expected)
+
+
+def test_max_confidence_reducer_picks_the_score_furthest_from_half():
+    assert REDUCERS['max_confidence'](PROBABILITIES, SPANS) == 0.05
+    assert REDUCERS['max_confidence']([0.55, 0.8, 0.3], SPANS) == 0.8
+
+
+def test_single_window_reducers_agree():
+    for reducer in REDUCERS.values():
+        assert reducer([0.7], [(0, 40)]) == pytest.approx(0.7)
+
+
+def test_predict_long_reports_every_window(monkeypatch):
+    torch.manual_seed(0)
+    vocab = {'<pad>': 0, '<unk>': 1, **{'w%d' % i: i + 2 for i in range(50)}}
+    model = BiGRU_CNN(52, 8, 6, 1, 1, True, 0.0, [2, 3], 4, 0.0, 4, 0.0, 0).eval()
+    serving = sentiment_app.ServingModel(model, BatchTokenizer(vocab), 3, 'test', '.', 'eager', None,
+                                         None, 3, False, 0.0)
+    monkeypatch.setattr(sentiment_app, 'current', serving)
+    text = ' '.join('w%d' % (i % 50) for i in range(1000))
+    result = sentiment_app.predict_long(text, 'length_weighted')
+    assert result['tokens'] == 1000 and result['reducer'] == 'length_weighted'
+    assert [(w['start'], w['end']) for w in result['windows']] == window_spans(1000, 512, sentiment_app.LONG_STRIDE)
@@ -0,0 +1,54 @@
+import torch
+from sentiment.model import BiGRU_CNN
+
+PAD_IDX = 0
+KERNEL_SIZES = [2, 3, 4, 5]
+# A small model; parity does not depend on its size
+CONFIG = dict(vocab_size=200, embedding_dim=16, hidden_dim=12, output_dim=1, n_layers=2, bidirectional=True,
+              dropout_gru=0.3, cnn_kernel_sizes=KERNEL_SIZES, cnn_num_filters=8, dropout_cnn=0.5,
+              fc_hidden_dim=8, dropout_fc=0.5, pad_idx=PAD_IDX)
+# Lengths are at least the largest kernel: shorter texts keep one window
+# reaching into the padding by design
+LENGTHS = [5, 9, 17, 40, 64]
+
+
+def make_model():
+    torch.manual_seed(0)
+    return BiGRU_CNN(**CONFIG).eval()
+
+
+def make_batch(total_length):
+    generator = torch.Generator().manual_seed(1)
+    rows = [torch.randint(1, CONFIG['vocab_size'], (n,), generator=generator) for n in LENGTHS]
+    ids = torch.full((len(rows), total_length), PAD_IDX, dtype=torch.long)
+    for i, row in enumerate(rows):
+        ids[i, :len(row)] = row
+    return rows, ids, torch.tensor(LENGTHS)
+
+
+def test_packed_batch_matches_unpadded_rows():
+    model = make_model()
+    rows, ids, lengths = make_batch(max(LENGTHS))
+    with torch.no_grad():
+        packed = model(ids, lengths)
+        alone = torch.cat([model(row[None, :]) for row in rows])
+    torch.testing.assert_close(packed, alone, rtol=1e-4, atol=1e-5)
+
+
+def test_packed_scores_ignore_padding_length():
+    model = make_model()
+    _, short_ids, lengths = make_batch(max(LENGTHS))
+    _, long_ids, _ = make_batch(512)
+    with torch.no_grad():
+        torch.testing.assert_close(model(short_ids, lengths), model(long_ids, lengths), rtol=1e-4, atol=1e-5)
+
+
+def test_pad_to_512_without_lengths_differs():
+    # The old serving path: pad every text to 512 tokens and run the GRU and
+    # max-pool over the padding. Packed scores are not expected to match it.
+    model = make_model()
+    rows, ids, lengths = make_batch(512)
+    with torch.no_grad():
+        padded = model(ids)
+        alone = torch.cat([model(row[None, :]) for row in rows])
+    assert not torch.allclose(padded, alone, rtol=1e-4, atol=1e-5)
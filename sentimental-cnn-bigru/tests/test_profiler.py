@@ -0,0 +1,29 @@
+import pytest
+import app as sentiment_app
+from metrics import SamplingProfiler
+
+
+@pytest.fixture
+def client():
+    yield sentiment_app.app.test_client()
+    sentiment_app.profiler.stop()
+
+
+@pytest.mark.parametrize('interval_ms', ['abc', None, [5], 'nan', 'inf', 0, -3, 0.5])
+def test_bad_intervals_are_rejected(client, interval_ms):
+    response = client.post('/api/profiler', json={'enabled': True, 'interval_ms': interval_ms})
+    assert response.status_code == 400
+    assert not sentiment_app.profiler.running
+
+
+def test_profiler_starts_and_stops(client):
+    response = client.post('/api/profiler', json={'enabled': True, 'interval_ms': 2})
+    assert response.status_code == 200 and sentiment_app.profiler.running
+    assert sentiment_app.profiler.interval == pytest.approx(0.002)
+    assert client.post('/api/profiler', json={'enabled': False}).status_code == 200
+    assert not sentiment_app.profiler.running
+
+
+def test_sampler_refuses_a_zero_interval():
+    with pytest.raises(ValueError):
+        SamplingProfiler().start(0)
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+import torch
+from training_data import LengthBucketSampler, PadCollate
+
+LENGTHS = np.random.RandomState(0).randint(1, 400, size=1003)
+
+
+def epoch_indices(sampler):
+    return [i for batch in sampler for i in batch]
+
+
+@pytest.mark.parametrize('shuffle', [True, False])
+def test_every_index_once_per_epoch(shuffle):
+    sampler = LengthBucketSampler(LENGTHS, batch_size=32, shuffle=shuffle, pool_batches=4, seed=1)
+    for _ in range(3):
+        batches = list(sampler)
+        assert len(batches) == len(sampler)
+        assert all(len(batch) <= 32 for batch in batches)
+        assert sorted(epoch_indices(sampler)) == list(range(len(LENGTHS)))
+
+
+def test_drop_last_skips_only_the_short_batches():
+    sampler = LengthBucketSampler(LENGTHS, batch_size=32, pool_batches=4, drop_last=True, seed=1)
+    batches = list(sampler)
+    assert all(len(batch) == 32 for batch in batches)
+    indices = [i for batch in batches for i in batch]
+    assert len(indices) == len(set(indices))
+    assert len(batches) <= len(sampler) + 1
+
+
+def test_shuffled_epochs_differ_but_seeds_repeat():
+    sampler = LengthBucketSampler(LENGTHS, batch_size=32, pool_batches=4, seed=1)
+    first, second = list(sampler), list(sampler)
+    assert first != second
+    assert list(LengthBucketSampler(LENGTHS, batch_size=32, pool_batches=4, seed=1)) == first
+
+
+def test_batches_group_similar_lengths():
+    sampler = LengthBucketSampler(LENGTHS, batch_size=32, pool_batches=4, seed=1)
+    spread = np.mean([np.ptp(LENGTHS[batch]) for batch in sampler])
+    random_spread = np.mean([np.ptp(LENGTHS[i:i + 32]) for i in range(0, len(LENGTHS), 32)])
+    # Pools of four batches: each batch spans about a quarter of the length range
+    assert spread < random_spread / 2
+
+
+def test_evaluation_order_is_sorted_by_length():
+    sampler = LengthBucketSampler(LENGTHS, batch_size=32, shuffle=False)
+    assert list(LENGTHS[epoch_indices(sampler)]) == sorted(LENGTHS)
+
+
+def item(length, label=1.0):
+    return torch.arange(1, length + 1), torch.tensor(label)
+
+
+def test_pads_to_the_longest_item_in_the_batch():
+    padded, lengths, labels = PadCollate(pad_id=0)([item(3), item(7, 0.0), item(5)])
+    assert padded.shape == (3, 7)
+    assert lengths.tolist() == [3, 7, 5]
+    assert labels.tolist() == [1.0, 0.0, 1.0]
+    assert padded[0].tolist() == [1, 2, 3, 0, 0, 0, 0]
+    assert padded[1].tolist() == list(range(1, 8))
+    assert padded[2, 5:].tolist() == [0, 0]
+
+
+def test_pad_width_follows_each_batch():
+    collate = PadCollate(pad_id=9)
+    assert collate([item(2), item(4)])[0].shape == (2, 4)
+    assert collate([item(11), item(6)])[0].shape == (2, 11)
+    assert collate([item(2), item(4)])[0][0, 2:].tolist() == [9, 9]
+
+
+def test_min_len_and_fixed_len():
+    assert PadCollate(pad_id=0, min_len=5)([item(2), item(3)])[0].shape == (2, 5)
+    assert PadCollate(pad_id=0, min_len=5)([item(8)])[0].shape == (1, 8)
+    assert PadCollate(pad_id=0, fixed_len=16)([item(2), item(3)])[0].shape == (2, 16)
+
+
+def test_empty_item_reports_length_one():
+    padded, lengths, _ = PadCollate(pad_id=0, min_len=3)([item(0), item(2)])
+    assert padded.shape == (2, 3)
+    assert padded[0].tolist() == [0, 0, 0]
+    assert lengths.tolist() == [1, 2]
@@ -0,0 +1,41 @@
+import torch
+from trials import load_checkpoint, save_checkpoint
+
+
+def tensors(value):
+    if isinstance(value, torch.Tensor):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from tensors(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from tensors(item)
+
+
+def test_checkpoint_round_trip_restores_rng_on_cpu(tmp_path):
+    model = torch.nn.Linear(4, 1)
+    optimizer = torch.optim.AdamW(model.parameters())
+    model(torch.randn(2, 4)).sum().backward()
+    optimizer.step()
+    generator = torch.Generator().manual_seed(7)
+    save_checkpoint(str(tmp_path), {'model': model.state_dict(), 'optimizer': optimizer.state_dict(),
+                                    'sampler_rng': generator.get_state(), 'torch_rng': torch.get_rng_state()})
+    expected = torch.randperm(10, generator=generator)
+
+    checkpoint = load_checkpoint(str(tmp_path))
+    # Generator.set_state and torch.set_rng_state only take CPU ByteTensors
+    assert all(t.device.type == 'cpu' for t in tensors(checkpoint))
+    resumed = torch.Generator()
+    resumed.set_state(checkpoint['sampler_rng'])
+    torch.set_rng_state(checkpoint['torch_rng'])
+    assert torch.equal(torch.randperm(10, generator=resumed), expected)
+
+    restored = torch.nn.Linear(4, 1)
+    restored.load_state_dict(checkpoint['model'])
+    torch.optim.AdamW(restored.parameters()).load_state_dict(checkpoint['optimizer'])
+    assert torch.equal(restored.weight, model.weight)
+
+
+def test_missing_checkpoint(tmp_path):
+    assert load_checkpoint(str(tmp_path)) is None
@@ -0,0 +1,278 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+import numpy as np
+import torch
+import torch.nn as nn
+from torch.utils.data import DataLoader, Dataset, random_split
+from sentiment.model import WEIGHTS_FILE, build_model, load_trained_model
+from sentiment.tokenizer import save_vocab
+from sentiment.versions import file_fingerprint
+from training_data import IMDBDataset, LengthBucketSampler, PadCollate, dataset_lengths
+from train_metrics import BinaryMetrics
+from trials import HISTORY_FILE, TRIAL_FILE, load_checkpoint, save_checkpoint, should_prune, write_json
+
+IMDB_ROOT = 'imdb_data/aclImdb'
+FEATURE_CACHE_DIR = os.environ.get('SENTIMENT_FEATURE_CACHE', 'feature_cache')
+FEATURE_ARRAYS = ('features', 'offsets', 'labels')
+ENCODE_BATCH_SIZE = 64
+# Truncation of the cached features; matches sentiment_analyzer.py
+MAX_SEQ_LEN = 512
+# Head hyperparameters (defaults: the trained model's config / sentiment_analyzer.py)
+HEAD_TUNABLE = ['CNN_KERNEL_SIZES', 'CNN_NUM_FILTERS', 'FC_HIDDEN_DIM', 'DROPOUT_CNN', 'DROPOUT_FC',
+                'BATCH_SIZE', 'LEARNING_RATE', 'EPOCHS', 'WEIGHT_DECAY', 'GRAD_CLIP']
+TRAINING_DEFAULTS = {'BATCH_SIZE': 32, 'LEARNING_RATE': 2e-5, 'EPOCHS': 50, 'WEIGHT_DECAY': 0.15, 'GRAD_CLIP': 1.0}
+
+
+def feature_dir(model_path, dataset, split, max_seq_len, dtype):
+    """Cache location keyed by encoder weights, token cache, truncation and dtype"""
+    key = f"{file_fingerprint([model_path])}\0{dataset.offsets.filename}\0{max_seq_len}\0{np.dtype(dtype).name}"
+    return os.path.join(FEATURE_CACHE_DIR, f"{split}-{hashlib.sha256(key.encode('utf-8')).hexdigest()[:12]}")
+
+
+def write_features(model, dataset, path, dtype, device):
+    """Run the frozen embedding + BiGRU once over a split and store gru_out rows.
+
+    Rows of all reviews are stacked into one (total_tokens, 2 * hidden)
+    array, written straight into a memory-mapped .npy file.
+    """
+    # Reviews shorter than one token still produce one (padding) step
+    lengths = np.maximum(dataset.lengths, 1)
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    width = model.gru.hidden_size * (2 if model.gru.bidirectional else 1)
+
+    tmp_path = path + '.tmp'
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    features = np.lib.format.open_memmap(os.path.join(tmp_path, 'features.npy'), mode='w+',
+                                         dtype=dtype, shape=(int(offsets[-1]), width))
+    collate = PadCollate(dataset.pad_id)
+    with torch.no_grad():
+        for batch in LengthBucketSampler(dataset.lengths, ENCODE_BATCH_SIZE, shuffle=False):
+            texts, batch_lengths, _ = collate([dataset[i] for i in batch])
+            gru_out = model.encode(texts.to(device), batch_lengths).cpu().numpy()
+            for row, i in enumerate(batch):
+                features[offsets[i]:offsets[i + 1]] = gru_out[row, :lengths[i]]
+    features.flush()
+    del features
+    np.save(os.path.join(tmp_path, 'offsets.npy'), offsets)
+    np.save(os.path.join(tmp_path, 'labels.npy'), np.asarray(dataset.labels, dtype=np.int8))
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path)
+
+
+class FeatureDataset(Dataset):
+    """Cached encoder outputs, memory-mapped; items are (seq, 2 * hidden) float32 tensors"""
+
+    def __init__(self, path):
+        self.features, self.offsets, self.labels = (
+            np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r') for name in FEATURE_ARRAYS)
+        self.lengths = np.diff(self.offsets)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def __getitem__(self, idx):
+        rows = self.features[self.offsets[idx]:self.offsets[idx + 1]]
+        return torch.from_numpy(np.array(rows, dtype=np.float32)), torch.tensor(float(self.labels[idx]))
+
+
+class FeatureCollate:
+    """Zero-pads encoder outputs to the batch maximum (at least min_len), like pad_packed_sequence"""
+
+    def __init__(self, min_len=1):
+        self.min_len = min_len
+
+    def __call__(self, batch):
+        features, labels = zip(*batch)
+        lengths = torch.tensor([len(rows) for rows in features], dtype=torch.long)
+        padded = features[0].new_zeros((len(features), max(self.min_len, int(lengths.max())), features[0].size(1)))
+        for i, rows in enumerate(features):
+            padded[i, :len(rows)] = rows
+        return padded, lengths, torch.stack(labels)
+
+
+def prepare_features(model_dir, max_seq_len, fp16, device):
+    """Load the trained model and make sure train/test features are cached.
+
+    Returns (model, config, vocab, model_path, train_features, test_features).
+    """
+    model, config, vocab = load_trained_model(model_dir, device)
+    model_path = os.path.join(model_dir, WEIGHTS_FILE)
+    dtype = np.float16 if fp16 else np.float32
+    paths = []
+    for split in ['train', 'test']:
+        dataset = IMDBDataset(IMDB_ROOT, split, vocab=vocab, max_seq_len=max_seq_len)
+        path = feature_dir(model_path, dataset, split, max_seq_len, dtype)
+        if not all(os.path.exists(os.path.join(path, f"{name}.npy")) for name in FEATURE_ARRAYS):
+            print(f"Encoding {split} split into {path} ({np.dtype(dtype).name})...")
+            start = time.perf_counter()
+            write_features(model, dataset, path, dtype, device)
+            print(f"  done in {time.perf_counter() - start:.0f} s")
+        paths.append(path)
+    return (model, config, vocab, model_path, *(FeatureDataset(path) for path in paths))
+
+
+def evaluate_head(model, loader, criterion, device):
+    model.eval()
+    metrics = BinaryMetrics(device)
+    with torch.no_grad():
+        for features, lengths, labels in loader:
+            features, labels = features.to(device), labels.to(device)
+            predictions = model.head(features, lengths).squeeze(1)
+            metrics.update(predictions, labels, criterion(predictions, labels))
+    return metrics.compute()
+
+
+def parse_override(parser, item):
+    name, sep, value = item.partition('=')
+    if not sep or name not in HEAD_TUNABLE:
+        parser.error(f"--set expects NAME=VALUE with NAME one of {', '.join(HEAD_TUNABLE)}")
+    try:
+        return name, json.loads(value)
+    except ValueError:
+        return name, value
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Train only the CNN/FC head on cached, frozen BiGRU features")
+    parser.add_argument('--model-dir', default='result', help="Trained model whose embedding + BiGRU is frozen")
+    parser.add_argument('--result-dir', default=os.path.join('result', 'head'))
+    parser.add_argument('--set', dest='overrides', action='append', default=[], metavar='NAME=VALUE',
+                        help=f"Override a head hyperparameter: {', '.join(HEAD_TUNABLE)}")
+    parser.add_argument('--max-seq-len', type=int, default=MAX_SEQ_LEN)
+    parser.add_argument('--fp16', action='store_true', help="Cache features as float16 (half the disk and page cache)")
+    parser.add_argument('--threads', type=int, default=None, help="torch intra-op threads")
+    parser.add_argument('--resume', action='store_true', help="Continue from the last epoch checkpoint")
+    parser.add_argument('--patience', type=int, default=None, help="Early-stopping patience on validation loss")
+    parser.add_argument('--prune-against', metavar='SWEEP_DIR', default=None,
+                        help="Stop early when validation accuracy is below the median of the sweep's other trials")
+    args = parser.parse_args()
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    trained, config, vocab, _, train_features, test_features = prepare_features(
+        args.model_dir, args.max_seq_len, args.fp16, device)
+    hyperparameters = dict(parse_override(parser, item) for item in args.overrides)
+    settings = {**TRAINING_DEFAULTS, **config, **hyperparameters}
+    if settings['EPOCHS'] < 1:
+        parser.error(f"EPOCHS must be at least 1, got {settings['EPOCHS']}")
+    config = {key: settings[key] for key in config}
+
+    # Fresh head on top of the trained, frozen encoder
+    model = build_model(config).to(device)
+    model.embedding.load_state_dict(trained.embedding.state_dict())
+    model.gru.load_state_dict(trained.gru.state_dict())
+    del trained
+    for module in [model.embedding, model.gru]:
+        module.requires_grad_(False)
+    head_parameters = [p for p in model.parameters() if p.requires_grad]
+    optimizer = torch.optim.AdamW(head_parameters, lr=settings['LEARNING_RATE'], weight_decay=settings['WEIGHT_DECAY'])
+    criterion = nn.BCEWithLogitsLoss()
+
+    # Same 80/20 train/validation split as sentiment_analyzer.py
+    train_size = int(0.80 * len(train_features))
+    train_split, val_split = random_split(train_features, [train_size, len(train_features) - train_size],
+                                          generator=torch.Generator().manual_seed(42))
+    collate = FeatureCollate(min_len=max(config['CNN_KERNEL_SIZES']))
+    batch_size = settings['BATCH_SIZE']
+    train_loader = DataLoader(train_split, batch_sampler=LengthBucketSampler(dataset_lengths(train_split), batch_size),
+                              collate_fn=collate)
+    val_loader = DataLoader(val_split, collate_fn=collate,
+                            batch_sampler=LengthBucketSampler(dataset_lengths(val_split), batch_size, shuffle=False))
+    test_loader = DataLoader(test_features, collate_fn=collate,
+                             batch_sampler=LengthBucketSampler(test_features.lengths, batch_size, shuffle=False))
+
+    os.makedirs(args.result_dir, exist_ok=True)
+    best_model_path = os.path.join(args.result_dir, 'best_model.pt')
+    history, status, elapsed_before = [], 'running', 0.0
+    best_val_loss, bad_epochs, best_val_result = float('inf'), 0, None
+    checkpoint = load_checkpoint(args.result_dir) if args.resume else None
+    if checkpoint is not None:
+        model.load_state_dict(checkpoint['model'])
+        optimizer.load_state_dict(checkpoint['optimizer'])
+        train_loader.batch_sampler.generator.set_state(checkpoint['sampler_rng'])
+        history, status, elapsed_before = checkpoint['history'], checkpoint['status'], checkpoint['elapsed']
+        best_val_loss, bad_epochs = checkpoint['best_val_loss'], checkpoint['bad_epochs']
+        best_val_result, val_result = checkpoint['best_val_result'], checkpoint['val_result']
+        print(f"Resuming {args.result_dir} after epoch {len(history)} ({status})")
+    run_start = time.time()
+
+    for epoch in range(len(history), settings['EPOCHS']):
+        if status != 'running':
+            break
+        model.train()
+        metrics = BinaryMetrics(device)
+        epoch_start = time.perf_counter()
+        for features, lengths, labels in train_loader:
+            features, labels = features.to(device), labels.to(device)
+            optimizer.zero_grad()
+            predictions = model.head(features, lengths).squeeze(1)
+            loss = criterion(predictions, labels)
+            loss.backward()
+            torch.nn.utils.clip_grad_norm_(head_parameters, settings['GRAD_CLIP'])
+            optimizer.step()
+            metrics.update(predictions, labels, loss)
+        train_result = metrics.compute()
+        epoch_time = time.perf_counter() - epoch_start
+        val_result = evaluate_head(model, val_loader, criterion, device)
+        print(f"Epoch {epoch + 1}/{settings['EPOCHS']}: train loss {train_result['loss']:.3f} "
+              f"acc {train_result['accuracy']*100:.2f}% | val loss {val_result['loss']:.3f} "
+              f"acc {val_result['accuracy']*100:.2f}% | {epoch_time:.1f} s")
+
+        if val_result['loss'] < best_val_loss:
+            best_val_loss, bad_epochs, best_val_result = val_result['loss'], 0, val_result
+            if args.patience is not None:
+                torch.save(model.state_dict(), best_model_path)
+        else:
+            bad_epochs += 1
+            if args.patience is not None and bad_epochs >= args.patience:
+                print('Early stopping!')
+                status = 'early_stopped'
+        history.append({
+            'epoch': epoch + 1,
+            'train_loss': train_result['loss'], 'train_accuracy': train_result['accuracy'],
+            'val_loss': val_result['loss'], 'val_accuracy': val_result['accuracy'],
+            'epoch_seconds': round(epoch_time, 2),
+        })
+        write_json(os.path.join(args.result_dir, HISTORY_FILE), history)
+        if status == 'running' and args.prune_against and should_prune(args.result_dir, args.prune_against, history):
+            print('Pruned: validation accuracy is below the median of the other trials')
+            status = 'pruned'
+        save_checkpoint(args.result_dir, {
+            'model': model.state_dict(), 'optimizer': optimizer.state_dict(),
+            'sampler_rng': train_loader.batch_sampler.generator.get_state(),
+            'history': history, 'status': status, 'elapsed': elapsed_before + time.time() - run_start,
+            'best_val_loss': best_val_loss, 'bad_epochs': bad_epochs,
+            'val_result': val_result, 'best_val_result': best_val_result,
+        })
+
+    if status == 'running':
+        status = 'completed'
+    trial = {
+        'status': status,
+        'epochs': len(history),
+        'hyperparameters': hyperparameters,
+        'best_val_loss': best_val_loss,
+        'best_val_accuracy': max((h['val_accuracy'] for h in history), default=None),
+        'wall_clock_seconds': round(elapsed_before + time.time() - run_start, 1),
+    }
+    if status != 'pruned':
+        if status == 'early_stopped':
+            model.load_state_dict(torch.load(best_model_path, map_location=device))
+            val_result = best_val_result
+        test_result = evaluate_head(model, test_loader, criterion, device)
+        trial.update(val_accuracy=val_result['accuracy'], test_accuracy=test_result['accuracy'])
+        print(f"Test accuracy: {test_result['accuracy']*100:.2f}%")
+        # A complete model (frozen encoder + new head) that app.py can serve
+        torch.save(model.state_dict(), os.path.join(args.result_dir, 'bigru_cnn_sentiment.pt'))
+        save_vocab(vocab, os.path.join(args.result_dir, 'vocab'))
+        with open(os.path.join(args.result_dir, 'config.json'), 'w') as f:
+            json.dump(config, f, indent=2)
+        print(f"Model, vocabulary and config saved to {args.result_dir}")
+    write_json(os.path.join(args.result_dir, TRIAL_FILE), trial)
@@ -0,0 +1,46 @@
+import torch
+from sklearn.metrics import classification_report
+
+
+class BinaryMetrics:
+    """Running loss sum and confusion counts for a binary classifier, kept on the device.
+
+    update() only queues tensor ops, so training never waits on the device
+    for bookkeeping; compute() copies the totals to the host in one transfer.
+    """
+
+    def __init__(self, device):
+        self.device = device
+        self.reset()
+
+    def reset(self):
+        self.loss_sum = torch.zeros((), dtype=torch.float64, device=self.device)
+        # counts[2 * label + prediction]: TN, FP, FN, TP
+        self.counts = torch.zeros(4, dtype=torch.int64, device=self.device)
+        self.batches = 0
+
+    def update(self, logits, labels, loss=None):
+        # logit > 0 is sigmoid(logit) > 0.5, i.e. torch.round(torch.sigmoid(logit))
+        preds = (logits.detach() > 0).long()
+        self.counts += torch.bincount(2 * labels.long() + preds, minlength=4)
+        if loss is not None:
+            self.loss_sum += loss.detach()
+        self.batches += 1
+
+    def compute(self):
+        """Mean per-batch loss, accuracy and the 2x2 confusion matrix (rows: true label)"""
+        totals = torch.cat([self.counts.to(torch.float64), self.loss_sum.view(1)]).cpu().numpy()
+        confusion = totals[:4].astype(int).reshape(2, 2)
+        samples = int(confusion.sum())
+        return {
+            'loss': totals[4] / self.batches if self.batches else 0.0,
+            'accuracy': float(confusion.trace()) / samples if samples else 0.0,
+            'samples': samples,
+            'confusion': confusion,
+        }
+
+
+def report_from_confusion(confusion, digits=4):
+    """sklearn classification report built from confusion counts instead of per-sample arrays"""
+    return classification_report([0, 0, 1, 1], [0, 1, 0, 1], sample_weight=confusion.ravel(),
+                                 digits=digits, zero_division=0)
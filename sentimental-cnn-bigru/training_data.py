@@ -0,0 +1,114 @@
+import os
+import numpy as np
+import torch
+from torch.utils.data import Dataset, Sampler, Subset
+from dataset_cache import DEFAULT_CACHE_DIR, load_or_build_split
+
+# Pre-tokenized splits, keyed by tokenizer and vocab version
+DATA_CACHE_DIR = os.environ.get('SENTIMENT_DATA_CACHE', DEFAULT_CACHE_DIR)
+
+
+class IMDBDataset(Dataset):
+    """IMDb split served from the pre-tokenized cache written by dataset_cache.py.
+
+    Token ids, row offsets and labels are memory-mapped, so a warm start
+    reads no text files and does no tokenization. Items are unpadded id
+    tensors truncated to max_seq_len; padding happens per batch in PadCollate.
+    """
+    def __init__(self, root_dir, split, vocab=None, max_seq_len=256, cache_dir=DATA_CACHE_DIR):
+        self.max_seq_len = max_seq_len
+        self.vocab, self.ids, self.offsets, self.labels = load_or_build_split(root_dir, split, vocab, cache_dir)
+        self.pad_id = self.vocab['<pad>']
+        # Truncated lengths, for length bucketing
+        self.lengths = np.minimum(np.diff(self.offsets), max_seq_len)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def __getitem__(self, idx):
+        start = self.offsets[idx]
+        ids = torch.from_numpy(self.ids[start:start + self.lengths[idx]].astype(np.int64))
+        return ids, torch.tensor(float(self.labels[idx]))
+
+
+def loader_options(num_workers=0, pin_memory=False, prefetch_factor=2):
+    """DataLoader keyword arguments for the input pipeline settings"""
+    options = {'num_workers': num_workers, 'pin_memory': pin_memory}
+    if num_workers > 0:
+        # Batches each worker keeps ready; workers live across epochs
+        options.update(prefetch_factor=prefetch_factor, persistent_workers=True)
+    return options
+
+
+def dataset_lengths(dataset):
+    """Per-item lengths of an IMDBDataset or a (nested) Subset of one"""
+    if isinstance(dataset, Subset):
+        return dataset_lengths(dataset.dataset)[np.asarray(dataset.indices)]
+    return dataset.lengths
+
+
+class PadCollate:
+    """Pads a list of (ids, label) items into (ids, lengths, labels) tensors.
+
+    By default rows are padded only to the longest item in the batch (but at
+    least min_len, so every conv kernel has a window); fixed_len pads every
+    batch to the same width instead.
+    """
+
+    def __init__(self, pad_id, min_len=1, fixed_len=None):
+        self.pad_id = pad_id
+        self.min_len = min_len
+        self.fixed_len = fixed_len
+
+    def __call__(self, batch):
+        ids, labels = zip(*batch)
+        lengths = torch.tensor([len(row) for row in ids], dtype=torch.long)
+        width = self.fixed_len or max(self.min_len, int(lengths.max()))
+        padded = torch.full((len(ids), width), self.pad_id, dtype=torch.long)
+        for i, row in enumerate(ids):
+            padded[i, :len(row)] = row
+        # Empty reviews still feed one (padding) step through the GRU
+        return padded, lengths.clamp(min=1), torch.stack(labels)
+
+
+class LengthBucketSampler(Sampler):
+    """Batch sampler that groups items of similar length.
+
+    Each epoch the indices are shuffled and cut into pools of
+    batch_size * pool_batches items; every pool is sorted by length and
+    split into batches, and the batch order is shuffled again. Batches are
+    nearly uniform in length while their composition still changes from
+    epoch to epoch.
+    """
+
+    def __init__(self, lengths, batch_size, shuffle=True, pool_batches=50, drop_last=False, seed=None):
+        self.lengths = np.asarray(lengths)
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.pool_size = batch_size * pool_batches
+        self.drop_last = drop_last
+        self.generator = torch.Generator()
+        self.generator.manual_seed(seed if seed is not None else int(torch.empty((), dtype=torch.int64).random_()))
+
+    def __len__(self):
+        if self.drop_last:
+            return len(self.lengths) // self.batch_size
+        return (len(self.lengths) + self.batch_size - 1) // self.batch_size
+
+    def __iter__(self):
+        if not self.shuffle:
+            # Deterministic evaluation order: one pool, sorted by length
+            order = np.argsort(self.lengths, kind='stable')
+            batches = [order[i:i + self.batch_size] for i in range(0, len(order), self.batch_size)]
+        else:
+            order = torch.randperm(len(self.lengths), generator=self.generator).numpy()
+            batches = []
+            for start in range(0, len(order), self.pool_size):
+                pool = order[start:start + self.pool_size]
+                pool = pool[np.argsort(self.lengths[pool], kind='stable')]
+                batches.extend(pool[i:i + self.batch_size] for i in range(0, len(pool), self.batch_size))
+            batches = [batches[i] for i in torch.randperm(len(batches), generator=self.generator).tolist()]
+        for batch in batches:
+            if self.drop_last and len(batch) < self.batch_size:
+                continue
+            yield batch.tolist()
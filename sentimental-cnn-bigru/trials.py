@@ -0,0 +1,67 @@
+import glob
+import json
+import os
+import statistics
+import torch
+
+CHECKPOINT_FILE = 'checkpoint.pt'
+HISTORY_FILE = 'history.json'
+TRIAL_FILE = 'trial.json'
+# Median stopping: only judge a trial once this many epochs have run and at
+# least this many other trials have reached the same epoch
+PRUNE_WARMUP_EPOCHS = 2
+PRUNE_MIN_TRIALS = 3
+
+
+def write_json(path, data):
+    """Write JSON through a temporary file so readers never see a partial file"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def read_json(path, default=None):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def save_checkpoint(result_dir, state):
+    path = os.path.join(result_dir, CHECKPOINT_FILE)
+    torch.save(state, path + '.tmp')
+    os.replace(path + '.tmp', path)
+
+
+def load_checkpoint(result_dir):
+    """The last checkpoint in result_dir, with every tensor on the CPU.
+
+    RNG states must stay CPU ByteTensors (Generator.set_state and
+    torch.set_rng_state reject CUDA ones); model and optimizer
+    load_state_dict() move their tensors to the parameters' device.
+    """
+    path = os.path.join(result_dir, CHECKPOINT_FILE)
+    if not os.path.exists(path):
+        return None
+    # Holds optimizer/scheduler/RNG state as well as tensors
+    return torch.load(path, map_location='cpu', weights_only=False)
+
+
+def should_prune(result_dir, sweep_dir, history):
+    """Median stopping rule: stop a trial whose validation accuracy after its
+    latest epoch is below the median of the other trials at that epoch."""
+    epoch = len(history)
+    if epoch < PRUNE_WARMUP_EPOCHS:
+        return False
+    others = []
+    for path in glob.glob(os.path.join(sweep_dir, '*', HISTORY_FILE)):
+        if os.path.samefile(os.path.dirname(path), result_dir):
+            continue
+        other = read_json(path, [])
+        if len(other) >= epoch:
+            others.append(other[epoch - 1]['val_accuracy'])
+    if len(others) < PRUNE_MIN_TRIALS:
+        return False
+    return history[-1]['val_accuracy'] < statistics.median(others)